@@ -0,0 +1,108 @@
+"""
+Cold-start benchmark for the Streamlit dashboard.
+
+Each run starts a fresh interpreter, renders the first page of main.py once
+(headless, via streamlit.testing) against synthetic data (see load_test.py) and
+reports the render time, peak RSS and which heavy libraries got imported. Exits
+non-zero if the page did not render (an error or missing tabs), the median
+render time exceeds the budget or a deferred library is imported on the first
+page.
+
+    python benchmarks/cold_start.py [--budget 1.5] [--runs 3] [--scale 1.0] [--app main.py]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from load_test import PREDICTIONS_TAB, TABS, synthetic_data
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Median first-render budget in seconds
+DEFAULT_BUDGET_S = 1.5
+
+# Libraries only needed by tabs/features that are not on the first page; the app
+# must not be the one to import them while rendering it
+DEFERRED_MODULES = ["prophet", "cmdstanpy", "plotly", "groq", "sklearn", "requests"]
+
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+# Streamlit itself may import some of these (e.g. plotly for its chart theme)
+preloaded = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+rendered = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "render_s": rendered - imported,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "exceptions": [e.message for e in at.exception],
+    "errors": [e.value for e in at.error],
+    "tabs": [t.label for t in at.tabs],
+    "modules": [m for m in json.loads(sys.argv[2]) if m in sys.modules and m not in preloaded],
+}))
+"""
+
+def run_once(app_path, data_dir):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, app_path, json.dumps(DEFERRED_MODULES)],
+        cwd=os.path.dirname(app_path), capture_output=True, text=True,
+        env={**os.environ, "AADHAAR_DATA_DIR": data_dir, "STREAMLIT_LOGGER_LEVEL": "error"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="median first-render budget (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="synthetic data size (see load_test.py)")
+    parser.add_argument("--app", default=os.path.join(PROJECT_ROOT, "main.py"))
+    args = parser.parse_args()
+
+    app_path = os.path.abspath(args.app)
+    data_dir = tempfile.mkdtemp(prefix="aadhaar_cold_")
+    try:
+        print(f"Generating synthetic data in {data_dir} (scale {args.scale})...")
+        synthetic_data(data_dir, args.scale)
+        runs = [run_once(app_path, data_dir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    # Timings only mean something if the first page actually rendered
+    missing_tabs = sorted({t for r in runs for t in TABS + [PREDICTIONS_TAB] if t not in r["tabs"]})
+    errors = [e for r in runs for e in r["exceptions"] + r["errors"]]
+    if errors or missing_tabs:
+        if errors:
+            print(f"FAIL: app raised or showed an error on first render: {errors[0]}")
+        if missing_tabs:
+            print(f"FAIL: first page is missing tabs: {', '.join(missing_tabs)}")
+        sys.exit(1)
+
+    for i, stats in enumerate(runs):
+        print(f"run {i + 1}: render {stats['render_s']:.2f}s  (streamlit import {stats['import_s']:.2f}s)  "
+              f"peak RSS {stats['peak_rss_mb']:.0f}MB  deferred imported: {stats['modules'] or 'none'}")
+
+    median_render = statistics.median(r["render_s"] for r in runs)
+    leaked = sorted({m for r in runs for m in r["modules"]})
+    print(f"\nmedian first render: {median_render:.2f}s (budget {args.budget:.2f}s)")
+
+    failed = False
+    if median_render > args.budget:
+        print("FAIL: cold start is over budget")
+        failed = True
+    if leaked:
+        print(f"FAIL: first page imported deferred libraries: {', '.join(leaked)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Concurrent-session load test for the Streamlit dashboard.
+
+Generates a synthetic data directory, starts a local mock LLM endpoint, then
+drives N concurrent headless sessions of main.py (via streamlit.testing) through
+random but realistic interaction scripts: picking states, date ranges and the
+activity view, switching tabs and chatting with the assistant. Reports rerun
+latency percentiles per action and memory growth per session. No network is
+needed.
+
+    python benchmarks/load_test.py [--sessions 8] [--steps 15] [--think 0.2] [--scale 1.0]
+
+Exits non-zero if any session raised or the overall p95 exceeds --p95-budget.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'src'))
+
+TABS = ["Live Map", "Trends", "Compare", "Anomalies", "AI Assistant 🤖"]
+PREDICTIONS_TAB = "Predictions"
+VIEWS = ["Total Updates", "Biometric Updates", "Demographic Updates", "New Enrolments"]
+ACTIONS = ["states", "dates", "view", "tab", "chat"]
+QUESTIONS = [
+    "Which district is busiest?",
+    "Summarize migration for the selected states.",
+    "Are there any anomalies I should look at?",
+]
+
+# Synthetic data at --scale 1.0
+STATE_COUNT = 12
+DISTRICTS_PER_STATE = 15
+DAYS = 365
+FLOWS_PER_DAY = 120
+START_DATE = "2025-01-01"
+
+
+def rss_mb():
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_data(data_dir, scale=1.0, seed=0):
+    """
+    Writes every artifact the dashboard reads, built from random pulse and flow
+    data through the same ETL functions as the real pipeline. Returns the states.
+    """
+    import numpy as np
+    import pandas as pd
+    from processing.geography import STATES, state_center
+    from processing.aggregator import calculate_net_migration, corridor_summaries, distance_digests
+    from processing.matrices import (geo_matrices, migration_frame, matrix_date_range,
+                                     PULSE_MATRIX_METRICS, MIGRATION_MATRIX_METRICS)
+    from models.anomaly import detect_anomalies
+    from utils.artifacts import write_artifact, write_npz_artifact
+
+    rng = np.random.default_rng(seed)
+    states = STATES[:STATE_COUNT]
+    n_districts = max(2, int(DISTRICTS_PER_STATE * scale))
+    districts = pd.DataFrame([
+        {'state': s, 'district': f"{s.split()[0]} District {i + 1}",
+         'latitude': state_center(s)[0] + rng.uniform(-1, 1), 'longitude': state_center(s)[1] + rng.uniform(-1, 1)}
+        for s in states for i in range(n_districts)
+    ])
+    dates = pd.date_range(START_DATE, periods=DAYS)
+
+    # Pulse: one row per district and day
+    pulse = districts.loc[districts.index.repeat(len(dates))].reset_index(drop=True)
+    pulse.insert(0, 'date', np.tile(dates, len(districts)))
+    for col, mean in (('demo_age_5_17', 40), ('demo_age_17_', 60), ('bio_age_5_17', 50), ('bio_age_17_', 45),
+                      ('age_0_5', 30), ('age_5_17', 25), ('age_18_greater', 20)):
+        pulse[col] = rng.poisson(mean, len(pulse))
+    pulse['total_updates'] = pulse[['demo_age_5_17', 'demo_age_17_', 'bio_age_5_17', 'bio_age_17_']].sum(axis=1)
+    pulse['total_enrolments'] = pulse[['age_0_5', 'age_5_17', 'age_18_greater']].sum(axis=1)
+    coords = pulse.pop('latitude'), pulse.pop('longitude')
+    pulse['latitude'], pulse['longitude'] = coords
+
+    # Flows: random district pairs per day, same columns as the aggregator writes
+    n_flows = int(FLOWS_PER_DAY * scale) * len(dates)
+    src = districts.iloc[rng.integers(0, len(districts), n_flows)].reset_index(drop=True)
+    dst = districts.iloc[rng.integers(0, len(districts), n_flows)].reset_index(drop=True)
+    flows = pd.DataFrame({
+        'date': np.repeat(dates, int(FLOWS_PER_DAY * scale)),
+        'source_district': src['district'], 'dest_district': dst['district'],
+        'count': rng.geometric(0.3, n_flows),
+        'source_state': src['state'], 'source_lat': src['latitude'], 'source_lon': src['longitude'],
+        'dest_state': dst['state'], 'dest_lat': dst['latitude'], 'dest_lon': dst['longitude'],
+    })
+    flows = flows[flows['source_district'] != flows['dest_district']]
+    keys = ['date', 'source_district', 'dest_district']
+    flows = flows.groupby(keys, as_index=False).agg({'count': 'sum', **{c: 'first' for c in flows.columns[4:]}})
+
+    write_artifact(pulse, 'india_aggregated.csv', data_dir=data_dir)
+    write_artifact(flows, 'district_flows.csv', data_dir=data_dir)
+    write_artifact(calculate_net_migration(flows), 'district_net_migration.csv', data_dir=data_dir)
+    write_artifact(corridor_summaries(flows), 'corridor_sketches.csv', data_dir=data_dir)
+    write_artifact(distance_digests(flows), 'distance_digests.csv', data_dir=data_dir)
+    for name, frame, metrics in (('pulse_matrices.npz', pulse, PULSE_MATRIX_METRICS),
+                                 ('migration_matrices.npz', migration_frame(flows), MIGRATION_MATRIX_METRICS)):
+        matrices = geo_matrices(frame, metrics)
+        write_npz_artifact(matrices, name, data_dir=data_dir, rows=len(matrices['states']) + len(matrices['districts']),
+                           date_range=matrix_date_range(matrices))
+    detect_anomalies('robust_z', data_dir=data_dir)
+    return list(states)
+
+
+def find(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def run_session(app_path, steps, think_s, states, tabs, seed, record):
+    """One simulated analyst; calls record(action, seconds, exception_messages) per rerun."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(app_path, default_timeout=300)
+
+    def timed(action):
+        start = time.perf_counter()
+        at.run()
+        record(action, time.perf_counter() - start, [e.message for e in at.exception])
+
+    timed("initial")
+    first = date.fromisoformat(START_DATE)
+    for _ in range(steps):
+        action = rng.choice(ACTIONS)
+        if action == "states":
+            find(at.multiselect, "Select States").set_value(rng.sample(states, rng.randint(1, 4)))
+        elif action == "dates":
+            start = first + timedelta(days=rng.randrange(0, DAYS - 30))
+            end = start + timedelta(days=rng.randrange(7, min(180, (first + timedelta(days=DAYS - 1) - start).days)))
+            find(at.date_input, "Select Date Range").set_value((start, end))
+        elif action == "view":
+            find(at.radio, "Select Service to Analyze").set_value(rng.choice(VIEWS))
+        elif action == "tab":
+            at.session_state["active_tab"] = rng.choice(tabs)
+        elif action == "chat":
+            if not at.chat_input:
+                at.session_state["active_tab"] = "AI Assistant 🤖"
+                timed("tab")
+            at.chat_input[0].set_value(rng.choice(QUESTIONS))
+        timed(action)
+        time.sleep(rng.uniform(0, think_s))
+    return at
+
+
+def percentiles(values):
+    import numpy as np
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(values), "p50": p50, "p95": p95, "p99": p99, "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--steps", type=int, default=15, help="interactions per session")
+    parser.add_argument("--think", type=float, default=0.2, help="max think time between interactions (s)")
+    parser.add_argument("--scale", type=float, default=1.0, help="synthetic data size multiplier")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mock LLM reply time (s)")
+    parser.add_argument("--with-predictions", action="store_true", help="include the Prophet tab")
+    parser.add_argument("--p95-budget", type=float, default=None, help="fail if overall p95 rerun latency exceeds this (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-data", action="store_true", help="keep the synthetic data directory")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--app", default=os.path.join(PROJECT_ROOT, "main.py"))
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="aadhaar_load_")
+    # Must be set before the app (or utils.artifacts) is imported
+    os.environ["AADHAAR_DATA_DIR"] = data_dir
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    from utils.mock_ollama import start_background
+    llm, llm_url = start_background(port=0, latency_s=args.llm_latency)
+    os.environ["OLLAMA_URL"] = llm_url
+
+    print(f"Generating synthetic data in {data_dir} (scale {args.scale})...")
+    states = synthetic_data(data_dir, args.scale, args.seed)
+    tabs = TABS + ([PREDICTIONS_TAB] if args.with_predictions else [])
+
+    lock = threading.Lock()
+    samples = []
+
+    def record(action, seconds, errors):
+        with lock:
+            samples.append((action, seconds, errors))
+
+    # Warm-up session: process-wide caches (shared datasets, matrices) are filled once
+    app_path = os.path.abspath(args.app)
+    rss_start = rss_mb()
+    run_session(app_path, 3, 0, states, tabs, -1, lambda *a: None)
+    rss_warm = rss_mb()
+
+    print(f"Running {args.sessions} sessions x {args.steps} interactions...")
+    sessions = [None] * args.sessions
+
+    def worker(i):
+        sessions[i] = run_session(app_path, args.steps, args.think, states, tabs, args.seed + i, record)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    # Sessions are still referenced, so their state counts towards the growth
+    rss_end = rss_mb()
+
+    by_action = {}
+    for action, seconds, _ in samples:
+        by_action.setdefault(action, []).append(seconds)
+    errors = [e for _, _, errs in samples for e in errs]
+    report = {
+        "sessions": args.sessions,
+        "reruns": len(samples),
+        "wall_s": wall,
+        "overall": percentiles([s for _, s, _ in samples]),
+        "actions": {a: percentiles(v) for a, v in sorted(by_action.items())},
+        "rss_mb": {"start": rss_start, "after_warmup": rss_warm, "end": rss_end},
+        "rss_growth_per_session_mb": (rss_end - rss_warm) / max(1, args.sessions),
+        "llm": llm.stats.snapshot(),
+        "exceptions": len(errors),
+    }
+    llm.shutdown()
+    if args.keep_data:
+        print(f"Synthetic data kept in {data_dir}")
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"\n{'action':<10}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for action, stats in [*report["actions"].items(), ("overall", report["overall"])]:
+        print(f"{action:<10}{stats['n']:>6}" + "".join(f"{stats[k]:>8.3f}s" for k in ("p50", "p95", "p99", "max")))
+    print(f"\n{len(samples)} reruns in {wall:.1f}s; mock LLM served {report['llm']['requests']} chats")
+    print(f"RSS: {rss_start:.0f}MB -> {rss_warm:.0f}MB after warm-up -> {rss_end:.0f}MB "
+          f"({report['rss_growth_per_session_mb']:.1f}MB per session)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if errors:
+        print(f"FAIL: {len(errors)} exceptions, first: {errors[0]}")
+        failed = True
+    if args.p95_budget is not None and report["overall"]["p95"] > args.p95_budget:
+        print(f"FAIL: p95 rerun latency {report['overall']['p95']:.2f}s is over budget {args.p95_budget:.2f}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,8 @@
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
-import plotly.express as px
+import numpy as np
 import os
 import sys
-from datetime import timedelta
-import random
-import math
-import plotly.graph_objects as go
-import requests
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,9 +11,19 @@ load_dotenv()
 # Add src to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from generation.mock_data import generate_mock_data
-from models.forecast import get_forecast, generate_forecast_insights
-from utils.ollama_client import HybridAIClient
+# Heavy, feature-specific libraries (pydeck, plotly, prophet, groq, scikit-learn,
+# requests) are imported inside the functions that use them, so a cold start only
+# pays for what the first page actually renders. See benchmarks/cold_start.py.
+from processing.compaction import compact_frame, COMPACTION_VERSION
+from processing.geography import coded_states
+from utils import artifacts, shared_data
+from utils.sketches import merge_truncated, union_count, compress_digests, digest_quantiles
+
+# Same override as utils.artifacts, e.g. to serve synthetic data in load tests
+DATA_DIR = os.environ.get("AADHAAR_DATA_DIR", os.path.join(os.path.dirname(__file__), 'data'))
+
+# pydeck.map_styles.CARTO_DARK, inlined so choosing a style doesn't import pydeck
+CARTO_DARK_STYLE = "https://basemaps.cartocdn.com/gl/dark-matter-gl-style/style.json"
 
 st.set_page_config(page_title="Aadhaar Pulse", layout="wide")
 
@@ -75,91 +79,246 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def normalize_state_name(state):
-    """Normalize inconsistent state names into a standard set."""
-    if not isinstance(state, str) or state.strip() == "":
-        return "Other"
-    
-    s = " ".join(state.split()).title()
-    
-    # Comprehensive mapping for Indian States/UTs
-    mapping = {
-        # UTs
-        "Andaman & Nicobar Islands": "Andaman and Nicobar Islands",
-        "Andaman And Nicobar Islands": "Andaman and Nicobar Islands",
-        "Dadra & Nagar Haveli": "Dadra and Nagar Haveli and Daman and Diu",
-        "Dadra And Nagar Haveli": "Dadra and Nagar Haveli and Daman and Diu",
-        "Daman & Diu": "Dadra and Nagar Haveli and Daman and Diu",
-        "Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
-        "The Dadra And Nagar Haveli And Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
-        "Dadra And Nagar Haveli And Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
-        # Jammu & Kashmir
-        "Jammu & Kashmir": "Jammu and Kashmir",
-        "Jammu And Kashmir": "Jammu and Kashmir",
-        # Tamil Nadu
-        "Tamilnadu": "Tamil Nadu",
-        # Odisha
-        "Odisha": "Odisha",
-        "Odisa": "Odisha",
-        "Orissa": "Odisha",
-        # Chhattisgarh
-        "Chhatisgarh": "Chhattisgarh",
-        # West Bengal
-        "West  Bengal": "West Bengal",
-        "West Bangal": "West Bengal",
-        "West Bengli": "West Bengal",
-        "Westbengal": "West Bengal",
-        "West Bengal": "West Bengal",
-        # Uttarakhand
-        "Uttaranchal": "Uttarakhand",
-        # Pondicherry
-        "Pondicherry": "Puducherry"
-    }
+# Score columns older anomaly runs merged into district_flows.csv; scores now
+# come from the district_anomalies.csv sidecar
+LEGACY_SCORE_COLUMNS = ['is_anomaly', 'anomaly_score', 'z_volume', 'z_distance']
+
+def prepare_flow_data(df):
+    df = df.drop(columns=LEGACY_SCORE_COLUMNS, errors='ignore')
+    df['date'] = pd.to_datetime(df['date'])
     
-    normalized = mapping.get(s, s)
+    # States are canonical from the ETL; the fixed dtype only integer-codes them
+    # (artifacts from older ETL runs may still hold unknown names, which become NaN)
+    df['source_state'] = coded_states(df['source_state'])
+    df['dest_state'] = coded_states(df['dest_state'])
+    df = df.dropna(subset=['source_state', 'dest_state'])
     
-    # Invalid constants/city names found in data
-    invalid = ['100000', 'Balanagar', 'Idpl Colony', 'Darbhanga', 'Jaipur', 'Nagpur', 'Puttenahalli', 'Madanapalle', 'Raja Annamalai Puram']
-    if normalized in invalid or normalized.isdigit():
-        return "Other"
-        
-    return normalized
+    return compact_frame(df)
 
-def load_data():
-    data_path = os.path.join(os.path.dirname(__file__), 'data/district_flows.csv')
-    if not os.path.exists(data_path):
-        return pd.DataFrame()
-    
-    df = pd.read_csv(data_path)
+# Activity view -> metric column, projected once at load time
+ACTIVITY_METRICS = {
+    "Total Updates": "total_updates",
+    "Biometric Updates": "biometric_updates",
+    "Demographic Updates": "demographic_updates",
+    "New Enrolments": "total_enrolments",
+}
+
+def add_metric_columns(df):
+    """Derives every activity metric once so tabs can read column views instead of copies."""
+    df['biometric_updates'] = df['bio_age_5_17'] + df['bio_age_17_']
+    df['demographic_updates'] = df['demo_age_5_17'] + df['demo_age_17_']
+    return df
+
+def prepare_india_data(df):
     df['date'] = pd.to_datetime(df['date'])
     
-    # Sanitization
-    df['source_state'] = df['source_state'].apply(normalize_state_name)
-    df['dest_state'] = df['dest_state'].apply(normalize_state_name)
+    # States are canonical from the ETL (see prepare_flow_data)
+    df['state'] = coded_states(df['state'])
+    df = df.dropna(subset=['state'])
     
-    # Filter out 'Other'
-    df = df[df['source_state'] != "Other"]
-    df = df[df['dest_state'] != "Other"]
+    # Derive metrics before compaction (counts stay at least int32 either way)
+    return compact_frame(add_metric_columns(df))
+
+# Every rerun opens each shared dataset (six of them), and a producer may publish a
+# new version while sessions still hold the old one, so keep room for two each;
+# fewer slots than datasets would evict and re-open on every rerun.
+SHARED_DATASET_CACHE_ENTRIES = 16
+
+@st.cache_resource(max_entries=SHARED_DATASET_CACHE_ENTRIES)
+def map_shared_dataset(name, version):
+    # cache_resource hands every session the same (read-only) object, and the
+    # object itself is a zero-copy view of the memory-mapped Arrow file.
+    return shared_data.open_dataset(name, version)
+
+def load_shared_dataset(name, filename, prepare):
+    """
+    Loads a normalized dataset shared by all worker processes. The first worker
+    to see a new artifact version normalizes and publishes it; every worker then
+    memory-maps the same published file.
+    """
+    # O(1) freshness check against the artifact manifest; the pinned snapshot
+    # is read, so a producer writing a new version mid-load can't mix versions
+    version = artifacts.current_version(filename, DATA_DIR)
+    if version is None:
+        return pd.DataFrame()
     
-    return df
+    # Published copies are compacted, so a compaction change needs fresh ones
+    shared_version = f"{version}-c{COMPACTION_VERSION}"
+    if shared_data.current_version(name) != shared_version:
+        shared_data.publish(name, prepare(artifacts.read_artifact(filename, version, DATA_DIR)), shared_version)
+    return map_shared_dataset(name, shared_version)
+
+def load_data():
+    return load_shared_dataset('district_flows', 'district_flows.csv', prepare_flow_data)
 
-@st.cache_data(ttl=3600)
 def load_india_data():
-    data_path = os.path.join(os.path.dirname(__file__), 'data/india_aggregated.csv')
-    if not os.path.exists(data_path):
-        return pd.DataFrame()
-    df = pd.read_csv(data_path)
+    return load_shared_dataset('india_aggregated', 'india_aggregated.csv', prepare_india_data)
+
+def prepare_anomaly_data(df):
     df['date'] = pd.to_datetime(df['date'])
-    
-    # Sanitization
-    df['state'] = df['state'].apply(normalize_state_name)
-    df = df[df['state'] != "Other"]
-    
-    return df
+    return compact_frame(df)
+
+def load_anomalies():
+    return load_shared_dataset('district_anomalies', 'district_anomalies.csv', prepare_anomaly_data)
+
+def prepare_sketch_data(df):
+    df['date'] = pd.to_datetime(df['date'])
+    return compact_frame(df)
+
+def load_corridor_sketches():
+    return load_shared_dataset('corridor_sketches', 'corridor_sketches.csv', prepare_sketch_data)
+
+def top_corridors(sketches, start_date, end_date, states, k=10):
+    """
+    Busiest corridors out of `states` in the date range, merged from the ETL's
+    per-day, per-state top-k corridor summaries (bounded size, no full groupby).
+    """
+    if sketches.empty or not states:
+        return pd.DataFrame()
+    mask = (sketches['date'] >= pd.to_datetime(start_date)) & (sketches['date'] <= pd.to_datetime(end_date))
+    mask &= sketches['scope'].isin(states)
+    return merge_truncated(sketches[mask], ['date', 'scope'], ['source_district', 'dest_district'], k=k)
+
+def load_distance_digests():
+    return load_shared_dataset('distance_digests', 'distance_digests.csv', prepare_sketch_data)
+
+def distance_quantiles(digests, start_date, end_date, states):
+    """
+    p50/p90/p99 migration distance (km) out of `states` in the date range, merged
+    from the ETL's per-day, per-district t-digests. Empty dict without data.
+    """
+    if digests.empty or not states:
+        return {}
+    mask = (digests['date'] >= pd.to_datetime(start_date)) & (digests['date'] <= pd.to_datetime(end_date))
+    mask &= digests['source_state'].isin(states)
+    if not mask.any():
+        return {}
+    merged = compress_digests(digests[mask].assign(selection=0), ['selection'], 'mean', 'weight')
+    quantiles = digest_quantiles(merged, ['selection'], {'p50': 0.5, 'p90': 0.9, 'p99': 0.99})
+    return quantiles[['p50', 'p90', 'p99']].iloc[0].to_dict()
+
+@st.cache_resource(max_entries=4)
+def map_npz_artifact(name, version):
+    # Read-only arrays shared by every session, like map_shared_dataset
+    return artifacts.read_npz_artifact(name, version, DATA_DIR)
+
+def load_matrices(name):
+    """Dense region x date matrices written by the ETL, or None if not built yet."""
+    version = artifacts.current_version(name, DATA_DIR)
+    return None if version is None else map_npz_artifact(name, version)
+
+# Comparison measure -> (matrix artifact, metric)
+COMPARE_MEASURES = {
+    **{view: ('pulse_matrices.npz', col) for view, col in ACTIVITY_METRICS.items()},
+    "Net Migration": ('migration_matrices.npz', 'net_migration'),
+}
+
+def date_columns(dates, start_date, end_date):
+    """[lo, hi) column range of a matrix's `dates` covering the date range."""
+    lo = np.searchsorted(dates, np.datetime64(start_date, 'D'))
+    hi = np.searchsorted(dates, np.datetime64(end_date, 'D'), side='right')
+    return lo, hi
+
+def rank_rows(matrix, rows, labels, lo, hi):
+    """
+    Ranking of the given matrix rows over columns [lo, hi), with the change
+    against the preceding period of the same length. Reads only those slices.
+    """
+    current = matrix[rows, lo:hi]
+    previous = matrix[rows, max(0, lo - (hi - lo)):lo].sum(axis=1, dtype=np.int64)
+    total = current.sum(axis=1, dtype=np.int64)
+    ranking = pd.DataFrame({
+        'region': labels[rows],
+        'total': total,
+        'daily_avg': total / (hi - lo),
+        'change_vs_prev': np.divide(total - previous, np.abs(previous), out=np.full(len(rows), np.nan),
+                                    where=previous != 0),
+    }).sort_values('total', ascending=False, kind='stable')
+    ranking.index = pd.RangeIndex(1, len(ranking) + 1, name='rank')
+    return ranking
+
+def prepare_narratives(df):
+    return df[['region_type', 'region', 'state', 'narrative']]
+
+def load_briefings():
+    """Per-region briefings cached by the batch job (src/models/narratives.py)."""
+    return load_shared_dataset('region_narratives', 'region_narratives.csv', prepare_narratives)
+
+# Activity view -> update types counted by the unique-residents KPI (None: all)
+ACTIVITY_UPDATE_TYPES = {
+    "Total Updates": None,
+    "Biometric Updates": ["Biometric"],
+    "Demographic Updates": ["Address", "Mobile", "Email", "DoB"],
+    "New Enrolments": None,
+}
+
+@st.cache_resource(max_entries=2)
+def map_resident_sketches(version):
+    sketches = artifacts.read_npz_artifact('unique_residents.npz', version, DATA_DIR)
+    # Per-cell labels, decoded once so filtering is a few vectorized comparisons
+    sketches['cell_date'] = sketches['cell_day'].astype('datetime64[D]')
+    sketches['cell_state'] = sketches['district_states'][sketches['cell_district']]
+    sketches['cell_update_type'] = sketches['update_types'][sketches['cell_type']]
+    return sketches
+
+def load_resident_sketches():
+    """The ETL's per-(day, district, update type) HyperLogLog sketches, or None if not built."""
+    version = artifacts.current_version('unique_residents.npz', DATA_DIR)
+    return None if version is None else map_resident_sketches(version)
+
+def unique_residents(sketches, start_date, end_date, states, update_types=None):
+    """
+    Estimated number of distinct residents (Aadhaar_IDs) with an update in the
+    date range and states, from the union of the matching cells' sketches.
+    """
+    if sketches is None or not states:
+        return 0.0
+    mask = (sketches['cell_date'] >= np.datetime64(start_date, 'D')) & (sketches['cell_date'] <= np.datetime64(end_date, 'D'))
+    mask &= np.isin(sketches['cell_state'], states)
+    if update_types is not None:
+        mask &= np.isin(sketches['cell_update_type'], update_types)
+    return union_count(sketches['pair_cell'], sketches['pair_register'], sketches['pair_rank'], mask,
+                       int(sketches['precision']))
+
+def pulse_mask(df, start_date, end_date, states):
+    """Rows of the pulse data in the date range and states (shared by the views and exports)."""
+    mask = (df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))
+    return mask & df['state'].isin(states)
+
+def flow_mask(df, start_date, end_date, states):
+    """Flows in the date range leaving or entering any of the states."""
+    mask = (df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))
+    return mask & (df['source_state'].isin(states) | df['dest_state'].isin(states))
+
+def with_anomalies(filtered_mig, df_anomalies):
+    """
+    Joins district-day anomaly scores onto the flows being shown. Flows without
+    a score are treated as normal; `anomaly_score` is only added when scores exist.
+    """
+    if df_anomalies.empty:
+        return filtered_mig.assign(is_anomaly=False)
+    score_cols = [c for c in ('is_anomaly', 'anomaly_score', 'p90_distance', 'p99_distance', 'z_volume', 'z_distance',
+                              'z_p99_distance') if c in df_anomalies.columns]
+    keys = filtered_mig[['date', 'source_district']].astype({'source_district': str})
+    scores = df_anomalies[['date', 'source_district'] + score_cols].astype({'source_district': str})
+    joined = keys.merge(scores, on=['date', 'source_district'], how='left')
+    joined.index = filtered_mig.index
+    joined['is_anomaly'] = joined['is_anomaly'].fillna(False).astype(bool)
+    return filtered_mig.assign(**{c: joined[c] for c in score_cols})
+
+@st.cache_resource
+def load_pincode_index():
+    """Spatial index over pincode centroids, built once per process."""
+    pincode_path = os.path.join(DATA_DIR, 'pincode_master.csv')
+    if not os.path.exists(pincode_path):
+        return None
+    from utils.geo_index import PincodeIndex
+    return PincodeIndex.from_csv(pincode_path)
 
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def get_system_location():
     """Fetch system's real geographical position based on IP."""
+    import requests
     try:
         response = requests.get("http://ip-api.com/json/", timeout=5)
         if response.status_code == 200:
@@ -172,6 +331,502 @@ def get_system_location():
     # Fallback to center of India if geolocation fails
     return 20.5937, 78.9629
 
+def resolve_map_style(map_style_option):
+    """Sidebar MapTiler key handling; returns the basemap style for the selected option."""
+    maptiler_api_key = os.environ.get("MAPTILER_API_KEY")
+    
+    if not maptiler_api_key:
+        if 'maptiler_key' not in st.session_state:
+            st.session_state.maptiler_key = ""
+        
+        user_key = st.text_input("MapTiler API Key", 
+                                 type="password", 
+                                 value=st.session_state.maptiler_key,
+                                 help="Enter your MapTiler API key for premium map styles.")
+        
+        if user_key:
+            st.session_state.maptiler_key = user_key
+            maptiler_api_key = user_key
+    
+    # Determine Map Style using MapTiler
+    if maptiler_api_key:
+        style_map = {
+            "Streets": f"https://api.maptiler.com/maps/streets/style.json?key={maptiler_api_key}",
+            "Dark": f"https://api.maptiler.com/maps/dataviz-dark/style.json?key={maptiler_api_key}",
+            "Satellite": f"https://api.maptiler.com/maps/satellite/style.json?key={maptiler_api_key}",
+            "Hybrid": f"https://api.maptiler.com/maps/hybrid/style.json?key={maptiler_api_key}",
+            "Topo": f"https://api.maptiler.com/maps/topo-v2/style.json?key={maptiler_api_key}",
+        }
+        return style_map.get(map_style_option, style_map["Dark"])
+
+    # Fallback to free CARTO style if no MapTiler key
+    st.warning("Add MapTiler API Key for premium map styles.")
+    return CARTO_DARK_STYLE
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def forecast_with_insights(daily_df, target_col, series_key):
+    """Cached Prophet forecast plus insights for a daily (date, volume) series."""
+    from models.forecast import get_forecast, generate_forecast_insights
+    forecast, model = get_forecast(daily_df, target_col='volume', series_key=series_key)
+    insights = generate_forecast_insights(forecast, model, daily_df, target_col)
+    return forecast, insights
+
+# Each tab renders inside its own fragment: widget interactions within a tab
+# (e.g. chat input) rerun only that tab, and closed tabs don't run at all.
+
+@st.fragment
+def render_map_tab(display_pulse_sampled, filtered_mig, metric_label, map_style, system_location, busiest):
+    st.markdown('<div class="map-header">🛰️ National Aadhaar Activity Map</div>', unsafe_allow_html=True)
+    
+    # Map Legend
+    st.markdown("""
+    <div class="legend-card">
+        <b>Legend:</b> <br/>
+        🔵 <b>Bubbles:</b> Local activity density (Size = Volume) <br/>
+        ⚡ <b>Arcs:</b> Inter-district migration (Color: <b>Cyan</b>=Normal, <b>Red</b>=Anomalous)
+    </div>
+    """, unsafe_allow_html=True)
+
+    if display_pulse_sampled.empty and filtered_mig.empty:
+        st.info("No data available for the selected filters.")
+        return
+
+    # Group Migration Arcs by Route
+    if not filtered_mig.empty:
+        route_mig = filtered_mig.groupby([
+            'source_district', 'dest_district', 'source_state', 'dest_state',
+            'source_lat', 'source_lon', 'dest_lat', 'dest_lon'
+        ], observed=True).agg({
+            'count': 'sum',
+            'is_anomaly': 'max'
+        }).reset_index()
+        route_mig = route_mig.rename(columns={'source_district': 'location', 'count': 'volume'})
+    else:
+        route_mig = pd.DataFrame()
+
+    # Pre-calculate radius for pulse (log scale for visibility)
+    import pydeck as pdk
+    if not display_pulse_sampled.empty:
+        # Use a slightly higher multiplier for better visibility of split metrics
+        display_pulse_sampled = display_pulse_sampled.assign(pulse_radius=np.log1p(display_pulse_sampled['volume']) * 3.5)
+
+    # --- Dynamic View State Calculation ---
+    if system_location:
+        center_lat, center_lon = system_location
+        zoom = 9 # Closer look if using system location
+    else:
+        # Calculate center from pulse data primarily
+        if not display_pulse_sampled.empty:
+            all_lats = display_pulse_sampled['latitude']
+            all_lons = display_pulse_sampled['longitude']
+        elif not filtered_mig.empty:
+            all_lats = pd.concat([filtered_mig['source_lat'], filtered_mig['dest_lat']])
+            all_lons = pd.concat([filtered_mig['source_lon'], filtered_mig['dest_lon']])
+        else:
+            all_lats, all_lons = pd.Series([20.5937]), pd.Series([78.9629])
+            
+        center_lat = all_lats.mean()
+        center_lon = all_lons.mean()
+        
+        # Calculate zoom based on data spread
+        lat_spread = all_lats.max() - all_lats.min()
+        lon_spread = all_lons.max() - all_lons.min()
+        max_spread = max(lat_spread, lon_spread)
+        
+        # Approximate zoom level
+        if max_spread < 2: zoom = 7
+        elif max_spread < 5: zoom = 6
+        elif max_spread < 10: zoom = 5
+        else: zoom = 4
+
+    # --- Layers ---
+    layers = []
+    
+    # 1. Pulse Scatterplot Layer
+    if not display_pulse_sampled.empty:
+        pulse_layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=display_pulse_sampled,
+            get_position=["longitude", "latitude"],
+            get_radius="pulse_radius", 
+            radius_units="pixels",
+            get_fill_color=[0, 255, 255, 120], # Cyan
+            radius_min_pixels=3,
+            radius_max_pixels=25,
+            pickable=True,
+            auto_highlight=True,
+        )
+        layers.append(pulse_layer)
+
+    # 2. Migration Arc Layer (using grouped route_mig)
+    if not route_mig.empty:
+        # Optimized arc colors
+        route_mig['arc_color_r'] = route_mig['is_anomaly'].apply(lambda x: 255 if x else 0)
+        route_mig['arc_color_g'] = route_mig['is_anomaly'].apply(lambda x: 100 if x else 255)
+        route_mig['arc_color_b'] = route_mig['is_anomaly'].apply(lambda x: 0 if x else 255)
+
+        arc_layer = pdk.Layer(
+            "ArcLayer",
+            data=route_mig,
+            get_source_position=["source_lon", "source_lat"],
+            get_target_position=["dest_lon", "dest_lat"],
+            get_source_color=[0, 255, 255, 120],  # Cyan start
+            get_target_color=["arc_color_r", "arc_color_g", "arc_color_b", 180],
+            get_width="2 + (volume / 20)", # Slightly thicker for visibility
+            pickable=True,
+            auto_highlight=True,
+        )
+        layers.append(arc_layer)
+    
+    tooltip_html = {
+        "html": f"<b>Location:</b> {{location}}<br/>"
+                f"<b>{metric_label}:</b> {{volume}} events",
+        "style": {"backgroundColor": "black", "color": "white"}
+    }
+
+    # --- View State (Dynamic) ---
+    view_state = pdk.ViewState(
+        latitude=center_lat,
+        longitude=center_lon,
+        zoom=zoom,
+        pitch=45,
+        bearing=0,
+    )
+    
+    # --- Render ---
+    deck_args = {
+        "map_style": map_style,
+        "initial_view_state": view_state,
+        "layers": layers,
+        "tooltip": tooltip_html
+    }
+
+    st.pydeck_chart(pdk.Deck(**deck_args))
+    
+    # Legend
+    st.markdown("""
+        <div style='text-align: center; color: #ccc; margin-top: 10px;'>
+            <span style='color: #00FFFF;'>●</span> District Activity (Size = Update Volume)
+        </div>
+    """, unsafe_allow_html=True)
+
+    if not busiest.empty:
+        with st.expander("🔥 Busiest Migration Corridors (from selected states)"):
+            st.dataframe(
+                busiest.assign(corridor=busiest['source_district'].astype(str) + " → " + busiest['dest_district'].astype(str))
+                       [['corridor', 'count', 'error']]
+                       .rename(columns={'count': 'migrations', 'error': '± error'}),
+                hide_index=True, use_container_width=True
+            )
+
+# Export dataset label -> (frame key, row filter)
+EXPORT_DATASETS = {
+    "Migration flows": ('flows', flow_mask),
+    "Activity (pulse)": ('pulse', pulse_mask),
+}
+
+@st.cache_resource
+def export_manager():
+    """One background export pool per process, shared by all sessions."""
+    from utils.export import ExportManager
+    return ExportManager()
+
+@st.fragment(run_every=1.0)
+def poll_export(job_id):
+    job = export_manager().status(job_id)
+    if job is None or job['state'] in ('done', 'failed'):
+        # Full rerun renders the result; polling stops with it
+        st.rerun()
+    st.caption(f"⏳ Exporting... {job['rows']:,} rows written")
+
+def render_export_controls(frames, start_date, end_date, states):
+    """
+    Sidebar export of the current selection. The file is written in chunks on a
+    background thread; the session only polls the job and serves the finished file.
+    """
+    from pathlib import Path
+    from utils.export import EXPORT_FORMATS
+    with st.sidebar.expander("📥 Export Filtered Data", expanded=False):
+        dataset = st.selectbox("Dataset", list(EXPORT_DATASETS), key="export_dataset")
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+        if st.button("Start export", disabled=not states, key="export_start"):
+            key, mask = EXPORT_DATASETS[dataset]
+            states = list(states)
+            file_name = f"aadhaar_{key}_{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+            st.session_state.export_job = export_manager().submit(
+                frames[key], lambda chunk: mask(chunk, start_date, end_date, states), file_name, fmt
+            )
+
+        job_id = st.session_state.get('export_job')
+        job = export_manager().status(job_id) if job_id else None
+        if job is None:
+            return
+        if job['state'] in ('queued', 'running'):
+            poll_export(job_id)
+        elif job['state'] == 'failed':
+            st.error(f"Export failed: {job['error']}")
+        elif os.path.exists(job['path']):
+            size_mb = os.path.getsize(job['path']) / 1e6
+            st.caption(f"✅ {job['rows']:,} rows, {size_mb:,.1f} MB in {job['seconds']:.1f}s")
+            # Deferred: the file is only read when the button is clicked
+            st.download_button("Download", data=Path(job['path']).read_bytes,
+                               file_name=job['file_name'], mime=job['mime'], key="export_download")
+
+@st.fragment
+def render_trends_tab(filtered_pulse, metric_col, metric_label):
+    import plotly.express as px
+    st.subheader("Aadhaar Activity Trends")
+    if not filtered_pulse.empty:
+        trend_data = filtered_pulse.groupby('date')[metric_col].sum().rename('volume').reset_index()
+        fig = px.line(trend_data, x='date', y='volume', 
+                     title=f"National {metric_label} Over Time",
+                     labels={'volume': 'Events', 'date': 'Date'})
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def render_compare_tab(activity_view, states, start_date, end_date):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    st.subheader("Compare States")
+    measures = list(COMPARE_MEASURES)
+    measure = st.radio("Measure", measures, index=measures.index(activity_view), horizontal=True, key="compare_measure")
+    artifact, metric = COMPARE_MEASURES[measure]
+    matrices = load_matrices(artifact)
+    if matrices is None:
+        script = 'india_data_processor.py' if artifact == 'pulse_matrices.npz' else 'aggregator.py'
+        st.info(f"Comparison data not found. Run `python src/processing/{script}` first.")
+        return
+
+    lo, hi = date_columns(matrices['dates'], start_date, end_date)
+    rows = np.flatnonzero(np.isin(matrices['states'], states))
+    if hi <= lo or not len(rows):
+        st.info("No comparison data for the selected states and dates.")
+        return
+
+    # Rankings and charts read row/column slices of the stored matrices directly
+    ranking = rank_rows(matrices[f'state_{metric}'], rows, matrices['states'], lo, hi)
+    district_rows = np.flatnonzero(np.isin(matrices['district_states'], states))
+    districts = rank_rows(matrices[f'district_{metric}'], district_rows, matrices['districts'], lo, hi).head(10)
+
+    column_config = {
+        'region': st.column_config.TextColumn("Region"),
+        'total': st.column_config.NumberColumn("Total", format="localized"),
+        'daily_avg': st.column_config.NumberColumn("Daily avg", format="%.1f"),
+        'change_vs_prev': st.column_config.NumberColumn("vs. previous period", format="percent"),
+    }
+    col_states, col_districts = st.columns(2)
+    col_states.markdown(f"#### {measure} by State")
+    col_states.dataframe(ranking, column_config=column_config, use_container_width=True)
+    col_districts.markdown("#### Top Districts")
+    col_districts.dataframe(districts, column_config=column_config, use_container_width=True)
+
+    # Small multiples in ranking order, one panel per state on a shared y-axis
+    order = rows[np.argsort(-matrices[f'state_{metric}'][rows, lo:hi].sum(axis=1), kind='stable')]
+    n_cols = min(3, len(order))
+    n_rows = -(-len(order) // n_cols)
+    fig = make_subplots(rows=n_rows, cols=n_cols, shared_xaxes=True, shared_yaxes=True,
+                        subplot_titles=list(matrices['states'][order]), vertical_spacing=0.12 / n_rows)
+    dates = matrices['dates'][lo:hi]
+    for i, row in enumerate(order):
+        fig.add_trace(go.Scatter(x=dates, y=matrices[f'state_{metric}'][row, lo:hi], mode='lines',
+                                 name=str(matrices['states'][row]), showlegend=False),
+                      row=i // n_cols + 1, col=i % n_cols + 1)
+    fig.update_layout(height=220 * n_rows, margin=dict(t=40, b=20, l=20, r=20))
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def render_anomalies_tab(filtered_mig, distances):
+    st.subheader("Detected Anomalies")
+    if distances:
+        st.caption(f"📏 Migration distance in selection: p50 **{distances['p50']:,.0f} km** · "
+                   f"p90 **{distances['p90']:,.0f} km** · p99 **{distances['p99']:,.0f} km**")
+    # Scores are joined from the anomaly sidecar (see with_anomalies)
+    if 'anomaly_score' in filtered_mig.columns:
+        anomalies = filtered_mig[filtered_mig['is_anomaly']]
+        if not anomalies.empty:
+            st.error(f"⚠️ Detected {len(anomalies)} potential anomalous migration events.")
+            detail_cols = [c for c in ('p90_distance', 'p99_distance', 'z_volume', 'z_distance', 'z_p99_distance')
+                           if c in anomalies.columns]
+            st.dataframe(
+                # Lower score = more anomalous
+                anomalies[['date', 'source_district', 'dest_district', 'count', 'anomaly_score'] + detail_cols].sort_values('anomaly_score'),
+                use_container_width=True
+            )
+        else:
+            st.success("No critical migration anomalies detected.")
+    else:
+        st.info("Anomaly detection is scanning migration flows...")
+
+@st.fragment
+def render_predictions_tab(filtered_pulse, metric_col, activity_view, selected_states):
+    import plotly.graph_objects as go
+    st.subheader("🔮 Predictive Analytics & AI Insights")
+    st.markdown("""
+        This module uses **Prophet Time-Series models** to analyze historical enrollment and update patterns 
+        to project future trends and provide actionable insights.
+    """)
+    
+    if not filtered_pulse.empty:
+        # Series name for insights and warm starts, e.g. "New Enrolments" -> "new_enrolments"
+        target_col = activity_view.lower().replace(" ", "_")
+
+        # Historical data (also the forecast input, so the cache key stays small)
+        daily = filtered_pulse.groupby('date')[metric_col].sum().rename('volume').reset_index()
+
+        with st.spinner(f"Analyzing trends for {activity_view}..."):
+            series_key = f"dashboard:{target_col}:{'|'.join(sorted(selected_states))}"
+            forecast, insights = forecast_with_insights(daily, target_col, series_key)
+        
+        if not forecast.empty:
+            # Layout for Forecast Chart and Analysis
+            col_chart, col_insights = st.columns([2, 1])
+            
+            with col_chart:
+                st.markdown(f"#### {activity_view} Forecast (Next 30 Days)")
+                
+                # Create a combined chart with historical and forecast
+                hist_data = daily.rename(columns={'date': 'ds', 'volume': 'y'})
+                
+                fig_pred = go.Figure()
+                
+                # Confidence Interval (Shaded area)
+                fig_pred.add_trace(go.Scatter(
+                    x=pd.concat([forecast['ds'], forecast['ds'][::-1]]),
+                    y=pd.concat([forecast['yhat_upper'], forecast['yhat_lower'][::-1]]),
+                    fill='toself',
+                    fillcolor='rgba(0, 255, 255, 0.1)',
+                    line=dict(color='rgba(255,255,255,0)'),
+                    hoverinfo="skip",
+                    showlegend=True,
+                    name="Confidence Interval"
+                ))
+                
+                # Predicted line
+                fig_pred.add_trace(go.Scatter(
+                    x=forecast['ds'], y=forecast['yhat'],
+                    name="Predicted",
+                    line=dict(color='cyan', width=2, dash='dash')
+                ))
+                
+                # Historical line
+                fig_pred.add_trace(go.Scatter(
+                    x=hist_data['ds'], y=hist_data['y'],
+                    name="Historical",
+                    line=dict(color='#ff4b4b', width=2)
+                ))
+                
+                fig_pred.update_layout(
+                    template='plotly_dark',
+                    xaxis_title="Date",
+                    yaxis_title="Volume",
+                    hovermode="x unified",
+                    margin=dict(l=0, r=0, t=20, b=0),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                )
+                st.plotly_chart(fig_pred, use_container_width=True)
+            
+            with col_insights:
+                st.markdown("#### 📝 Detailed Analysis")
+                
+                for insight in insights:
+                    st.markdown(f"🔹 {insight}")
+                
+                st.info("💡 **Planning Tip:** Use these projections to optimize resource allocation at Aadhaar centers during predicted peak periods.")
+        else:
+            st.warning("Not enough historical data in the selected range to generate a reliable forecast. Try selecting a broader date range or more states.")
+    else:
+        st.info("Please select data filters to see predictions.")
+
+def render_briefings(briefings, states):
+    """Pre-generated state briefings for the selection; no LLM call at display time."""
+    if briefings.empty:
+        st.caption("📰 No regional briefings yet. Generate them with `python src/models/narratives.py`.")
+        return
+    selected = briefings[(briefings['region_type'] == 'state') & briefings['region'].isin(states)]
+    with st.expander(f"📰 Regional Briefings ({len(selected)})", expanded=False):
+        for row in selected.itertuples(index=False):
+            st.markdown(f"**{row.region}**")
+            st.markdown(row.narrative)
+
+@st.fragment
+def render_ai_tab(context_summary, ai_provider, ollama_url, groq_key, briefings):
+    from utils.ollama_client import HybridAIClient
+    st.subheader("🤖 Aadhaar AI Assistant")
+    st.markdown("""
+        Ask questions about current trends, anomalies, or general Aadhaar statistics. 
+        The assistant has access to the **currently filtered data** context.
+    """)
+    render_briefings(briefings, context_summary['states'])
+
+    # Initialize Hybrid Chatbot
+    ai_client = HybridAIClient(base_url=ollama_url, groq_api_key=groq_key)
+    provider_slug = "ollama" if ai_provider == "Local Ollama" else "groq"
+    
+    system_prompt = f"""
+    You are the Aadhaar Pulse AI, a specialist in analyzing Aadhaar demographic and enrollment data.
+    You are helping a government official understand the data displayed on their dashboard.
+    
+    Current Dashboard Context:
+    - Analyzing: {context_summary['view']}
+    - Selected States: {', '.join(context_summary['states'])}
+    - Date Range: {context_summary['date_range'][0]} to {context_summary['date_range'][1]}
+    - Overall Stats for current filters:
+        * Total {context_summary['view']} volume: {context_summary['total_volume']:,}
+        * Total Enrolments: {context_summary['enrolments']:,}
+        * Migration Flows: {context_summary['migrations']:,}
+        * Top Districts (by volume): {', '.join([f"{k} ({v:,.0f})" for k, v in context_summary['top_districts'].items()])}
+        * Busiest Migration Corridors: {', '.join([f"{k} ({v:,.0f})" for k, v in context_summary['top_corridors'].items()]) or 'n/a'}
+    
+    Provide concise, data-driven answers. If the data doesn't support a specific claim, be honest.
+    Use Markdown formatting for better readability.
+    """
+
+    # Chat interface
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+
+    # Display history
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+    # Chat input
+    if prompt := st.chat_input("Ask about the data..."):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        with st.chat_message("assistant"):
+            message_placeholder = st.empty()
+            full_response = ""
+            
+            # Prepare messages for Ollama (System + Chat History)
+            ollama_messages = [{"role": "system", "content": system_prompt}]
+            ollama_messages.extend([
+                {"role": m["role"], "content": m["content"]}
+                for m in st.session_state.messages[-5:] # Last 5 turns for context
+            ])
+            
+            with st.spinner("Analyzing..."):
+                # Use streaming for better UX
+                response_gen = ai_client.chat(ollama_messages, stream=True, provider=provider_slug)
+                
+                if isinstance(response_gen, str) and response_gen.startswith("Error:"):
+                    if provider_slug == "ollama":
+                        st.error("⚠️ **Ollama AI is offline.**")
+                        st.info("Switch to **Cloud AI (Groq)** in the sidebar for multi-device support.")
+                    else:
+                        st.error(f"⚠️ **AI Error:** {response_gen}")
+                    full_response = response_gen
+                else:
+                    for chunk in response_gen:
+                        full_response += chunk
+                        message_placeholder.markdown(full_response + "▌")
+                    message_placeholder.markdown(full_response)
+            
+        if not full_response.startswith("Error:"):
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+
 def main():
     st.markdown('<div style="display: flex; align-items: center; justify-content: space-between;">'
                 '<h1 style="margin: 0;">🇮🇳 Aadhaar Pulse: Unified View</h1>'
@@ -182,6 +837,10 @@ def main():
     # Load unified India data
     df_pulse = load_india_data()
     df_migration = load_data()
+    df_anomalies = load_anomalies()
+    corridor_sketches = load_corridor_sketches()
+    distance_digests = load_distance_digests()
+    resident_sketches = load_resident_sketches()
     
     if df_pulse.empty:
         st.error("India data not found! Please run `python3 src/processing/india_data_processor.py` first.")
@@ -221,14 +880,28 @@ def main():
     
     with st.sidebar.expander("⚙️ Advanced Map Settings", expanded=False):
         use_system_loc = st.checkbox("Use System Location", value=False, help="Center map on your current real location")
-        map_style_option = st.selectbox("Map Style", ["Streets", "Dark", "Satellite", "Hybrid", "Topo"], index=1)
+        system_location = None
+        nearest_state = None
+        if use_system_loc:
+            system_location = get_system_location()
+            pincode_index = load_pincode_index()
+            if pincode_index is not None:
+                nearest_district, nearest_state, distance_km = pincode_index.nearest_district(*system_location)
+                st.caption(f"📍 Nearest district: **{nearest_district}**, {nearest_state} ({distance_km:,.0f} km)")
+        map_style_option = st.selectbox("Map Style", ["Streets", "Dark", "Satellite", "Hybrid", "Topo"], index=0,
+                                        help="Choose the map background style")
+        map_style = resolve_map_style(map_style_option)
     
+    # Auto-select the state of the user's nearest district
+    if nearest_state in all_states and nearest_state not in selected_states:
+        selected_states = selected_states + [nearest_state]
+
     with st.sidebar.expander("🤖 AI Assistant Settings", expanded=False):
         ai_provider = st.radio("AI Provider", ["Local Ollama", "Cloud AI (Groq)"], index=0)
         
         if ai_provider == "Local Ollama":
             st.markdown("Expose port 11434 via ngrok for multi-device access.")
-            ollama_url = st.text_input("Ollama API URL", value="http://localhost:11434")
+            ollama_url = st.text_input("Ollama API URL", value=os.environ.get("OLLAMA_URL", "http://localhost:11434"))
             groq_key = None
         else:
             st.markdown("Works on all devices. No local setup needed.")
@@ -239,6 +912,10 @@ def main():
                 help="Get at console.groq.com"
             )
             ollama_url = "http://localhost:11434"
+
+        if st.button("Clear Chat History", key="clear_chat"):
+            st.session_state.messages = []
+            st.rerun()
     
     # Activity View Selection
     st.sidebar.markdown("---")
@@ -257,63 +934,41 @@ def main():
         4. **Hover on Arcs** to see migration paths.
         """)
     
+    render_export_controls({'pulse': df_pulse, 'flows': df_migration}, start_date, end_date, selected_states)
+
     # Filter Data (Only if states are selected)
     if selected_states:
-        mask_pulse = (df_pulse['date'] >= pd.to_datetime(start_date)) & (df_pulse['date'] <= pd.to_datetime(end_date))
-        mask_pulse = mask_pulse & (df_pulse['state'].isin(selected_states))
-        filtered_pulse = df_pulse[mask_pulse]
-        
-        mask_mig = (df_migration['date'] >= pd.to_datetime(start_date)) & (df_migration['date'] <= pd.to_datetime(end_date))
-        mask_mig = mask_mig & (df_migration['source_state'].isin(selected_states) | df_migration['dest_state'].isin(selected_states))
-        filtered_mig = df_migration[mask_mig]
+        filtered_pulse = df_pulse[pulse_mask(df_pulse, start_date, end_date, selected_states)]
+        filtered_mig = with_anomalies(df_migration[flow_mask(df_migration, start_date, end_date, selected_states)],
+                                      df_anomalies)
     else:
         filtered_pulse = pd.DataFrame(columns=df_pulse.columns)
-        filtered_mig = pd.DataFrame(columns=df_migration.columns)
+        filtered_mig = with_anomalies(pd.DataFrame(columns=df_migration.columns), df_anomalies)
         st.info("💡 Please select one or more states from the sidebar to visualize national activity and migration flows.")
 
-    # Sample data if too large
-    MAX_DISPLAY_ROWS = 3000
-    if len(filtered_pulse) > MAX_DISPLAY_ROWS:
-        display_pulse_sampled = filtered_pulse.sample(n=MAX_DISPLAY_ROWS, random_state=42)
-        st.sidebar.warning(f"Displaying a sample of {MAX_DISPLAY_ROWS:,} activity points.")
-    else:
-        display_pulse_sampled = filtered_pulse.copy()
-
     # Mapping logic for selected activity
     metric_label = activity_view
-    if not display_pulse_sampled.empty:
-        if activity_view == "Biometric Updates":
-            display_pulse_sampled['volume'] = display_pulse_sampled['bio_age_5_17'] + display_pulse_sampled['bio_age_17_']
-        elif activity_view == "Demographic Updates":
-            display_pulse_sampled['volume'] = display_pulse_sampled['demo_age_5_17'] + display_pulse_sampled['demo_age_17_']
-        elif activity_view == "New Enrolments":
-            display_pulse_sampled['volume'] = display_pulse_sampled['total_enrolments']
-        else:
-            display_pulse_sampled['volume'] = display_pulse_sampled['total_updates']
-    else:
-        display_pulse_sampled['volume'] = pd.Series(dtype='float64')
+    metric_col = ACTIVITY_METRICS[activity_view]
 
-    # Final rename for tooltip consistency
-    display_pulse_sampled = display_pulse_sampled.rename(columns={'district': 'location'})
-    
-    # Group Migration Arcs by Route
-    if not filtered_mig.empty:
-        route_mig = filtered_mig.groupby([
-            'source_district', 'dest_district', 'source_state', 'dest_state',
-            'source_lat', 'source_lon', 'dest_lat', 'dest_lon'
-        ]).agg({
-            'count': 'sum',
-            'is_anomaly': 'max'
-        }).reset_index()
-        route_mig = route_mig.rename(columns={'source_district': 'location', 'count': 'volume'})
+    # Narrow projection for the map: only the columns the layers and tooltip need
+    display_pulse = filtered_pulse[['district', 'latitude', 'longitude', metric_col]].rename(
+        columns={'district': 'location', metric_col: 'volume'}
+    )
+
+    # Sample data if too large
+    MAX_DISPLAY_ROWS = 3000
+    if len(display_pulse) > MAX_DISPLAY_ROWS:
+        display_pulse_sampled = display_pulse.sample(n=MAX_DISPLAY_ROWS, random_state=42)
+        st.sidebar.warning(f"Displaying a sample of {MAX_DISPLAY_ROWS:,} activity points.")
     else:
-        route_mig = pd.DataFrame()
+        display_pulse_sampled = display_pulse
 
     # KPIs
     st.markdown("### 📊 Live Performance Summary")
-    c1, c2, c3 = st.columns(3)
+    kpi_cols = st.columns(3 if resident_sketches is None else 4)
+    c1, c2, c3 = kpi_cols[:3]
     # Calculate volume sum for the selected view
-    view_total = display_pulse_sampled['volume'].sum() if not display_pulse_sampled.empty else 0
+    view_total = filtered_pulse[metric_col].sum() if not filtered_pulse.empty else 0
     total_enr = filtered_pulse['total_enrolments'].sum() if not filtered_pulse.empty else 0
     total_mig = filtered_mig['count'].sum() if not filtered_mig.empty else 0
     
@@ -321,392 +976,56 @@ def main():
     c1.metric(f"Active View: {metric_label}", f"{view_total:,.0f}")
     c2.metric("Total Enrolments (Pan-India)", f"{total_enr:,.0f}")
     c3.metric("Migrations Tracked", f"{total_mig:,.0f}")
+    if resident_sketches is not None:
+        residents = unique_residents(resident_sketches, start_date, end_date, selected_states,
+                                     ACTIVITY_UPDATE_TYPES[activity_view])
+        kpi_cols[3].metric("Unique Residents (est.)", f"{residents:,.0f}",
+                           help="Distinct Aadhaar IDs with an update in the selection (HyperLogLog estimate, ~2% error)")
 
-    # Tabs
-    tab_map, tab_trends, tab_anomalies, tab_predictions, tab_ai = st.tabs([
-        "Live Map", "Trends", "Anomalies", "Predictions", "AI Assistant 🤖"
-    ])
+    # Tabs: only the selected tab's content is computed (on_change="rerun" tracks it)
+    tab_map, tab_trends, tab_compare, tab_anomalies, tab_predictions, tab_ai = st.tabs([
+        "Live Map", "Trends", "Compare", "Anomalies", "Predictions", "AI Assistant 🤖"
+    ], key="active_tab", on_change="rerun")
 
     with tab_map:
-        st.markdown('<div class="map-header">🛰️ National Aadhaar Activity Map</div>', unsafe_allow_html=True)
-        
-        # Map Legend
-        st.markdown("""
-        <div class="legend-card">
-            <b>Legend:</b> <br/>
-            🔵 <b>Bubbles:</b> Local activity density (Size = Volume) <br/>
-            ⚡ <b>Arcs:</b> Inter-district migration (Color: <b>Cyan</b>=Normal, <b>Red</b>=Anomalous)
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # --- MapTiler Configuration ---
-        maptiler_api_key = os.environ.get("MAPTILER_API_KEY")
-        
-        if not maptiler_api_key:
-            if 'maptiler_key' not in st.session_state:
-                st.session_state.maptiler_key = ""
-            
-            user_key = st.sidebar.text_input("MapTiler API Key", 
-                                           type="password", 
-                                           value=st.session_state.maptiler_key,
-                                           help="Enter your MapTiler API key for premium map styles.")
-            
-            if user_key:
-                st.session_state.maptiler_key = user_key
-                maptiler_api_key = user_key
-        
-        # --- Map Style Options ---
-        map_style_option = st.sidebar.selectbox(
-            "Map Style",
-            ["Streets", "Dark", "Satellite", "Hybrid", "Topo"],
-            index=0,
-            help="Choose the map background style"
-        )
-        
-        # Determine Map Style using MapTiler
-        if maptiler_api_key:
-            style_map = {
-                "Streets": f"https://api.maptiler.com/maps/streets/style.json?key={maptiler_api_key}",
-                "Dark": f"https://api.maptiler.com/maps/dataviz-dark/style.json?key={maptiler_api_key}",
-                "Satellite": f"https://api.maptiler.com/maps/satellite/style.json?key={maptiler_api_key}",
-                "Hybrid": f"https://api.maptiler.com/maps/hybrid/style.json?key={maptiler_api_key}",
-                "Topo": f"https://api.maptiler.com/maps/topo-v2/style.json?key={maptiler_api_key}",
-            }
-            map_style = style_map.get(map_style_option, style_map["Dark"])
-        else:
-            # Fallback to free CARTO style if no MapTiler key
-            map_style = pdk.map_styles.CARTO_DARK
-            st.sidebar.warning("Add MapTiler API Key for premium map styles.")
-
-        if not filtered_pulse.empty or not filtered_mig.empty:
-            # Pre-calculate radius for pulse (log scale for visibility)
-            import numpy as np
-            if not display_pulse_sampled.empty:
-                # Use a slightly higher multiplier for better visibility of split metrics
-                display_pulse_sampled['pulse_radius'] = np.log1p(display_pulse_sampled['volume']) * 3.5
-            else:
-                display_pulse_sampled['pulse_radius'] = 0
-
-            # --- Dynamic View State Calculation ---
-            if use_system_loc:
-                center_lat, center_lon = get_system_location()
-                zoom = 9 # Closer look if using system location
-            else:
-                # Calculate center from pulse data primarily
-                if not display_pulse_sampled.empty:
-                    all_lats = display_pulse_sampled['latitude']
-                    all_lons = display_pulse_sampled['longitude']
-                elif not filtered_mig.empty:
-                    all_lats = pd.concat([filtered_mig['source_lat'], filtered_mig['dest_lat']])
-                    all_lons = pd.concat([filtered_mig['source_lon'], filtered_mig['dest_lon']])
-                else:
-                    all_lats, all_lons = pd.Series([20.5937]), pd.Series([78.9629])
-                    
-                center_lat = all_lats.mean()
-                center_lon = all_lons.mean()
-                
-                # Calculate zoom based on data spread
-                lat_spread = all_lats.max() - all_lats.min()
-                lon_spread = all_lons.max() - all_lons.min()
-                max_spread = max(lat_spread, lon_spread)
-                
-                # Approximate zoom level
-                if max_spread < 2: zoom = 7
-                elif max_spread < 5: zoom = 6
-                elif max_spread < 10: zoom = 5
-                else: zoom = 4
-
-            # --- Layers ---
-            layers = []
-            
-            # 1. Pulse Scatterplot Layer
-            if not display_pulse_sampled.empty:
-                pulse_layer = pdk.Layer(
-                    "ScatterplotLayer",
-                    data=display_pulse_sampled,
-                    get_position=["longitude", "latitude"],
-                    get_radius="pulse_radius", 
-                    radius_units="pixels",
-                    get_fill_color=[0, 255, 255, 120], # Cyan
-                    radius_min_pixels=3,
-                    radius_max_pixels=25,
-                    pickable=True,
-                    auto_highlight=True,
-                )
-                layers.append(pulse_layer)
-
-            # 2. Migration Arc Layer (using grouped route_mig)
-            if not route_mig.empty:
-                # Optimized arc colors
-                route_mig['arc_color_r'] = route_mig['is_anomaly'].apply(lambda x: 255 if x else 0)
-                route_mig['arc_color_g'] = route_mig['is_anomaly'].apply(lambda x: 100 if x else 255)
-                route_mig['arc_color_b'] = route_mig['is_anomaly'].apply(lambda x: 0 if x else 255)
-
-                arc_layer = pdk.Layer(
-                    "ArcLayer",
-                    data=route_mig,
-                    get_source_position=["source_lon", "source_lat"],
-                    get_target_position=["dest_lon", "dest_lat"],
-                    get_source_color=[0, 255, 255, 120],  # Cyan start
-                    get_target_color=["arc_color_r", "arc_color_g", "arc_color_b", 180],
-                    get_width="2 + (volume / 20)", # Slightly thicker for visibility
-                    pickable=True,
-                    auto_highlight=True,
-                )
-                layers.append(arc_layer)
-            
-            tooltip_html = {
-                "html": f"<b>Location:</b> {{location}}<br/>"
-                        f"<b>{metric_label}:</b> {{volume}} events",
-                "style": {"backgroundColor": "black", "color": "white"}
-            }
-
-            # --- View State (Dynamic) ---
-            view_state = pdk.ViewState(
-                latitude=center_lat,
-                longitude=center_lon,
-                zoom=zoom,
-                pitch=45,
-                bearing=0,
-            )
-            
-            # --- Render ---
-            deck_args = {
-                "map_style": map_style,
-                "initial_view_state": view_state,
-                "layers": layers,
-                "tooltip": tooltip_html
-            }
-
-            st.pydeck_chart(pdk.Deck(**deck_args))
-            
-            # Legend
-            st.markdown("""
-                <div style='text-align: center; color: #ccc; margin-top: 10px;'>
-                    <span style='color: #00FFFF;'>●</span> District Activity (Size = Update Volume)
-                </div>
-            """, unsafe_allow_html=True)
-            
-        else:
-            st.info("No data available for the selected filters.")
+        if tab_map.open:
+            busiest = top_corridors(corridor_sketches, start_date, end_date, selected_states)
+            render_map_tab(display_pulse_sampled, filtered_mig, metric_label, map_style, system_location, busiest)
 
     with tab_trends:
-        st.subheader("Aadhaar Activity Trends")
-        if not filtered_pulse.empty:
-            # We need to apply the same metric logic to the trend data
-            pulse_trend = filtered_pulse.copy()
-            if activity_view == "Biometric Updates":
-                pulse_trend['volume'] = pulse_trend['bio_age_5_17'] + pulse_trend['bio_age_17_']
-            elif activity_view == "Demographic Updates":
-                pulse_trend['volume'] = pulse_trend['demo_age_5_17'] + pulse_trend['demo_age_17_']
-            elif activity_view == "New Enrolments":
-                pulse_trend['volume'] = pulse_trend['total_enrolments']
-            else:
-                pulse_trend['volume'] = pulse_trend['total_updates']
-
-            trend_data = pulse_trend.groupby('date')['volume'].sum().reset_index()
-            fig = px.line(trend_data, x='date', y='volume', 
-                         title=f"National {metric_label} Over Time",
-                         labels={'volume': 'Events', 'date': 'Date'})
-            st.plotly_chart(fig, use_container_width=True)
+        if tab_trends.open:
+            render_trends_tab(filtered_pulse, metric_col, metric_label)
+
+    with tab_compare:
+        if tab_compare.open:
+            render_compare_tab(activity_view, selected_states, start_date, end_date)
 
     with tab_anomalies:
-        st.subheader("Detected Anomalies")
-        # Check both datasets for anomalies
-        anomalous_events = []
-        if 'is_anomaly' in filtered_mig.columns:
-            anomalies = filtered_mig[filtered_mig['is_anomaly']]
-            if not anomalies.empty:
-                st.error(f"⚠️ Detected {len(anomalies)} potential anomalous migration events.")
-                st.dataframe(
-                    anomalies[['date', 'source_district', 'dest_district', 'count', 'anomaly_score']].sort_values('anomaly_score', ascending=False),
-                    use_container_width=True
-                )
-            else:
-                st.success("No critical migration anomalies detected.")
-        else:
-            st.info("Anomaly detection is scanning migration flows...")
+        if tab_anomalies.open:
+            render_anomalies_tab(filtered_mig, distance_quantiles(distance_digests, start_date, end_date, selected_states))
 
     with tab_predictions:
-        st.subheader("🔮 Predictive Analytics & AI Insights")
-        st.markdown("""
-            This module uses **Prophet Time-Series models** to analyze historical enrollment and update patterns 
-            to project future trends and provide actionable insights.
-        """)
-        
-        if not filtered_pulse.empty:
-            # Prepare data for forecast based on selected metric
-            df_for_pred = filtered_pulse.copy()
-            target_col = 'total_updates' # Default
-            
-            if activity_view == "Biometric Updates":
-                df_for_pred['volume'] = df_for_pred['bio_age_5_17'] + df_for_pred['bio_age_17_']
-                target_col = 'biometric_updates'
-            elif activity_view == "Demographic Updates":
-                df_for_pred['volume'] = df_for_pred['demo_age_5_17'] + df_for_pred['demo_age_17_']
-                target_col = 'demographic_updates'
-            elif activity_view == "New Enrolments":
-                df_for_pred['volume'] = df_for_pred['total_enrolments']
-                target_col = 'new_enrolments'
-            else:
-                df_for_pred['volume'] = df_for_pred['total_updates']
-                target_col = 'total_updates'
-
-            with st.spinner(f"Analyzing trends for {activity_view}..."):
-                forecast, model = get_forecast(df_for_pred, target_col='volume')
-            
-            if not forecast.empty:
-                # Layout for Forecast Chart and Analysis
-                col_chart, col_insights = st.columns([2, 1])
-                
-                with col_chart:
-                    st.markdown(f"#### {activity_view} Forecast (Next 30 Days)")
-                    
-                    # Create a combined chart with historical and forecast
-                    # Historical data
-                    hist_data = df_for_pred.groupby('date')['volume'].sum().reset_index()
-                    hist_data.rename(columns={'date': 'ds', 'volume': 'y'}, inplace=True)
-                    
-                    fig_pred = go.Figure()
-                    
-                    # Confidence Interval (Shaded area)
-                    fig_pred.add_trace(go.Scatter(
-                        x=pd.concat([forecast['ds'], forecast['ds'][::-1]]),
-                        y=pd.concat([forecast['yhat_upper'], forecast['yhat_lower'][::-1]]),
-                        fill='toself',
-                        fillcolor='rgba(0, 255, 255, 0.1)',
-                        line=dict(color='rgba(255,255,255,0)'),
-                        hoverinfo="skip",
-                        showlegend=True,
-                        name="Confidence Interval"
-                    ))
-                    
-                    # Predicted line
-                    fig_pred.add_trace(go.Scatter(
-                        x=forecast['ds'], y=forecast['yhat'],
-                        name="Predicted",
-                        line=dict(color='cyan', width=2, dash='dash')
-                    ))
-                    
-                    # Historical line
-                    fig_pred.add_trace(go.Scatter(
-                        x=hist_data['ds'], y=hist_data['y'],
-                        name="Historical",
-                        line=dict(color='#ff4b4b', width=2)
-                    ))
-                    
-                    fig_pred.update_layout(
-                        template='plotly_dark',
-                        xaxis_title="Date",
-                        yaxis_title="Volume",
-                        hovermode="x unified",
-                        margin=dict(l=0, r=0, t=20, b=0),
-                        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                    )
-                    st.plotly_chart(fig_pred, use_container_width=True)
-                
-                with col_insights:
-                    st.markdown("#### 📝 Detailed Analysis")
-                    insights = generate_forecast_insights(forecast, model, df_for_pred, target_col)
-                    
-                    for insight in insights:
-                        st.markdown(f"🔹 {insight}")
-                    
-                    st.info("💡 **Planning Tip:** Use these projections to optimize resource allocation at Aadhaar centers during predicted peak periods.")
-            else:
-                st.warning("Not enough historical data in the selected range to generate a reliable forecast. Try selecting a broader date range or more states.")
-        else:
-            st.info("Please select data filters to see predictions.")
+        if tab_predictions.open:
+            render_predictions_tab(filtered_pulse, metric_col, activity_view, selected_states)
 
     with tab_ai:
-        st.subheader("🤖 Aadhaar AI Assistant")
-        st.markdown("""
-            Ask questions about current trends, anomalies, or general Aadhaar statistics. 
-            The assistant has access to the **currently filtered data** context.
-        """)
-
-        # Initialize Hybrid Chatbot
-        ai_client = HybridAIClient(base_url=ollama_url, groq_api_key=groq_key)
-        provider_slug = "ollama" if ai_provider == "Local Ollama" else "groq"
-        
-        # Prepare context for the LLM
-        context_summary = {
-            "view": activity_view,
-            "states": selected_states,
-            "date_range": [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')],
-            "total_volume": float(view_total),
-            "enrolments": float(total_enr),
-            "migrations": float(total_mig),
-            "top_districts": display_pulse_sampled.groupby('location')['volume'].sum().nlargest(3).to_dict() if not display_pulse_sampled.empty else {}
-        }
-        
-        system_prompt = f"""
-        You are the Aadhaar Pulse AI, a specialist in analyzing Aadhaar demographic and enrollment data.
-        You are helping a government official understand the data displayed on their dashboard.
-        
-        Current Dashboard Context:
-        - Analyzing: {context_summary['view']}
-        - Selected States: {', '.join(context_summary['states'])}
-        - Date Range: {context_summary['date_range'][0]} to {context_summary['date_range'][1]}
-        - Overall Stats for current filters:
-            * Total {context_summary['view']} volume: {context_summary['total_volume']:,}
-            * Total Enrolments: {context_summary['enrolments']:,}
-            * Migration Flows: {context_summary['migrations']:,}
-            * Top Districts (by volume): {', '.join([f"{k} ({v:,.0f})" for k, v in context_summary['top_districts'].items()])}
-        
-        Provide concise, data-driven answers. If the data doesn't support a specific claim, be honest.
-        Use Markdown formatting for better readability.
-        """
-
-        # Chat interface
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-
-        # Display history
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-
-        # Chat input
-        if prompt := st.chat_input("Ask about the data..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user"):
-                st.markdown(prompt)
-
-            with st.chat_message("assistant"):
-                message_placeholder = st.empty()
-                full_response = ""
-                
-                # Prepare messages for Ollama (System + Chat History)
-                ollama_messages = [{"role": "system", "content": system_prompt}]
-                ollama_messages.extend([
-                    {"role": m["role"], "content": m["content"]}
-                    for m in st.session_state.messages[-5:] # Last 5 turns for context
-                ])
-                
-                with st.spinner("Analyzing..."):
-                    # Use streaming for better UX
-                    response_gen = ai_client.chat(ollama_messages, stream=True, provider=provider_slug)
-                    
-                    if isinstance(response_gen, str) and response_gen.startswith("Error:"):
-                        if provider_slug == "ollama":
-                            st.error("⚠️ **Ollama AI is offline.**")
-                            st.info("Switch to **Cloud AI (Groq)** in the sidebar for multi-device support.")
-                        else:
-                            st.error(f"⚠️ **AI Error:** {response_gen}")
-                        full_response = response_gen
-                    else:
-                        for chunk in response_gen:
-                            full_response += chunk
-                            message_placeholder.markdown(full_response + "▌")
-                        message_placeholder.markdown(full_response)
-                
-            if not full_response.startswith("Error:"):
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
-
-        if st.sidebar.button("Clear Chat History", key="clear_chat"):
-            st.session_state.messages = []
-            st.rerun()
+        if tab_ai.open:
+            # Prepare context for the LLM
+            context_summary = {
+                "view": activity_view,
+                "states": selected_states,
+                "date_range": [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')],
+                "total_volume": float(view_total),
+                "enrolments": float(total_enr),
+                "migrations": float(total_mig),
+                "top_districts": filtered_pulse.groupby('district', observed=True)[metric_col].sum().nlargest(3).to_dict() if not filtered_pulse.empty else {},
+                "top_corridors": {
+                    f"{src} → {dst}": n
+                    for src, dst, n in top_corridors(corridor_sketches, start_date, end_date, selected_states, k=3)
+                                       .reindex(columns=['source_district', 'dest_district', 'count']).itertuples(index=False)
+                },
+            }
+            render_ai_tab(context_summary, ai_provider, ollama_url, groq_key, load_briefings())
 
 if __name__ == "__main__":
     main()
@@ -2,33 +2,156 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
 import os
+import sys
 import logging
-from math import radians, cos, sin, asin, sqrt
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from processing.geography import haversine_np
+from processing.aggregator import distance_digests
+from utils.artifacts import write_artifact, read_artifact
+from utils.sketches import compress_digests, digest_quantiles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def haversine(lon1, lat1, lon2, lat2):
+# Detector engine: "isolation_forest" (default) or "robust_z"
+ANOMALY_ENGINE = os.environ.get("AADHAAR_ANOMALY_ENGINE", "isolation_forest")
+
+# Robust-z settings: baseline = the same weekday over the previous N weeks
+ROBUST_Z_WINDOW_WEEKS = 8
+ROBUST_Z_MIN_PERIODS = 3
+ROBUST_Z_THRESHOLD = 3.5
+# Scale floor (fraction of the baseline median, and absolute) so near-constant
+# histories of sparse districts do not turn tiny deviations into huge z-scores
+ROBUST_Z_MIN_RELATIVE_SCALE = 0.25
+ROBUST_Z_MIN_SCALE = 1.0
+
+# Migration distance quantiles per district-day, from the ETL's t-digests
+DISTANCE_QUANTILES = {'p50_distance': 0.5, 'p90_distance': 0.9, 'p99_distance': 0.99}
+
+ISOLATION_FOREST_FEATURES = ['total_volume', 'avg_distance', 'p90_distance', 'p99_distance']
+
+def score_isolation_forest(daily_stats):
+    """Isolation Forest over ISOLATION_FOREST_FEATURES; adds is_anomaly and score_val."""
+    X = daily_stats[ISOLATION_FOREST_FEATURES]
+    
+    logging.info("Training Isolation Forest...")
+    clf = IsolationForest(contamination=0.05, random_state=42)
+    daily_stats['anomaly_score'] = clf.fit_predict(X)
+    daily_stats['score_val'] = clf.decision_function(X)
+    
+    # Flag detected anomalies (IsolationForest returns -1 for anomalies)
+    daily_stats['is_anomaly'] = daily_stats['anomaly_score'] == -1
+    return daily_stats
+
+def weekday_robust_z(matrix, window=ROBUST_Z_WINDOW_WEEKS, min_periods=ROBUST_Z_MIN_PERIODS,
+                     min_relative_scale=ROBUST_Z_MIN_RELATIVE_SCALE, min_scale=ROBUST_Z_MIN_SCALE):
+    """
+    Robust z-scores for a (days x districts) matrix starting on any weekday.
+    Each cell is compared with the median/MAD of the same weekday over the
+    previous `window` weeks, computed in one vectorized pass.
+    """
+    n_days, n_cols = matrix.shape
+    n_weeks = -(-n_days // 7)
+    padded = np.full((n_weeks * 7, n_cols), np.nan)
+    padded[:n_days] = matrix
+    weeks = padded.reshape(n_weeks, 7, n_cols)
+
+    # history[w] holds weeks w-window .. w-1 (NaN before the start)
+    history = np.concatenate([np.full((window, 7, n_cols), np.nan), weeks[:-1]], axis=0)
+    windows = np.lib.stride_tricks.sliding_window_view(history, window, axis=0)[:n_weeks]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # all-NaN windows
+        median = np.nanmedian(windows, axis=-1)
+        abs_dev = np.abs(windows - median[..., None])
+        scale = 1.4826 * np.nanmedian(abs_dev, axis=-1)
+        # MAD is 0 for flat histories; fall back to the mean absolute deviation
+        scale = np.where(scale > 0, scale, 1.2533 * np.nanmean(abs_dev, axis=-1))
+        scale = np.fmax(scale, np.fmax(min_relative_scale * np.abs(median), min_scale))
+        enough = np.sum(~np.isnan(windows), axis=-1) >= min_periods
+        z = np.where(enough, (weeks - median) / scale, 0.0)
+
+    return np.nan_to_num(z.reshape(n_weeks * 7, n_cols)[:n_days])
+
+def score_robust_z(daily_stats, threshold=ROBUST_Z_THRESHOLD):
+    """
+    Model-free detector: per-district, per-weekday rolling median/MAD robust
+    z-scores of total_volume, avg_distance and p99_distance (long-haul tail).
+    Adds is_anomaly, score_val
+    (lower = more anomalous, like IsolationForest.decision_function) and the
+    explaining z-scores.
+    """
+    logging.info("Scoring rolling robust z-scores...")
+    start = daily_stats['date'].min()
+    day_idx = (daily_stats['date'] - start).dt.days.to_numpy()
+    districts = daily_stats['source_district'].astype('category')
+    col_idx = districts.cat.codes.to_numpy()
+    n_days, n_cols = day_idx.max() + 1, len(districts.cat.categories)
+
+    # Days without outflow have zero volume and no distance
+    volume = np.zeros((n_days, n_cols))
+    volume[day_idx, col_idx] = daily_stats['total_volume'].to_numpy()
+    for col, z_col in (('avg_distance', 'z_distance'), ('p99_distance', 'z_p99_distance')):
+        distance = np.full((n_days, n_cols), np.nan)
+        distance[day_idx, col_idx] = daily_stats[col].to_numpy()
+        daily_stats[z_col] = weekday_robust_z(distance)[day_idx, col_idx]
+
+    daily_stats['z_volume'] = weekday_robust_z(volume)[day_idx, col_idx]
+
+    strength = daily_stats[['z_volume', 'z_distance', 'z_p99_distance']].abs().max(axis=1)
+    daily_stats['score_val'] = -strength
+    daily_stats['is_anomaly'] = strength > threshold
+    return daily_stats
+
+ENGINES = {
+    "isolation_forest": score_isolation_forest,
+    "robust_z": score_robust_z,
+}
+
+# Bump an engine's version whenever its features or parameters change
+ENGINE_VERSIONS = {
+    "isolation_forest": "2",
+    "robust_z": "2",
+}
+
+# Score columns older runs merged into district_flows.csv
+LEGACY_SCORE_COLUMNS = ['is_anomaly', 'anomaly_score', 'z_volume', 'z_distance']
+
+def anomaly_table(daily_stats, engine):
+    """One row per (date, source_district) with the scores and model metadata."""
+    cols = ['date', 'source_district', 'total_volume', 'avg_distance', *DISTANCE_QUANTILES, 'is_anomaly', 'score_val']
+    cols += [c for c in ('z_volume', 'z_distance', 'z_p99_distance') if c in daily_stats.columns]
+    table = daily_stats[cols].rename(columns={'score_val': 'anomaly_score'})
+    table['engine'] = engine
+    table['model_version'] = f"{engine}-v{ENGINE_VERSIONS[engine]}"
+    return table.sort_values(['date', 'source_district']).reset_index(drop=True)
+
+def distance_features(df, data_dir):
     """
-    Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees)
+    DISTANCE_QUANTILES per (date, source_district), read from the ETL's
+    distance_digests.csv (or built from the flows in `df` if it is missing).
     """
-    # convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-
-    # haversine formula 
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    r = 6371 # Radius of earth in kilometers. Use 3956 for miles
-    return c * r
-
-def detect_anomalies():
+    if os.path.exists(os.path.join(data_dir, 'distance_digests.csv')):
+        digests = read_artifact('distance_digests.csv', data_dir=data_dir, parse_dates=['date'])
+    else:
+        digests = distance_digests(df)
+    # Merging the per-state rows of a district is a no-op unless partitions overlap
+    digests = compress_digests(digests, ['date', 'source_district'], 'mean', 'weight')
+    return digest_quantiles(digests, ['date', 'source_district'], DISTANCE_QUANTILES)
+
+def detect_anomalies(engine=None, data_dir=None):
     """
-    Detects anomalies using Isolation Forest based on Daily_Volume and Avg_Distance.
+    Detects anomalies based on Daily_Volume, Avg_Distance and distance quantiles using the selected
+    engine (default: ANOMALY_ENGINE, set via AADHAAR_ANOMALY_ENGINE).
     """
-    data_path = os.path.join(os.path.dirname(__file__), '../../data/district_flows.csv')
+    engine = engine or ANOMALY_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown anomaly engine '{engine}'. Choose from {sorted(ENGINES)}")
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), '../../data')
+    data_path = os.path.join(data_dir, 'district_flows.csv')
     
     if not os.path.exists(data_path):
         logging.error(f"Data file not found at {data_path}")
@@ -37,12 +160,13 @@ def detect_anomalies():
     logging.info("Loading data...")
     df = pd.read_csv(data_path)
     df['date'] = pd.to_datetime(df['date'])
+    # Flows written by older versions still carry merged-in scores; ignore them
+    df = df.drop(columns=LEGACY_SCORE_COLUMNS, errors='ignore')
     
     # Calculate Distance for each flow
-    # Using vectorized operations if possible, but map is easier for now
     logging.info("Calculating distances...")
-    df['distance'] = df.apply(lambda row: haversine(row['source_lon'], row['source_lat'], 
-                                                    row['dest_lon'], row['dest_lat']), axis=1)
+    df['distance'] = haversine_np(df['source_lon'].to_numpy(), df['source_lat'].to_numpy(),
+                                  df['dest_lon'].to_numpy(), df['dest_lat'].to_numpy())
     
     # Aggregate by Date and District
     # Daily_Volume = Sum(count)
@@ -63,41 +187,25 @@ def detect_anomalies():
     ).reset_index()
     
     daily_stats['avg_distance'] = daily_stats['total_person_km'] / daily_stats['total_volume']
+
+    # Long-haul tails hidden by the mean: distance quantiles from the t-digests
+    daily_stats = daily_stats.merge(distance_features(df, data_dir), on=['date', 'source_district'], how='left')
     
-    # Features for Anomaly Detection
-    X = daily_stats[['total_volume', 'avg_distance']]
-    
-    logging.info("Training Isolation Forest...")
-    clf = IsolationForest(contamination=0.05, random_state=42)
-    daily_stats['anomaly_score'] = clf.fit_predict(X)
-    daily_stats['score_val'] = clf.decision_function(X)
-    
-    # Flag detected anomalies (IsolationForest returns -1 for anomalies)
-    # Flag detected anomalies (IsolationForest returns -1 for anomalies)
-    # We rename 'anomaly_score' to 'is_anomaly_flag' to avoid confusion, 
-    # but the dashboard wants 'is_anomaly' (boolean) and 'anomaly_score' (float/int).
-    
-    daily_stats['is_anomaly'] = daily_stats['anomaly_score'] == -1
-    
-    # Merge back to original flows
-    # We want to mark all flows from an anomalous district-day as anomalous
-    logging.info("Merging anomalies back to flow data...")
-    
-    df_merged = df.merge(
-        daily_stats[['date', 'source_district', 'is_anomaly', 'score_val']],
-        on=['date', 'source_district'],
-        how='left'
-    )
-    
-    df_merged.rename(columns={'score_val': 'anomaly_score'}, inplace=True)
+    # Score district-days with the selected engine
+    # The dashboard wants 'is_anomaly' (boolean) and 'anomaly_score' (float).
+    logging.info(f"Scoring with engine '{engine}'...")
+    daily_stats = ENGINES[engine](daily_stats)
     
-    # Save back to CSV
-    logging.info(f"Saving updated data to {data_path}...")
-    df_merged.to_csv(data_path, index=False)
+    # Scores live in a compact sidecar keyed by (date, source_district);
+    # district_flows.csv is left untouched, so re-runs are idempotent.
+    table = anomaly_table(daily_stats, engine)
+    logging.info("Saving anomaly table to district_anomalies.csv...")
+    write_artifact(table, 'district_anomalies.csv', data_dir=data_dir, date_format='%Y-%m-%d',
+                   metadata={'engine': engine, 'model_version': table['model_version'].iloc[0] if len(table) else None})
     
-    logging.info(f"Detected {daily_stats['is_anomaly'].sum()} anomalous district-days.")
+    logging.info(f"Detected {table['is_anomaly'].sum()} anomalous district-days.")
     
-    return df_merged
+    return table
 
 if __name__ == "__main__":
     detect_anomalies()
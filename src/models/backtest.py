@@ -0,0 +1,194 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from models.forecast import build_model
+from utils.artifacts import write_artifact
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Series to evaluate: metric name -> india_aggregated columns summed into it
+METRICS = {
+    'total_updates': ['total_updates'],
+    'biometric_updates': ['bio_age_5_17', 'bio_age_17_'],
+    'demographic_updates': ['demo_age_5_17', 'demo_age_17_'],
+    'new_enrolments': ['total_enrolments'],
+}
+
+# Engine name -> list of parameter settings to compare
+ENGINES = {
+    'prophet': [
+        {'changepoint_prior_scale': 0.05},
+        {'changepoint_prior_scale': 0.5},
+    ],
+    'seasonal_naive': [
+        {'season_length': 7},
+    ],
+}
+
+# Rolling-origin settings (in days)
+INITIAL_TRAIN_DAYS = 60
+HORIZON_DAYS = 14
+STEP_DAYS = 14
+INTERVAL_WIDTH = 0.8
+
+
+def fit_predict_prophet(train, horizon, params):
+    """Returns (fit_seconds, predict_seconds, forecast frame with yhat/yhat_lower/yhat_upper)."""
+    start = time.perf_counter()
+    model = build_model(interval_width=INTERVAL_WIDTH, **params)
+    model.fit(train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    future = model.make_future_dataframe(periods=horizon, include_history=False)
+    forecast = model.predict(future)
+    predict_s = time.perf_counter() - start
+    return fit_s, predict_s, forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+
+def fit_predict_seasonal_naive(train, horizon, params):
+    """Repeats the last season; intervals come from in-sample seasonal residual quantiles."""
+    m = params.get('season_length', 7)
+    start = time.perf_counter()
+    y = train['y'].to_numpy(dtype=float)
+    residuals = y[m:] - y[:-m]
+    alpha = (1 - INTERVAL_WIDTH) / 2
+    lo, hi = np.quantile(residuals, [alpha, 1 - alpha]) if len(residuals) else (0.0, 0.0)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    yhat = np.resize(y[-m:], horizon)
+    ds = pd.date_range(train['ds'].iloc[-1] + pd.Timedelta(days=1), periods=horizon)
+    forecast = pd.DataFrame({'ds': ds, 'yhat': yhat, 'yhat_lower': yhat + lo, 'yhat_upper': yhat + hi})
+    predict_s = time.perf_counter() - start
+    return fit_s, predict_s, forecast
+
+
+ENGINE_FUNCS = {
+    'prophet': fit_predict_prophet,
+    'seasonal_naive': fit_predict_seasonal_naive,
+}
+
+
+def rolling_origin_folds(n_obs, initial=INITIAL_TRAIN_DAYS, horizon=HORIZON_DAYS, step=STEP_DAYS):
+    """Yields (train_end, test_end) index pairs for expanding-window cross-validation."""
+    train_end = initial
+    while train_end + horizon <= n_obs:
+        yield train_end, train_end + horizon
+        train_end += step
+
+
+def backtest_series(task):
+    """Runs every fold for one (state, metric, engine, params) task. Executed in a worker process."""
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    state, metric, engine, params, series = task
+    rows = []
+    for fold, (train_end, test_end) in enumerate(rolling_origin_folds(len(series))):
+        train = series.iloc[:train_end]
+        test = series.iloc[train_end:test_end]
+        try:
+            fit_s, predict_s, forecast = ENGINE_FUNCS[engine](train, len(test), params)
+        except Exception as e:
+            logging.error(f"{engine} failed on {state}/{metric} fold {fold}: {e}")
+            continue
+
+        actual = test['y'].to_numpy(dtype=float)
+        yhat = forecast['yhat'].to_numpy()[:len(actual)]
+        nonzero = actual != 0
+        mape = np.mean(np.abs((actual[nonzero] - yhat[nonzero]) / actual[nonzero])) if nonzero.any() else np.nan
+        covered = (actual >= forecast['yhat_lower'].to_numpy()[:len(actual)]) & \
+                  (actual <= forecast['yhat_upper'].to_numpy()[:len(actual)])
+
+        rows.append({
+            'state': state,
+            'metric': metric,
+            'engine': engine,
+            'params': ','.join(f"{k}={v}" for k, v in sorted(params.items())),
+            'fold': fold,
+            'train_days': train_end,
+            'fit_s': fit_s,
+            'predict_s': predict_s,
+            'mape': mape,
+            'coverage': covered.mean(),
+        })
+    return rows
+
+
+def build_series(df, metrics=METRICS):
+    """Yields (state, metric, series) with a complete daily (ds, y) index per state."""
+    for state, state_df in df.groupby('state'):
+        daily = state_df.groupby('date')[sorted({c for cols in metrics.values() for c in cols})].sum()
+        daily = daily.asfreq('D', fill_value=0)
+        for metric, cols in metrics.items():
+            series = pd.DataFrame({'ds': daily.index, 'y': daily[cols].sum(axis=1).to_numpy()})
+            yield state, metric, series
+
+
+def run_backtest(df, engines=ENGINES, metrics=METRICS, max_workers=None):
+    """
+    Rolling-origin cross-validation of every engine/parameter setting on every
+    state and metric, fanned out over a process pool.
+    Returns (per-fold results, comparison table).
+    """
+    tasks = [
+        (state, metric, engine, params, series)
+        for state, metric, series in build_series(df, metrics)
+        for engine, settings in engines.items()
+        for params in settings
+    ]
+    logging.info(f"Backtesting {len(tasks)} series/engine combinations...")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(backtest_series, task) for task in tasks]
+        for future in as_completed(futures):
+            rows.extend(future.result())
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results, results
+
+    comparison = results.groupby(['engine', 'params']).agg(
+        folds=('fold', 'size'),
+        mape=('mape', 'mean'),
+        coverage=('coverage', 'mean'),
+        fit_s_median=('fit_s', 'median'),
+        fit_s_total=('fit_s', 'sum'),
+        predict_s_median=('predict_s', 'median'),
+    ).reset_index().sort_values('mape')
+    return results, comparison
+
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), '../../data')
+    data_path = os.path.join(data_dir, 'india_aggregated.csv')
+
+    if not os.path.exists(data_path):
+        logging.error(f"Data file not found at {data_path}")
+        return
+
+    df = pd.read_csv(data_path)
+    df['date'] = pd.to_datetime(df['date'])
+
+    results, comparison = run_backtest(df)
+    if results.empty:
+        logging.error("Not enough history for a single backtest fold.")
+        return
+
+    write_artifact(results, 'backtest_results.csv', data_dir=data_dir)
+    write_artifact(comparison, 'backtest_comparison.csv', data_dir=data_dir)
+
+    print(f"\n--- Engine Comparison (target coverage {INTERVAL_WIDTH:.0%}) ---")
+    print(comparison.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,119 @@
 import pandas as pd
 from prophet import Prophet
 import os
+import json
+import hashlib
 import logging
+import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-import pandas as pd
-from prophet import Prophet
-import os
-import logging
-import numpy as np
+# Fitted parameters per series, used to warm-start refits
+FORECAST_STATE_DIR = os.path.join(os.path.dirname(__file__), '../../data/forecast_state')
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Series states kept on disk; the least recently used are evicted beyond this
+# (dashboard series are keyed by state selection, so the key space is unbounded)
+FORECAST_STATE_MAX_FILES = 64
+
+# A warm-started fit is rejected if its in-sample MAPE is this much worse than the last fit
+WARM_START_MAPE_TOLERANCE = 1.25
+
+# Model configuration used by get_forecast (overridable for backtesting)
+PROPHET_PARAMS = {
+    'yearly_seasonality': False,
+    'weekly_seasonality': True,
+    'daily_seasonality': False,
+    'changepoint_prior_scale': 0.05,
+}
+
+def build_model(**overrides):
+    return Prophet(**{**PROPHET_PARAMS, **overrides})
+
+def _fingerprint(prophet_df):
+    """Content hash of a (ds, y) history, used to tell extensions from revisions."""
+    hashes = pd.util.hash_pandas_object(prophet_df[['ds', 'y']], index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+def _state_path(series_key):
+    digest = hashlib.sha1(series_key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(FORECAST_STATE_DIR, f"{digest}.json")
+
+def load_fit_state(series_key):
+    path = _state_path(series_key)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    # mtime doubles as the last-use time for eviction
+    os.utime(path)
+    return state
 
-def get_forecast(df, target_col='total_updates', periods=30):
+def evict_fit_states(max_files=FORECAST_STATE_MAX_FILES, state_dir=None):
+    """Deletes the least recently used series states beyond `max_files`."""
+    state_dir = state_dir or FORECAST_STATE_DIR
+    if not os.path.isdir(state_dir):
+        return
+    paths = [os.path.join(state_dir, name) for name in os.listdir(state_dir) if name.endswith('.json')]
+    paths.sort(key=lambda path: os.stat(path).st_mtime_ns, reverse=True)
+    for path in paths[max_files:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def save_fit_state(series_key, model, prophet_df, fit_mape):
+    """Persists the MAP parameter estimates of a fitted model for the next warm start."""
+    params = {name: float(model.params[name][0][0]) for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0].tolist() for name in ['delta', 'beta']})
+    state = {
+        'series_key': series_key,
+        'n_obs': len(prophet_df),
+        'fingerprint': _fingerprint(prophet_df),
+        'fit_mape': fit_mape,
+        'params': params,
+    }
+    os.makedirs(FORECAST_STATE_DIR, exist_ok=True)
+    path = _state_path(series_key)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    evict_fit_states()
+
+def is_extension(state, prophet_df):
+    """True if the history is the stored one with (possibly zero) new rows appended."""
+    n = state['n_obs']
+    return len(prophet_df) >= n and _fingerprint(prophet_df.iloc[:n]) == state['fingerprint']
+
+def in_sample_mape(forecast, prophet_df):
+    fitted = forecast['yhat'].to_numpy()[:len(prophet_df)]
+    actual = prophet_df['y'].to_numpy()
+    nonzero = actual != 0
+    if not nonzero.any():
+        return 0.0
+    return float(np.mean(np.abs((actual[nonzero] - fitted[nonzero]) / actual[nonzero])))
+
+def _fit_and_predict(prophet_df, periods, init=None):
+    model = build_model()
+    if init is None:
+        model.fit(prophet_df)
+    else:
+        model.fit(prophet_df, init=init)
+    future = model.make_future_dataframe(periods=periods)
+    return model, model.predict(future)
+
+def get_forecast(df, target_col='total_updates', periods=30, series_key=None):
     """
     Generic forecasting function using Prophet.
     Args:
         df: DataFrame with 'date' and the target column.
         target_col: The column name to forecast.
         periods: Number of days to forecast.
+        series_key: Optional stable name for the series (e.g. state + metric). When
+            given, fitted parameters are persisted and the next fit is warm-started
+            from them if the history has only been extended. Revised histories, or
+            warm fits that fail the in-sample MAPE check, get a full cold refit.
     Returns:
         forecast_df: Predicted values with upper/lower bounds.
         model: Trained Prophet model object.
@@ -38,18 +130,28 @@ def get_forecast(df, target_col='total_updates', periods=30):
         return pd.DataFrame(), None
 
     try:
-        # Train Prophet Model
-        model = Prophet(
-            yearly_seasonality=False, 
-            weekly_seasonality=True, 
-            daily_seasonality=False,
-            changepoint_prior_scale=0.05
-        )
-        model.fit(prophet_df)
-        
-        # Predict
-        future = model.make_future_dataframe(periods=periods)
-        forecast = model.predict(future)
+        state = load_fit_state(series_key) if series_key else None
+        model = forecast = None
+
+        if state is not None and is_extension(state, prophet_df):
+            try:
+                init = {name: np.asarray(value) for name, value in state['params'].items()}
+                model, forecast = _fit_and_predict(prophet_df, periods, init=init)
+                fit_mape = in_sample_mape(forecast, prophet_df)
+                if fit_mape > state['fit_mape'] * WARM_START_MAPE_TOLERANCE + 1e-6:
+                    logging.info(f"Warm start for '{series_key}' failed the fit check ({fit_mape:.3f}), refitting")
+                    model = forecast = None
+            except Exception as e:
+                # e.g. the number of changepoints changed with the history length
+                logging.info(f"Warm start for '{series_key}' not possible ({e}), refitting")
+                model = forecast = None
+
+        if model is None:
+            # Train Prophet Model from scratch
+            model, forecast = _fit_and_predict(prophet_df, periods)
+
+        if series_key:
+            save_fit_state(series_key, model, prophet_df, in_sample_mape(forecast, prophet_df))
         
         return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], model
     except Exception as e:
@@ -118,7 +220,7 @@ def perform_forecasting():
     df = pd.read_csv(data_path)
     df['date'] = pd.to_datetime(df['date'])
     
-    forecast, model = get_forecast(df)
+    forecast, model = get_forecast(df, series_key='india:total_updates')
     if not forecast.empty:
         insights = generate_forecast_insights(forecast, model, df, 'total_updates')
         print("\n--- Forecast Insights ---")
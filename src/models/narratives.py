@@ -0,0 +1,278 @@
+import pandas as pd
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import artifacts
+from utils.ollama_client import HybridAIClient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DATA_DIR = artifacts.DATA_DIR
+CACHE_DIR = os.path.join(DATA_DIR, 'narrative_cache')
+OUTPUT_NAME = 'region_narratives.csv'
+
+# Each context compares the latest window with the one before it (in days)
+WINDOW_DAYS = 30
+
+# Worker pool settings: parallel requests, request starts per second, retries
+# per region (with exponential backoff) and the per-request timeout
+CONCURRENCY = 8
+RATE_PER_S = 4.0
+MAX_RETRIES = 3
+BACKOFF_S = 1.0
+REQUEST_TIMEOUT_S = 120
+
+SYSTEM_PROMPT = (
+    "You are the Aadhaar Pulse AI, a specialist in analyzing Aadhaar demographic and enrollment data. "
+    "Write a briefing of at most 120 words for a government official about the region below. "
+    "Use only the figures given, call out notable changes, migration and anomalies, "
+    "and use Markdown bullet points."
+)
+
+PULSE_METRICS = {
+    'Total updates': ['total_updates'],
+    'Biometric updates': ['bio_age_5_17', 'bio_age_17_'],
+    'Demographic updates': ['demo_age_5_17', 'demo_age_17_'],
+    'New enrolments': ['total_enrolments'],
+}
+
+
+def window_masks(dates, window_days=WINDOW_DAYS):
+    """(current, previous) boolean masks for the latest window and the one before it."""
+    end = dates.max()
+    current = dates > end - pd.Timedelta(days=window_days)
+    previous = ~current & (dates > end - pd.Timedelta(days=2 * window_days))
+    return current, previous, end
+
+
+def pct_change(current, previous):
+    return f"{(current - previous) / previous:+.0%}" if previous else "n/a"
+
+
+def region_contexts(pulse, flows=None, anomalies=None, level='state', window_days=WINDOW_DAYS):
+    """
+    One compact text context per region (`level` 'state' or 'district') built
+    from the processed artifacts: activity in the latest window against the
+    previous one, migration in/out and anomalous district-days. Districts are
+    keyed by (state, district), since district names repeat across states.
+    Returns a frame with region_type, region, state and context.
+    """
+    keys = ['state'] if level == 'state' else ['state', 'district']
+    current, previous, end = window_masks(pulse['date'], window_days)
+    cols = sorted({c for cols in PULSE_METRICS.values() for c in cols})
+    now = pulse[current].groupby(keys, observed=True)[cols].sum()
+    before = pulse[previous].groupby(keys, observed=True)[cols].sum().reindex(now.index, fill_value=0)
+    top_districts = (pulse[current].groupby(['state', 'district'], observed=True)['total_updates'].sum()
+                     .sort_values(ascending=False).groupby(level=0, observed=True).head(3))
+
+    migration = {}
+    if flows is not None and not flows.empty:
+        mig_current, _, mig_end = window_masks(flows['date'], window_days)
+        recent = flows[mig_current]
+        inflow = recent.groupby([f'dest_{k}' for k in keys], observed=True)['count'].sum()
+        outflow = recent.groupby([f'source_{k}' for k in keys], observed=True)['count'].sum()
+        migration = {'end': mig_end, 'inflow': inflow, 'outflow': outflow}
+
+    anomaly_days = pd.Series(dtype='int64')
+    if anomalies is not None and not anomalies.empty and flows is not None and not flows.empty:
+        flagged = anomalies[anomalies['is_anomaly'] & window_masks(anomalies['date'], window_days)[0]]
+        # Anomalies are scored per source district name; attribute each to its state via the flows
+        district_state = flows.drop_duplicates('source_district').set_index('source_district')['source_state']
+        flagged = pd.DataFrame({'state': flagged['source_district'].map(district_state),
+                                'district': flagged['source_district']})
+        anomaly_days = flagged.groupby(keys, observed=True).size()
+
+    rows = []
+    for region in now.index:
+        state, name = (region, region) if level == 'state' else region
+        lines = [f"Region: {name} ({level}{'' if level == 'state' else ', ' + str(state)})",
+                 f"Period: {window_days} days to {end:%Y-%m-%d}, compared with the {window_days} days before"]
+        for label, metric_cols in PULSE_METRICS.items():
+            value, prior = now.loc[region, metric_cols].sum(), before.loc[region, metric_cols].sum()
+            lines.append(f"- {label}: {value:,.0f} ({pct_change(value, prior)})")
+        if level == 'state' and region in top_districts.index.get_level_values(0):
+            busiest = top_districts.loc[region]
+            lines.append("- Busiest districts: " + ", ".join(f"{d} ({v:,.0f})" for d, v in busiest.items()))
+        if migration:
+            inflow, outflow = migration['inflow'].get(region, 0), migration['outflow'].get(region, 0)
+            lines.append(f"- Migration ({window_days} days to {migration['end']:%Y-%m-%d}): "
+                         f"{inflow:,.0f} in, {outflow:,.0f} out, net {inflow - outflow:+,.0f}")
+        lines.append(f"- Anomalous migration district-days: {int(anomaly_days.get(region, 0))}")
+        rows.append({'region_type': level, 'region': str(name), 'state': str(state),
+                     'context': "\n".join(lines)})
+    return pd.DataFrame(rows, columns=['region_type', 'region', 'state', 'context'])
+
+
+class NarrativeCache:
+    """Disk cache of generated narratives keyed by a hash of the full request."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(model, provider, messages):
+        payload = json.dumps({'model': model, 'provider': provider, 'messages': messages}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)['narrative']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key, narrative):
+        def write(p):
+            with open(p, 'w') as f:
+                json.dump({'narrative': narrative, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+        artifacts.atomic_write(self.path(key), write)
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all workers."""
+
+    def __init__(self, rate_per_s=RATE_PER_S):
+        self.interval = 1.0 / rate_per_s if rate_per_s else 0.0
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def is_narrative(response):
+    """True for a usable reply: non-blank text that is not a client error message."""
+    return isinstance(response, str) and bool(response.strip()) and not response.startswith("Error:")
+
+
+async def generate_one(client, provider, messages, limiter, max_retries=MAX_RETRIES, backoff_s=BACKOFF_S):
+    """
+    Calls the LLM with retries; returns (narrative or "Error: ..." message, attempts).
+    Blank replies count as failures.
+    """
+    for attempt in range(max_retries + 1):
+        await limiter.wait()
+        # HybridAIClient is blocking (requests/groq); run it on the default thread pool
+        response = await asyncio.to_thread(client.chat, messages, False, provider)
+        if is_narrative(response):
+            return response, attempt + 1
+        if attempt < max_retries:
+            await asyncio.sleep(backoff_s * 2 ** attempt * (1 + random.random()))
+    if not (isinstance(response, str) and response.startswith("Error:")):
+        response = "Error: empty response from the model"
+    return response, max_retries + 1
+
+
+async def generate_narratives(contexts, client, provider='ollama', cache=None, concurrency=CONCURRENCY,
+                              rate_per_s=RATE_PER_S, max_retries=MAX_RETRIES, backoff_s=BACKOFF_S):
+    """
+    Generates a narrative per context row through a pool of `concurrency`
+    workers sharing one rate limiter. Cached narratives are reused without a
+    request. Returns `contexts` with narrative and status (cached/generated/failed).
+    """
+    cache = cache or NarrativeCache()
+    limiter = RateLimiter(rate_per_s)
+    queue = asyncio.Queue()
+    for idx, context in contexts['context'].items():
+        queue.put_nowait((idx, context))
+    results = {}
+
+    async def worker():
+        while True:
+            try:
+                idx, context = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": context}]
+            key = NarrativeCache.key(client.model, provider, messages)
+            narrative = cache.get(key)
+            if is_narrative(narrative):
+                results[idx] = (narrative, 'cached', key)
+                continue
+            narrative, attempts = await generate_one(client, provider, messages, limiter, max_retries, backoff_s)
+            if not is_narrative(narrative):
+                logging.warning(f"Giving up on {contexts.at[idx, 'region']} after {attempts} attempts: {narrative}")
+                results[idx] = (narrative, 'failed', key)
+            else:
+                cache.put(key, narrative)
+                results[idx] = (narrative, 'generated', key)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(contexts))))))
+    out = contexts.copy()
+    out['narrative'] = [results[i][0] for i in out.index]
+    out['status'] = [results[i][1] for i in out.index]
+    out['context_hash'] = [results[i][2] for i in out.index]
+    return out
+
+
+def load_inputs(data_dir=DATA_DIR):
+    """india_aggregated plus (if present) flows and anomalies, read from pinned artifact versions."""
+    def read(name):
+        if artifacts.current_version(name, data_dir) is None:
+            return None
+        return artifacts.read_artifact(name, data_dir=data_dir, parse_dates=['date'])
+    return read('india_aggregated.csv'), read('district_flows.csv'), read('district_anomalies.csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-generate per-region briefings with an LLM.")
+    parser.add_argument("--level", choices=["state", "district", "all"], default="state")
+    parser.add_argument("--provider", choices=["ollama", "groq"], default="ollama")
+    parser.add_argument("--base-url", default=os.environ.get("OLLAMA_URL", "http://localhost:11434"))
+    parser.add_argument("--model", default="aadhaar-pulse-expert")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=RATE_PER_S, help="max request starts per second")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--limit", type=int, default=None, help="only the first N regions (for trial runs)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    pulse, flows, anomalies = load_inputs(args.data_dir)
+    if pulse is None:
+        logging.error(f"india_aggregated.csv not found in {args.data_dir}")
+        return
+
+    levels = ["state", "district"] if args.level == "all" else [args.level]
+    contexts = pd.concat([region_contexts(pulse, flows, anomalies, level) for level in levels], ignore_index=True)
+    if args.limit:
+        contexts = contexts.head(args.limit)
+
+    client = HybridAIClient(model=args.model, base_url=args.base_url, timeout=REQUEST_TIMEOUT_S)
+    cache = NarrativeCache(os.path.join(args.data_dir, 'narrative_cache'))
+    logging.info(f"Generating {len(contexts)} narratives ({args.concurrency} workers, {args.rate}/s)...")
+    start = time.perf_counter()
+    results = asyncio.run(generate_narratives(contexts, client, args.provider, cache, args.concurrency,
+                                              args.rate, args.retries))
+    elapsed = time.perf_counter() - start
+
+    counts = results['status'].value_counts().to_dict()
+    done = results[results['status'] != 'failed'].drop(columns='status')
+    done['model'] = args.model
+    done['provider'] = args.provider
+    if not done.empty:
+        artifacts.write_artifact(done, OUTPUT_NAME, data_dir=args.data_dir,
+                                 metadata={'model': args.model, 'provider': args.provider, **counts})
+    logging.info(f"Done in {elapsed:.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
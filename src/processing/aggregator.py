@@ -1,6 +1,26 @@
 
 import pandas as pd
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from processing.dedup import ingest_incoming
+from processing.schemas import read_logs, UpdateType
+from processing.geography import canonical_states, canonical_districts, haversine_np
+from processing.matrices import geo_matrices, migration_frame, matrix_date_range, MIGRATION_MATRIX_METRICS
+import numpy as np
+
+from utils.artifacts import write_artifact, write_npz_artifact
+from utils.sketches import (truncate_groups, build_hll_cells, hash64, compress_digests,
+                            DEFAULT_HLL_PRECISION, DEFAULT_COMPRESSION)
+
+# Corridors kept per top-k summary: per day, nationally and per source state
+CORRIDOR_SKETCH_CAPACITY = 50
+NATIONAL_SCOPE = "India"
+
+# t-digests of migration distance: per day and source district
+DISTANCE_DIGEST_COMPRESSION = DEFAULT_COMPRESSION
 
 def load_data(data_dir="data"):
     """Loads raw logs and pincode master data."""
@@ -10,26 +30,28 @@ def load_data(data_dir="data"):
     if not os.path.exists(logs_path) or not os.path.exists(pincode_path):
         raise FileNotFoundError("Input files not found. Please generate mock data first.")
         
-    logs = pd.read_csv(logs_path)
+    logs = read_logs(logs_path)
     pincode_master = pd.read_csv(pincode_path)
     return logs, pincode_master
 
 def process_migration_data(logs, pincode_master):
     """Aggregates migration flows between districts with coordinates."""
     
-    # Filter for Address Change only
-    migration_logs = logs[logs["Update_Type"] == "Address"].copy()
+    # Filter for Address Change only (Update_Type is the canonical categorical from read_logs)
+    migration_logs = logs[logs["Update_Type"] == UpdateType.ADDRESS.value].copy()
+    
+    # Pincodes arrive as int32 from the schema adapters
+    pincode_master["Pincode"] = pincode_master["Pincode"].astype("int32")
     
-    # Ensure pincodes are int/str consistency
-    migration_logs["Source_Pincode"] = migration_logs["Source_Pincode"].astype(int)
-    migration_logs["Dest_Pincode"] = migration_logs["Dest_Pincode"].astype(int)
-    pincode_master["Pincode"] = pincode_master["Pincode"].astype(int)
+    # Canonical, integer-coded geography (normalized once per unique label)
+    pincode_master["State"] = canonical_states(pincode_master["State"])
+    pincode_master["District"] = canonical_districts(pincode_master["District"])
     
     # --- Prepare District Master (Centroids) ---
     # Take the first entry for State/Lat/Lon per district for simplicity
-    district_master = pincode_master.groupby("District")[["Latitude", "Longitude"]].mean().reset_index()
+    district_master = pincode_master.groupby("District", observed=True)[["Latitude", "Longitude"]].mean().reset_index()
     # State cannot be mean, so we merge it back
-    district_states = pincode_master.groupby("District")["State"].first().reset_index()
+    district_states = pincode_master.groupby("District", observed=True)["State"].first().reset_index()
     district_master = district_master.merge(district_states, on="District")
     
     # Join Source District
@@ -48,11 +70,11 @@ def process_migration_data(logs, pincode_master):
         how="inner"
     ).rename(columns={"District": "dest_district"}).drop(columns=["Pincode"])
     
-    # Convert Timestamp to Date
-    migration_logs["date"] = pd.to_datetime(migration_logs["Timestamp"]).dt.date
+    # Truncate Timestamp (already datetime64) to Date
+    migration_logs["date"] = migration_logs["Timestamp"].dt.normalize()
     
     # Aggregation: Group by Date, Source, Dest
-    daily_flows = migration_logs.groupby(["date", "source_district", "dest_district"]).size().reset_index(name="count")
+    daily_flows = migration_logs.groupby(["date", "source_district", "dest_district"], observed=True).size().reset_index(name="count")
     
     # --- Enrich with Coordinates ---
     # Source Info
@@ -79,26 +101,90 @@ def process_migration_data(logs, pincode_master):
         how="left"
     )
 
-    return daily_flows
+    # Drop flows touching pincodes whose state is not a valid State/UT
+    return daily_flows.dropna(subset=["source_state", "dest_state"])
 
 def calculate_net_migration(daily_flows):
     """Calculates Net Migration (Inflow - Outflow) per district per day."""
     
     # Inflow: Dest is the district
-    inflow = daily_flows.groupby(["date", "dest_district"])["count"].sum().reset_index()
+    inflow = daily_flows.groupby(["date", "dest_district"], observed=True)["count"].sum().reset_index()
     inflow.rename(columns={"dest_district": "district", "count": "inflow"}, inplace=True)
     
     # Outflow: Source is the district
-    outflow = daily_flows.groupby(["date", "source_district"])["count"].sum().reset_index()
+    outflow = daily_flows.groupby(["date", "source_district"], observed=True)["count"].sum().reset_index()
     outflow.rename(columns={"source_district": "district", "count": "outflow"}, inplace=True)
     
     # Merge
     net_migration = pd.merge(inflow, outflow, on=["date", "district"], how="outer").fillna(0)
+    # Outer merge introduces NaN (-> float64); counts are integers
+    net_migration[["inflow", "outflow"]] = net_migration[["inflow", "outflow"]].astype("int64")
     net_migration["net_migration"] = net_migration["inflow"] - net_migration["outflow"]
     
     return net_migration
 
+def corridor_summaries(daily_flows, capacity=CORRIDOR_SKETCH_CAPACITY):
+    """
+    Truncated exact top-k summaries of the busiest source->dest corridors for every
+    (date, scope), where scope is NATIONAL_SCOPE or a source state. Each holds at
+    most `capacity` corridors and they merge across any date range or set of states.
+    """
+    national = daily_flows.assign(scope=NATIONAL_SCOPE)
+    by_state = daily_flows.assign(scope=daily_flows["source_state"].astype(str))
+    scoped = pd.concat([national, by_state], ignore_index=True)
+    return truncate_groups(scoped, ["date", "scope"], ["source_district", "dest_district"], "count", capacity)
+
+def distance_digests(daily_flows, compression=DISTANCE_DIGEST_COMPRESSION):
+    """
+    t-digests of the distance (km) travelled by migrants leaving each source
+    district per day, weighted by flow count. They merge across days, districts
+    and partitions, so distance quantiles of any selection need no per-flow data.
+    """
+    distance = haversine_np(daily_flows["source_lon"].to_numpy(), daily_flows["source_lat"].to_numpy(),
+                            daily_flows["dest_lon"].to_numpy(), daily_flows["dest_lat"].to_numpy())
+    return compress_digests(daily_flows.assign(distance=distance), ["date", "source_state", "source_district"],
+                            "distance", "count", compression)
+
+def resident_sketches(logs, pincode_master, precision=DEFAULT_HLL_PRECISION):
+    """
+    Sparse HyperLogLog sketches of distinct Aadhaar_IDs per (date, district,
+    update type), the district being that of the event's (destination) pincode.
+    Returns the arrays stored in unique_residents.npz:
+      cell_day/cell_district/cell_type   one entry per non-empty cell
+      pair_cell/pair_register/pair_rank  the cells' non-zero HLL registers
+      districts/district_states/update_types  labels for the integer codes
+    """
+    pins = pincode_master.drop_duplicates("Pincode")
+    districts = canonical_districts(pins["District"])
+    states = canonical_states(pins["State"])
+    pin_idx = pd.Index(pins["Pincode"]).get_indexer(logs["Dest_Pincode"])
+    district_codes = np.where(pin_idx >= 0, districts.codes[pin_idx], -1)
+    known = district_codes >= 0
+
+    day = logs["Timestamp"].dt.normalize().to_numpy().astype("datetime64[D]").astype(np.int32)[known]
+    type_codes = logs["Update_Type"].cat.codes.to_numpy()[known]
+    cell_ids, cells = pd.MultiIndex.from_arrays([day, district_codes[known], type_codes]).factorize(sort=True)
+    pair_cell, pair_register, pair_rank = build_hll_cells(cell_ids, hash64(logs["Aadhaar_ID"].to_numpy()[known]), precision)
+
+    district_states = pd.Series(states).groupby(districts.codes).first().reindex(range(len(districts.categories)))
+    return {
+        "cell_day": cells.get_level_values(0).to_numpy(dtype=np.int32),
+        "cell_district": cells.get_level_values(1).to_numpy(dtype=np.int16),
+        "cell_type": cells.get_level_values(2).to_numpy(dtype=np.int8),
+        "pair_cell": pair_cell,
+        "pair_register": pair_register,
+        "pair_rank": pair_rank,
+        "districts": districts.categories.to_numpy(dtype=str),
+        "district_states": district_states.fillna("").to_numpy(dtype=str),
+        "update_types": logs["Update_Type"].cat.categories.to_numpy(dtype=str),
+        "precision": np.array(precision, dtype=np.int8),
+    }
+
 def main():
+    print("Deduplicating incoming batches...")
+    dedup_stats = ingest_incoming()
+    print(f"Ingested {dedup_stats['ingested']} new events, dropped {dedup_stats['dropped_duplicates']} duplicates")
+
     print("Loading data...")
     logs, pincode_master = load_data()
     
@@ -118,13 +204,37 @@ def main():
     # I can also save a 'district_stats.csv' if needed, but the prompt specifically asked for 'district_flows.csv'.
     # I'll save the flows. 
     
-    output_path = "data/district_flows.csv"
-    daily_flows.to_csv(output_path, index=False)
-    print(f"Saved processed data to {output_path}")
+    manifest = write_artifact(daily_flows, "district_flows.csv", data_dir="data")
+    print(f"Saved processed data to data/district_flows.csv (version {manifest['version']})")
+
+    manifest = write_artifact(net_migration, "district_net_migration.csv", data_dir="data")
+    print(f"Saved net migration data to data/district_net_migration.csv (version {manifest['version']})")
+
+    sketches = corridor_summaries(daily_flows)
+    manifest = write_artifact(sketches, "corridor_sketches.csv", data_dir="data",
+                              metadata={"capacity": CORRIDOR_SKETCH_CAPACITY, "national_scope": NATIONAL_SCOPE})
+    print(f"Saved corridor sketches to data/corridor_sketches.csv (version {manifest['version']})")
+
+    matrices = geo_matrices(migration_frame(daily_flows), MIGRATION_MATRIX_METRICS)
+    manifest = write_npz_artifact(matrices, "migration_matrices.npz", data_dir="data",
+                                  rows=len(matrices["states"]) + len(matrices["districts"]),
+                                  date_range=matrix_date_range(matrices))
+    print(f"Saved migration matrices to data/migration_matrices.npz (version {manifest['version']})")
+
+    digests = distance_digests(daily_flows)
+    manifest = write_artifact(digests, "distance_digests.csv", data_dir="data",
+                              metadata={"compression": DISTANCE_DIGEST_COMPRESSION})
+    print(f"Saved distance digests to data/distance_digests.csv (version {manifest['version']})")
 
-    net_output_path = "data/district_net_migration.csv"
-    net_migration.to_csv(net_output_path, index=False)
-    print(f"Saved net migration data to {net_output_path}")
+    if "Aadhaar_ID" in logs.columns:
+        sketches = resident_sketches(logs, pincode_master)
+        days = sketches["cell_day"].astype("datetime64[D]")
+        manifest = write_npz_artifact(
+            sketches, "unique_residents.npz", data_dir="data", rows=len(sketches["cell_day"]),
+            date_range=(str(days.min()), str(days.max())) if len(days) else (None, None),
+            metadata={"precision": int(sketches["precision"])},
+        )
+        print(f"Saved unique-resident sketches to data/unique_residents.npz (version {manifest['version']})")
 
     print("Sample Output (Flows):")
     print(daily_flows.head())
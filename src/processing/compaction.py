@@ -0,0 +1,83 @@
+import pandas as pd
+import numpy as np
+import os
+
+# Processed artifacts to report on when run as a script
+ARTIFACTS = ["district_flows.csv", "district_net_migration.csv", "district_anomalies.csv", "india_aggregated.csv"]
+
+# Columns treated as coordinates (stored as float32, ~1 m precision is plenty)
+COORD_SUFFIXES = ("lat", "lon", "latitude", "longitude")
+
+# Text columns with at most this share of unique values become categoricals
+MAX_CATEGORY_RATIO = 0.5
+
+# Counts are never narrowed below int32: consumers add, subtract and sum them
+# (metric columns, net migration, group-bys), and int8/int16 would silently wrap
+INT_DTYPES = (np.int32, np.int64)
+
+# Bumped whenever compact_frame's output dtypes change; copies persisted in
+# compacted form (the dashboard's shared datasets) are keyed by it
+COMPACTION_VERSION = 2
+
+def is_coordinate(col):
+    return col.lower().split("_")[-1] in COORD_SUFFIXES
+
+def smallest_int_dtype(values):
+    """Smallest of INT_DTYPES that holds every value, or None if not all integral."""
+    if len(values) == 0 or np.isnan(values).any() or not np.array_equal(values, np.round(values)):
+        return None
+    lo, hi = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return None
+
+def compact_frame(df):
+    """
+    Returns a copy of `df` with counts downcast to int32 where they fit (never
+    narrower, see INT_DTYPES), coordinates as float32 and repeated labels as
+    categoricals.
+    """
+    out = df.copy()
+    for col in out.columns:
+        series = out[col]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        if pd.api.types.is_numeric_dtype(series):
+            if is_coordinate(col):
+                out[col] = series.astype(np.float32)
+                continue
+            int_dtype = smallest_int_dtype(series.to_numpy(dtype=np.float64))
+            if int_dtype is not None:
+                out[col] = series.astype(int_dtype)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique(dropna=True) / len(series) <= MAX_CATEGORY_RATIO:
+                out[col] = series.astype("category")
+    return out
+
+def memory_report(name, before, after):
+    """Prints per-column and total deep memory usage before/after compaction."""
+    before_mem = before.memory_usage(deep=True, index=False)
+    after_mem = after.memory_usage(deep=True, index=False)
+    print(f"\n{name}: {len(before):,} rows")
+    print(f"  {'column':<22} {'before':>10} {'after':>10}  dtype")
+    for col in before.columns:
+        print(f"  {col:<22} {before_mem[col] / 1e3:>8.1f}KB {after_mem[col] / 1e3:>8.1f}KB  "
+              f"{before[col].dtype} -> {after[col].dtype}")
+    total_before, total_after = before_mem.sum(), after_mem.sum()
+    saved = 1 - total_after / total_before if total_before else 0
+    print(f"  {'TOTAL':<22} {total_before / 1e6:>8.2f}MB {total_after / 1e6:>8.2f}MB  ({saved:.0%} smaller)")
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), '../../data')
+    for name in ARTIFACTS:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            print(f"\n{name}: not found, skipping")
+            continue
+        df = pd.read_csv(path, parse_dates=["date"])
+        memory_report(name, df, compact_frame(df))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import pandas as pd
+import numpy as np
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from processing.schemas import LOG_SCHEMAS, convert_layout, detect_schema
+
+# Event identifiers carried by the raw feeds. UpdateID is unique per event, so it
+# is a sufficient key on its own. Aadhaar_ID identifies a resident (who may update
+# many times), so without UpdateID the event fields plus Aadhaar_ID form the key.
+EVENT_ID_COLUMN = "UpdateID"
+RESIDENT_ID_COLUMN = "Aadhaar_ID"
+
+# Bumped whenever event keys are hashed differently; a filter saved under another
+# version is rebuilt from the master log
+KEY_VERSION = 2
+
+# Bytes hashed at each end of the committed master-log prefix to recognise it
+LOG_SAMPLE_BYTES = 1 << 16
+
+# 16-byte keys for the two independent hashes used by double hashing
+HASH_KEY_1 = "aadhaarpulse0001"
+HASH_KEY_2 = "aadhaarpulse0002"
+
+
+class ScalableBloomFilter:
+    """
+    Scalable Bloom filter (Almeida et al.) over 64-bit hash pairs.
+
+    New layers are added as the filter fills, each with a larger capacity and a
+    tighter error rate, so the overall false-positive rate stays below `fp_rate`
+    no matter how many IDs are inserted.
+    """
+
+    def __init__(self, fp_rate=0.001, initial_capacity=1_000_000, growth=2, tightening=0.5):
+        self.fp_rate = fp_rate
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.tightening = tightening
+        self.layers = []  # list of dicts: bits, num_bits, num_hashes, capacity, count
+        self.extra = {}  # caller state (JSON) saved and loaded with the filter
+
+    def _new_layer(self):
+        i = len(self.layers)
+        capacity = int(self.initial_capacity * self.growth ** i)
+        # Geometric series of error rates sums to fp_rate
+        layer_fp = self.fp_rate * (1 - self.tightening) * self.tightening ** i
+        num_bits = int(np.ceil(-capacity * np.log(layer_fp) / np.log(2) ** 2))
+        num_bits = max(8, (num_bits + 7) // 8 * 8)
+        num_hashes = max(1, int(round(num_bits / capacity * np.log(2))))
+        layer = {
+            "bits": np.zeros(num_bits // 8, dtype=np.uint8),
+            "num_bits": num_bits,
+            "num_hashes": num_hashes,
+            "capacity": capacity,
+            "count": 0,
+        }
+        self.layers.append(layer)
+        return layer
+
+    @staticmethod
+    def _positions(layer, h1, h2):
+        # Kirsch-Mitzenmacher double hashing: h1 + i*h2 (mod m), uint64 wraparound is fine
+        i = np.arange(layer["num_hashes"], dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            pos = h1[:, None] + i[None, :] * h2[:, None]
+        return pos % np.uint64(layer["num_bits"])
+
+    def contains(self, h1, h2):
+        """Vectorized membership test for arrays of hash pairs."""
+        found = np.zeros(len(h1), dtype=bool)
+        for layer in self.layers:
+            pos = self._positions(layer, h1, h2)
+            bit_set = (layer["bits"][pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+            found |= bit_set.all(axis=1).astype(bool)
+        return found
+
+    def add(self, h1, h2):
+        """Inserts arrays of hash pairs, growing the filter when a layer is full."""
+        start = 0
+        while start < len(h1):
+            layer = self.layers[-1] if self.layers else None
+            if layer is None or layer["count"] >= layer["capacity"]:
+                layer = self._new_layer()
+            take = min(len(h1) - start, layer["capacity"] - layer["count"])
+            pos = self._positions(layer, h1[start:start + take], h2[start:start + take]).ravel()
+            np.bitwise_or.at(layer["bits"], pos >> np.uint64(3), (1 << (pos & np.uint64(7))).astype(np.uint8))
+            layer["count"] += take
+            start += take
+
+    def save(self, path):
+        meta = {
+            "fp_rate": self.fp_rate,
+            "initial_capacity": self.initial_capacity,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "layers": [{k: v for k, v in layer.items() if k != "bits"} for layer in self.layers],
+            "extra": self.extra,
+        }
+        arrays = {f"layer_{i}": layer["bits"] for i, layer in enumerate(self.layers)}
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            meta = json.loads(str(archive["meta"]))
+            bloom = cls(meta["fp_rate"], meta["initial_capacity"], meta["growth"], meta["tightening"])
+            bloom.extra = meta.get("extra", {})
+            for i, layer_meta in enumerate(meta["layers"]):
+                bloom.layers.append(dict(layer_meta, bits=archive[f"layer_{i}"].copy()))
+        return bloom
+
+    @property
+    def count(self):
+        return sum(layer["count"] for layer in self.layers)
+
+    @property
+    def nbytes(self):
+        return sum(layer["bits"].nbytes for layer in self.layers)
+
+
+def event_key_columns(logs):
+    """
+    Picks the columns that identify a single update event: UpdateID, or else the
+    raw event columns of the log's layout plus Aadhaar_ID. The list is fixed and
+    sorted, so the same record with reordered or extra columns has the same key.
+    """
+    if EVENT_ID_COLUMN in logs.columns:
+        return [EVENT_ID_COLUMN]
+    columns = set(LOG_SCHEMAS[detect_schema(logs.columns)]["columns"])
+    if RESIDENT_ID_COLUMN in logs.columns:
+        columns.add(RESIDENT_ID_COLUMN)
+    return sorted(columns)
+
+
+def hash_events(logs, key_cols):
+    """Returns two independent uint64 hashes per event."""
+    keys = logs[key_cols]
+    h1 = pd.util.hash_pandas_object(keys, index=False, hash_key=HASH_KEY_1).to_numpy()
+    h2 = pd.util.hash_pandas_object(keys, index=False, hash_key=HASH_KEY_2).to_numpy()
+    # An even step would only probe half of an even-sized bit array
+    return h1, h2 | np.uint64(1)
+
+
+def dedup_logs(logs, bloom):
+    """
+    Drops events already seen by `bloom` (or repeated within this batch) and
+    records the survivors in the filter.
+    Returns the deduplicated logs and the number of dropped duplicates.
+    """
+    if logs.empty:
+        return logs, 0
+
+    h1, h2 = hash_events(logs, event_key_columns(logs))
+
+    # Exact dedup within the batch (batch-sized memory only)
+    in_batch_dup = pd.DataFrame({"h1": h1, "h2": h2}).duplicated().to_numpy()
+    seen_before = np.zeros(len(logs), dtype=bool)
+    seen_before[~in_batch_dup] = bloom.contains(h1[~in_batch_dup], h2[~in_batch_dup])
+
+    keep = ~(in_batch_dup | seen_before)
+    bloom.add(h1[keep], h2[keep])
+    return logs[keep], int((~keep).sum())
+
+
+def log_fingerprint(logs_path, log_bytes):
+    """
+    Hash of the first `log_bytes` of the master log, sampled at both ends (the
+    header and first rows, and the rows just before the end), so a commit can be
+    recognised without re-reading the whole log.
+    """
+    digest = hashlib.sha256(str(log_bytes).encode())
+    with open(logs_path, "rb") as f:
+        digest.update(f.read(min(log_bytes, LOG_SAMPLE_BYTES)))
+        f.seek(max(0, log_bytes - LOG_SAMPLE_BYTES))
+        digest.update(f.read(log_bytes - f.tell()))
+    return digest.hexdigest()
+
+
+def commit(bloom, state_path, logs_path):
+    """
+    Saves the filter (atomically) together with the size and fingerprint of the
+    master log it covers; this is the commit point of an ingest step.
+    """
+    log_bytes = os.path.getsize(logs_path) if os.path.exists(logs_path) else 0
+    bloom.extra = {
+        "key_version": KEY_VERSION,
+        "log_bytes": log_bytes,
+        "log_fingerprint": log_fingerprint(logs_path, log_bytes) if log_bytes else None,
+    }
+    bloom.save(state_path)
+
+
+def committed_log_matches(logs_path, extra):
+    """
+    True if the master log still starts with the exact bytes the filter was
+    committed against (it may have grown since, by an uncommitted append).
+    False if it was replaced, rewritten or shortened.
+    """
+    log_bytes = extra.get("log_bytes")
+    if log_bytes is None:
+        return False
+    if not os.path.exists(logs_path):
+        return log_bytes == 0
+    if os.path.getsize(logs_path) < log_bytes:
+        return False
+    return log_bytes == 0 or log_fingerprint(logs_path, log_bytes) == extra.get("log_fingerprint")
+
+
+def rollback_uncommitted(logs_path, log_bytes):
+    """
+    Truncates rows appended to the master log after the last commit (a crashed
+    run). Only call once committed_log_matches has confirmed the prefix.
+    """
+    if os.path.exists(logs_path) and os.path.getsize(logs_path) > log_bytes:
+        with open(logs_path, "r+b") as f:
+            f.truncate(log_bytes)
+        return True
+    return False
+
+
+def load_or_create_filter(state_path, logs_path, fp_rate=0.001, initial_capacity=1_000_000):
+    """
+    Loads the persisted filter, rolling back master-log rows appended after it
+    was saved. Without a usable state (first run, keys hashed under another
+    KEY_VERSION, or a master log that is no longer the one the filter was
+    committed against, e.g. regenerated) a new filter is seeded from the current
+    master log, which is itself deduplicated. Returns the filter and the number
+    of duplicates dropped.
+    """
+    if os.path.exists(state_path):
+        bloom = ScalableBloomFilter.load(state_path)
+        if bloom.extra.get("key_version") == KEY_VERSION and committed_log_matches(logs_path, bloom.extra):
+            rollback_uncommitted(logs_path, bloom.extra["log_bytes"])
+            return bloom, 0
+
+    bloom = ScalableBloomFilter(fp_rate=fp_rate, initial_capacity=initial_capacity)
+    dropped = 0
+    if os.path.exists(logs_path):
+        master = pd.read_csv(logs_path, dtype=str)
+        deduped, dropped = dedup_logs(master, bloom)
+        if dropped:
+            tmp_path = logs_path + ".tmp"
+            deduped.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, logs_path)
+    commit(bloom, state_path, logs_path)
+    return bloom, dropped
+
+
+def ingest_incoming(data_dir="data", fp_rate=0.001, initial_capacity=1_000_000):
+    """
+    Deduplicates new raw batches from `<data_dir>/incoming/` into the master log.
+
+    The filter state is persisted in `<data_dir>/dedup_state.npz` so retried or
+    re-sent exports are dropped across incremental runs. On the first run the
+    existing master log seeds the filter (and is itself deduplicated).
+    Each batch is appended, then committed (the filter is saved with the new
+    log size), then moved to `incoming/processed/`. A run that crashes before
+    the commit has its partial append rolled back on the next run, and one that
+    crashes after it finds the batch's events already in the filter.
+    Batches are converted to the master log's layout before deduplication;
+    batches in an unrecognised layout are moved to `incoming/rejected/`.
+    """
+    logs_path = os.path.join(data_dir, "raw_aadhaar_logs.csv")
+    state_path = os.path.join(data_dir, "dedup_state.npz")
+    incoming_dir = os.path.join(data_dir, "incoming")
+    processed_dir = os.path.join(incoming_dir, "processed")
+    rejected_dir = os.path.join(incoming_dir, "rejected")
+
+    stats = {"ingested": 0, "dropped_duplicates": 0, "batches": 0, "rejected_batches": 0}
+
+    bloom, dropped = load_or_create_filter(state_path, logs_path, fp_rate, initial_capacity)
+    stats["dropped_duplicates"] += dropped
+
+    batch_files = sorted(glob.glob(os.path.join(incoming_dir, "*.csv")))
+    for batch_path in batch_files:
+        batch = pd.read_csv(batch_path, dtype=str)
+        master_exists = os.path.exists(logs_path)
+        try:
+            # Same layout as the master log, so keys hash alike and no column is lost
+            if master_exists:
+                batch = convert_layout(batch, pd.read_csv(logs_path, nrows=0).columns)
+            else:
+                detect_schema(batch.columns)
+        except ValueError as e:
+            logging.error(f"Rejecting {os.path.basename(batch_path)}: {e}")
+            os.makedirs(rejected_dir, exist_ok=True)
+            shutil.move(batch_path, os.path.join(rejected_dir, os.path.basename(batch_path)))
+            stats["rejected_batches"] += 1
+            continue
+
+        deduped, dropped = dedup_logs(batch, bloom)
+        stats["dropped_duplicates"] += dropped
+        stats["ingested"] += len(deduped)
+        stats["batches"] += 1
+
+        if master_exists:
+            deduped.to_csv(logs_path, mode="a", header=False, index=False)
+        else:
+            deduped.to_csv(logs_path, index=False)
+        commit(bloom, state_path, logs_path)
+
+        os.makedirs(processed_dir, exist_ok=True)
+        shutil.move(batch_path, os.path.join(processed_dir, os.path.basename(batch_path)))
+
+    stats["filter_items"] = bloom.count
+    stats["filter_bytes"] = bloom.nbytes
+    return stats
+
+
+if __name__ == "__main__":
+    result = ingest_incoming()
+    print(f"Ingested {result['ingested']} new events from {result['batches']} batch(es)")
+    print(f"Dropped {result['dropped_duplicates']} duplicate events")
+    if result["rejected_batches"]:
+        print(f"Rejected {result['rejected_batches']} batch(es) in an unrecognised layout")
+    print(f"Filter holds {result['filter_items']} events in {result['filter_bytes'] / 1e6:.1f} MB")
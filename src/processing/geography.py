@@ -0,0 +1,152 @@
+import pandas as pd
+import numpy as np
+
+# Canonical States/UTs -> ISO 3166-2:IN subdivision code. The order is fixed:
+# it defines the integer codes of STATE_DTYPE used by every processed artifact.
+STATE_CODES = {
+    "Andhra Pradesh": "AP", "Arunachal Pradesh": "AR", "Assam": "AS", "Bihar": "BR",
+    "Chhattisgarh": "CT", "Goa": "GA", "Gujarat": "GJ", "Haryana": "HR",
+    "Himachal Pradesh": "HP", "Jharkhand": "JH", "Karnataka": "KA", "Kerala": "KL",
+    "Madhya Pradesh": "MP", "Maharashtra": "MH", "Manipur": "MN", "Meghalaya": "ML",
+    "Mizoram": "MZ", "Nagaland": "NL", "Odisha": "OR", "Punjab": "PB",
+    "Rajasthan": "RJ", "Sikkim": "SK", "Tamil Nadu": "TN", "Telangana": "TG",
+    "Tripura": "TR", "Uttar Pradesh": "UP", "Uttarakhand": "UT", "West Bengal": "WB",
+    "Delhi": "DL", "Jammu and Kashmir": "JK", "Ladakh": "LA", "Puducherry": "PY",
+    "Andaman and Nicobar Islands": "AN", "Chandigarh": "CH",
+    "Dadra and Nagar Haveli and Daman and Diu": "DH", "Lakshadweep": "LD",
+}
+
+STATES = list(STATE_CODES)
+STATE_DTYPE = pd.CategoricalDtype(STATES)
+
+STATE_CENTERS = {
+    "Andhra Pradesh": (15.9129, 79.7400), "Arunachal Pradesh": (28.2180, 94.7278), "Assam": (26.2006, 92.9376),
+    "Bihar": (25.0961, 85.3131), "Chhattisgarh": (21.2787, 81.8661), "Goa": (15.2993, 74.1240),
+    "Gujarat": (22.2587, 71.1924), "Haryana": (29.0588, 76.0856), "Himachal Pradesh": (31.1048, 77.1734),
+    "Jharkhand": (23.6102, 85.2799), "Karnataka": (15.3173, 75.7139), "Kerala": (10.8505, 76.2711),
+    "Madhya Pradesh": (22.9734, 78.6569), "Maharashtra": (19.7515, 75.7139), "Manipur": (24.6637, 93.9063),
+    "Meghalaya": (25.4670, 91.3659), "Mizoram": (23.1645, 92.9376), "Nagaland": (26.1584, 94.5624),
+    "Odisha": (20.9517, 85.0985), "Punjab": (31.1471, 75.3412), "Rajasthan": (27.0238, 74.2179),
+    "Sikkim": (27.5330, 88.5122), "Tamil Nadu": (11.1271, 78.6569), "Telangana": (18.1124, 79.0193),
+    "Tripura": (23.9408, 91.9882), "Uttar Pradesh": (26.8467, 80.9462), "Uttarakhand": (30.0668, 79.0193),
+    "West Bengal": (22.9868, 87.8550), "Delhi": (28.6139, 77.2090), "Jammu and Kashmir": (33.7782, 76.5762),
+    "Ladakh": (34.1526, 77.5771), "Puducherry": (11.9416, 79.8083), "Andaman and Nicobar Islands": (11.7401, 92.6586),
+    "Chandigarh": (30.7333, 76.7794), "Dadra and Nagar Haveli and Daman and Diu": (20.1809, 73.0169),
+    "Lakshadweep": (10.5667, 72.6417)
+}
+
+INDIA_CENTER = (20.5937, 78.9629)
+
+# Spellings seen in source data (whitespace-collapsed, title-cased) -> canonical name
+STATE_ALIASES = {
+    # UTs
+    "Andaman & Nicobar Islands": "Andaman and Nicobar Islands",
+    "Andaman And Nicobar Islands": "Andaman and Nicobar Islands",
+    "Dadra & Nagar Haveli": "Dadra and Nagar Haveli and Daman and Diu",
+    "Dadra And Nagar Haveli": "Dadra and Nagar Haveli and Daman and Diu",
+    "Daman & Diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "The Dadra And Nagar Haveli And Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "Dadra And Nagar Haveli And Daman And Diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "Nct Of Delhi": "Delhi",
+    # Jammu & Kashmir
+    "Jammu & Kashmir": "Jammu and Kashmir",
+    "Jammu And Kashmir": "Jammu and Kashmir",
+    # Tamil Nadu
+    "Tamilnadu": "Tamil Nadu",
+    # Odisha
+    "Odisa": "Odisha",
+    "Orissa": "Odisha",
+    # Chhattisgarh
+    "Chhatisgarh": "Chhattisgarh",
+    # West Bengal
+    "West Bangal": "West Bengal",
+    "West Bengli": "West Bengal",
+    "Westbengal": "West Bengal",
+    # Uttarakhand
+    "Uttaranchal": "Uttarakhand",
+    # Pondicherry
+    "Pondicherry": "Puducherry",
+}
+
+# Constants and city names found in the state column of source data
+INVALID_STATE_NAMES = {'100000', 'Balanagar', 'Idpl Colony', 'Darbhanga', 'Jaipur', 'Nagpur',
+                       'Puttenahalli', 'Madanapalle', 'Raja Annamalai Puram'}
+
+# Former/alternate district names (title-cased) -> current official name
+DISTRICT_ALIASES = {
+    "Allahabad": "Prayagraj",
+    "Bangalore": "Bengaluru Urban",
+    "Bangalore Urban": "Bengaluru Urban",
+    "Bangalore Rural": "Bengaluru Rural",
+    "Bombay": "Mumbai",
+    "Calcutta": "Kolkata",
+    "Faizabad": "Ayodhya",
+    "Gulbarga": "Kalaburagi",
+    "Gurgaon": "Gurugram",
+    "Madras": "Chennai",
+    "Mysore": "Mysuru",
+    "Belgaum": "Belagavi",
+    "Bellary": "Ballari",
+    "Shimoga": "Shivamogga",
+    "Tumkur": "Tumakuru",
+    "Mewat": "Nuh",
+}
+
+_CANONICAL_BY_LOWER = {name.lower(): name for name in STATES}
+
+def _clean(name):
+    if not isinstance(name, str):
+        return ""
+    return " ".join(name.split()).title()
+
+def normalize_state_name(state):
+    """Canonical State/UT name, or None for blank, numeric or invalid values."""
+    s = _clean(state)
+    if not s or s.isdigit() or s in INVALID_STATE_NAMES:
+        return None
+    s = STATE_ALIASES.get(s, s)
+    # Title-casing turns "and" into "And"; match canonical names case-insensitively
+    return _CANONICAL_BY_LOWER.get(s.lower())
+
+def normalize_district_name(district):
+    """Canonical district name (title case, current official name), or None if blank."""
+    s = _clean(district)
+    if not s or s.isdigit():
+        return None
+    return DISTRICT_ALIASES.get(s, s)
+
+def remap_unique(values, normalize, dtype=None):
+    """
+    Applies `normalize` once per distinct value and remaps the column through its
+    codes, so the cost scales with the number of unique labels, not rows.
+    Returns a Categorical (with `dtype` if given); values mapping to None become NaN.
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    cleaned = pd.Index([normalize(u) for u in uniques], dtype=object)
+    categories = dtype.categories if dtype is not None else pd.Index(cleaned.dropna().unique())
+    lookup = np.append(categories.get_indexer(cleaned), -1)  # last slot: NA sentinel
+    return pd.Categorical.from_codes(lookup[codes], dtype=dtype or pd.CategoricalDtype(categories))
+
+def canonical_states(values):
+    """State column as STATE_DTYPE codes; unknown or invalid names become NaN."""
+    return remap_unique(values, normalize_state_name, STATE_DTYPE)
+
+def coded_states(values):
+    """Integer-codes already-canonical state names as STATE_DTYPE; anything else becomes NaN."""
+    values = pd.Series(values)
+    return values.where(values.isin(STATES)).astype(STATE_DTYPE)
+
+def canonical_districts(values):
+    return remap_unique(values, normalize_district_name)
+
+def state_center(state):
+    return STATE_CENTERS.get(state, INDIA_CENTER)
+
+def haversine_np(lon1, lat1, lon2, lat2):
+    """Vectorized haversine distance in km for arrays of coordinates."""
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    return 2 * np.arcsin(np.sqrt(a)) * 6371
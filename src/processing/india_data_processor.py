@@ -1,9 +1,206 @@
 import pandas as pd
+import numpy as np
+import argparse
 import glob
+import hashlib
+import json
 import os
+import sys
 import tqdm
 
-def process_india_data():
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from processing.geography import canonical_states, canonical_districts, state_center
+from processing.matrices import geo_matrices, matrix_date_range, PULSE_MATRIX_METRICS
+from utils.artifacts import write_artifact, write_npz_artifact, atomic_write, file_sha256
+
+# API dumps carry dates as DD-MM-YYYY
+API_DATE_FORMAT = "%d-%m-%Y"
+CHUNK_SIZE = 250_000
+KEY_COLS = ['day', 'state', 'district']
+
+# Incremental runs: every processed dump is recorded (path, size, mtime, sha256)
+# with its own partial aggregate, so a rerun only reads new or changed files
+FILE_MANIFEST_NAME = "india_files_manifest.json"
+PARTIALS_DIR_NAME = "india_partials"
+
+def to_day_key(dates):
+    """Parses API date strings into int32 days since the Unix epoch."""
+    parsed = pd.to_datetime(dates, format=API_DATE_FORMAT)
+    return parsed.to_numpy().astype('datetime64[D]').astype(np.int32)
+
+def from_day_key(days):
+    return pd.to_datetime(np.asarray(days, dtype='int64').astype('datetime64[D]'))
+
+def fold_chunk(acc, chunk, value_cols):
+    """Aggregates one chunk and folds it into the running keyed aggregate."""
+    chunk['day'] = to_day_key(chunk['date'])
+    part = chunk.groupby(KEY_COLS, sort=False)[value_cols].sum()
+    if acc is None:
+        return part
+    return pd.concat([acc, part]).groupby(level=KEY_COLS, sort=False).sum()
+
+def canonicalize_geography(agg, value_cols):
+    """
+    Maps raw state/district labels onto the canonical geography (once per unique
+    label) and re-sums keys that collapse together, e.g. "Orissa" and "Odisha".
+    Rows with an invalid state are dropped.
+    """
+    agg['state'] = canonical_states(agg['state'])
+    agg['district'] = canonical_districts(agg['district'])
+    agg = agg.dropna(subset=['state', 'district'])
+    return agg.groupby(KEY_COLS, observed=True, sort=False)[value_cols].sum().reset_index()
+
+def aggregate_file(path, value_cols, chunksize=CHUNK_SIZE):
+    """
+    Streams one file in fixed-size chunks into its (day, state, district)
+    partial aggregate, with the raw labels; memory is bounded by its key count.
+    """
+    acc = None
+    dtypes = {'date': 'string', 'state': 'string', 'district': 'string'}
+    dtypes.update({c: 'int64' for c in value_cols})
+    reader = pd.read_csv(path, usecols=['date', 'state', 'district'] + value_cols, dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        acc = fold_chunk(acc, chunk, value_cols)
+    if acc is None:
+        return pd.DataFrame(columns=KEY_COLS + value_cols)
+    return acc.reset_index()
+
+def fold_partials(partials, value_cols):
+    """Sums per-file partial aggregates into one and canonicalizes its geography."""
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame(columns=KEY_COLS + value_cols)
+    acc = pd.concat(partials, ignore_index=True).groupby(KEY_COLS, sort=False)[value_cols].sum()
+    return canonicalize_geography(acc.reset_index(), value_cols)
+
+class FileManifest:
+    """
+    Manifest of processed dumps with a cached partial aggregate per file. A file
+    whose size and mtime are unchanged is trusted without reading it; otherwise
+    its sha256 decides whether the cached partial is still valid.
+
+    Per group of value columns it also keeps the running (uncanonicalized) fold
+    of every file seen so far, so when dumps are only added, a refresh reads that
+    one fold plus the new files instead of re-folding every cached partial.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, FILE_MANIFEST_NAME)
+        self.partials_dir = os.path.join(data_dir, PARTIALS_DIR_NAME)
+        os.makedirs(self.partials_dir, exist_ok=True)
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+            self.files = manifest['files']
+            self.folds = manifest.get('folds', {})
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self.files, self.folds = {}, {}
+        self.seen = set()
+        self.stats = {'reused': 0, 'aggregated': 0, 'folded': 0}
+
+    def reset(self):
+        """Forgets every cached partial and fold (a full refresh)."""
+        self.files, self.folds = {}, {}
+
+    def _entry(self, path, value_cols):
+        """The manifest entry of an unchanged file whose partial is cached, else None."""
+        key = os.path.abspath(path)
+        self.seen.add(key)
+        entry = self.files.get(key)
+        if entry is None or entry['value_cols'] != value_cols:
+            return None
+        if not os.path.exists(os.path.join(self.partials_dir, entry['partial'])):
+            return None
+        stat = os.stat(path)
+        if (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            if entry['sha256'] != file_sha256(path):
+                return None
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)  # touched, not changed
+        return entry
+
+    def partial(self, path, value_cols, chunksize=CHUNK_SIZE):
+        """The file's partial aggregate, from the cache when the file is unchanged."""
+        entry = self._entry(path, value_cols)
+        if entry:
+            self.stats['reused'] += 1
+            return pd.read_parquet(os.path.join(self.partials_dir, entry['partial']))
+
+        stat = os.stat(path)
+        sha256 = file_sha256(path)
+        part = aggregate_file(path, value_cols, chunksize)
+        partial_name = f"{sha256[:20]}.parquet"
+        atomic_write(os.path.join(self.partials_dir, partial_name), lambda p: part.to_parquet(p, index=False))
+        self.files[os.path.abspath(path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'value_cols': value_cols,
+            'rows': int(len(part)),
+            'partial': partial_name,
+        }
+        self.stats['aggregated'] += 1
+        return part
+
+    def fold(self, files, value_cols, chunksize=CHUNK_SIZE):
+        """
+        Raw-label (day, state, district) fold of `files`. Starts from the cached
+        fold when every file in it is still present and unchanged, and adds only
+        the new files; otherwise (a dump was removed or rewritten) re-folds the
+        per-file partials. The new fold is cached for the next run.
+        """
+        group = ",".join(value_cols)
+        cached = self.folds.get(group)
+        current = {os.path.abspath(f): f for f in files}
+        acc, todo, reused = None, files, False
+        if cached and os.path.exists(os.path.join(self.partials_dir, cached['partial'])) and all(
+            key in current and (entry := self._entry(current[key], value_cols)) and entry['sha256'] == sha256
+            for key, sha256 in cached['files'].items()
+        ):
+            acc = pd.read_parquet(os.path.join(self.partials_dir, cached['partial'])).set_index(KEY_COLS)
+            todo = [f for key, f in current.items() if key not in cached['files']]
+            reused = True
+            self.stats['folded'] += len(cached['files'])
+
+        parts = [p for p in (self.partial(f, value_cols, chunksize) for f in tqdm.tqdm(todo, desc="Processing files")) if len(p)]
+        if parts:
+            folded = pd.concat(parts, ignore_index=True).groupby(KEY_COLS, sort=False)[value_cols].sum()
+            acc = folded if acc is None else pd.concat([acc, folded]).groupby(level=KEY_COLS, sort=False).sum()
+        acc = (acc.reset_index() if acc is not None else pd.DataFrame(columns=KEY_COLS + value_cols))
+
+        if todo or not reused:
+            shas = {key: self.files[key]['sha256'] for key in sorted(current)}
+            fold_name = "fold_" + hashlib.sha256(json.dumps([group, shas]).encode('utf-8')).hexdigest()[:20] + ".parquet"
+            atomic_write(os.path.join(self.partials_dir, fold_name), lambda p: acc.to_parquet(p, index=False))
+            self.folds[group] = {'files': shas, 'partial': fold_name}
+        return acc
+
+    def save(self):
+        """Forgets files not seen in this run, deletes unreferenced partials and writes the manifest."""
+        self.files = {k: v for k, v in self.files.items() if k in self.seen}
+        self.folds = {g: fold for g, fold in self.folds.items() if set(fold['files']) <= set(self.files)}
+        referenced = {entry['partial'] for entry in self.files.values()}
+        referenced |= {fold['partial'] for fold in self.folds.values()}
+        for partial_path in glob.glob(os.path.join(self.partials_dir, "*.parquet")):
+            if os.path.basename(partial_path) not in referenced:
+                os.remove(partial_path)
+
+        def write(p):
+            with open(p, 'w') as f:
+                json.dump({'files': self.files, 'folds': self.folds}, f, indent=2)
+        atomic_write(self.path, write)
+
+def aggregate_files(files, value_cols, chunksize=CHUNK_SIZE, manifest=None):
+    """
+    Aggregates every file into a single canonical (day, state, district) frame.
+    With a FileManifest, only files added since the last run are read.
+    """
+    if manifest:
+        return fold_partials([manifest.fold(files, value_cols, chunksize)], value_cols)
+    partials = [aggregate_file(f, value_cols, chunksize) for f in tqdm.tqdm(files, desc="Processing files")]
+    return fold_partials(partials, value_cols)
+
+def process_india_data(full_refresh=False):
     # File is in /aadhaarpulse/src/processing/
     # Project root is /aadhaarpulse/
     # Files are in / (parent of project root)
@@ -14,86 +211,52 @@ def process_india_data():
     data_out_dir = os.path.join(project_root, "data")
     os.makedirs(data_out_dir, exist_ok=True)
 
-    STATE_CENTERS = {
-        "Andhra Pradesh": (15.9129, 79.7400), "Arunachal Pradesh": (28.2180, 94.7278), "Assam": (26.2006, 92.9376),
-        "Bihar": (25.0961, 85.3131), "Chhattisgarh": (21.2787, 81.8661), "Goa": (15.2993, 74.1240),
-        "Gujarat": (22.2587, 71.1924), "Haryana": (29.0588, 76.0856), "Himachal Pradesh": (31.1048, 77.1734),
-        "Jharkhand": (23.6102, 85.2799), "Karnataka": (15.3173, 75.7139), "Kerala": (10.8505, 76.2711),
-        "Madhya Pradesh": (22.9734, 78.6569), "Maharashtra": (19.7515, 75.7139), "Manipur": (24.6637, 93.9063),
-        "Meghalaya": (25.4670, 91.3659), "Mizoram": (23.1645, 92.9376), "Nagaland": (26.1584, 94.5624),
-        "Odisha": (20.9517, 85.0985), "Punjab": (31.1471, 75.3412), "Rajasthan": (27.0238, 74.2179),
-        "Sikkim": (27.5330, 88.5122), "Tamil Nadu": (11.1271, 78.6569), "Telangana": (18.1124, 79.0193),
-        "Tripura": (23.9408, 91.9882), "Uttar Pradesh": (26.8467, 80.9462), "Uttarakhand": (30.0668, 79.0193),
-        "West Bengal": (22.9868, 87.8550), "Delhi": (28.6139, 77.2090), "Jammu and Kashmir": (33.7782, 76.5762),
-        "Ladakh": (34.1526, 77.5771), "Puducherry": (11.9416, 79.8083), "Andaman and Nicobar Islands": (11.7401, 92.6586),
-        "Chandigarh": (30.7333, 76.7794), "Dadra and Nagar Haveli and Daman and Diu": (20.1809, 73.0169),
-        "Lakshadweep": (10.5667, 72.6417)
-    }
-
     print(f"--- Starting Pan-India Data Processing ---")
     print(f"Searching in: {parent_dir}")
 
-    # 1. Gather file groups
-    demo_files = glob.glob(os.path.join(parent_dir, "api_data_aadhar_demographic_*.csv"))
-    bio_files = glob.glob(os.path.join(parent_dir, "api_data_aadhar_biometric_*.csv"))
-    enrol_files = glob.glob(os.path.join(parent_dir, "api_data_aadhar_enrolment_*.csv"))
+    # 1. Gather file groups (sorted, so the output row order is reproducible)
+    demo_files = sorted(glob.glob(os.path.join(parent_dir, "api_data_aadhar_demographic_*.csv")))
+    bio_files = sorted(glob.glob(os.path.join(parent_dir, "api_data_aadhar_biometric_*.csv")))
+    enrol_files = sorted(glob.glob(os.path.join(parent_dir, "api_data_aadhar_enrolment_*.csv")))
 
     if not demo_files:
         print("Error: No data files found! Check parent directory paths.")
         return
 
-    def aggregate_files(files, group_cols, agg_dict):
-        dfs = []
-        for f in tqdm.tqdm(files, desc="Processing files"):
-            df = pd.read_csv(f)
-            # Standardize date format to YYYY-MM-DD
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'], dayfirst=True).dt.strftime('%Y-%m-%d')
-            
-            # Aggregate immediately to save memory
-            agg_df = df.groupby(group_cols).agg(agg_dict).reset_index()
-            dfs.append(agg_df)
-        
-        # Combine all parts and aggregate again
-        combined = pd.concat(dfs)
-        return combined.groupby(group_cols).agg(agg_dict).reset_index()
-
-    # Define aggregation logic
-    agg_group = ['date', 'state', 'district']
-    
-    demo_agg_dict = {
-        'demo_age_5_17': 'sum',
-        'demo_age_17_': 'sum'
-    }
-    
-    bio_agg_dict = {
-        'bio_age_5_17': 'sum',
-        'bio_age_17_': 'sum'
-    }
-    
-    enrol_agg_dict = {
-        'age_0_5': 'sum',
-        'age_5_17': 'sum',
-        'age_18_greater': 'sum'
-    }
+    # Define aggregation logic (all value columns are summed)
+    demo_cols = ['demo_age_5_17', 'demo_age_17_']
+    bio_cols = ['bio_age_5_17', 'bio_age_17_']
+    enrol_cols = ['age_0_5', 'age_5_17', 'age_18_greater']
+
+    # Process and Aggregate (only new or changed files are read, unless full_refresh)
+    file_manifest = FileManifest(data_out_dir)
+    if full_refresh:
+        file_manifest.reset()
 
-    # Process and Aggregate
     print("\n[1/3] Aggregating Demographic Data...")
-    demo_final = aggregate_files(demo_files, agg_group, demo_agg_dict)
+    demo_final = aggregate_files(demo_files, demo_cols, manifest=file_manifest)
     
     print("\n[2/3] Aggregating Biometric Data...")
-    bio_final = aggregate_files(bio_files, agg_group, bio_agg_dict)
+    bio_final = aggregate_files(bio_files, bio_cols, manifest=file_manifest)
     
     print("\n[3/3] Aggregating Enrolment Data...")
-    enrol_final = aggregate_files(enrol_files, agg_group, enrol_agg_dict)
+    enrol_final = aggregate_files(enrol_files, enrol_cols, manifest=file_manifest)
+    file_manifest.save()
+    stats = file_manifest.stats
+    print(f"Files aggregated: {stats['aggregated']}, reused from cache: {stats['reused']}, "
+          f"already folded: {stats['folded']}")
 
     # 2. Merge all sources
     print("\nMerging datasets...")
-    merged = pd.merge(demo_final, bio_final, on=agg_group, how='outer')
-    merged = pd.merge(merged, enrol_final, on=agg_group, how='outer')
+    merged = pd.merge(demo_final, bio_final, on=KEY_COLS, how='outer')
+    merged = pd.merge(merged, enrol_final, on=KEY_COLS, how='outer')
     
-    # Fill NaNs with 0
-    merged = merged.fillna(0)
+    # Fill NaNs with 0 (the outer merges turn counts into floats, restore integers)
+    value_cols = demo_cols + bio_cols + enrol_cols
+    merged[value_cols] = merged[value_cols].fillna(0).astype('int64')
+
+    # Integer day keys back to dates (written as YYYY-MM-DD)
+    merged.insert(0, 'date', from_day_key(merged.pop('day')))
 
     # 3. Add Metric for "Total Digital Growth" or similar
     merged['total_updates'] = merged['demo_age_5_17'] + merged['demo_age_17_'] + \
@@ -109,8 +272,7 @@ def process_india_data():
     random.seed(42) # Consistent jitter
     
     def get_coords(row):
-        state = row['state']
-        base_lat, base_lon = STATE_CENTERS.get(state, (20.5937, 78.9629)) # India center fallback
+        base_lat, base_lon = state_center(row['state']) # India center fallback
         # Jitter more for India-wide to avoid overlapping in state center
         return base_lat + random.uniform(-0.5, 0.5), base_lon + random.uniform(-0.5, 0.5)
 
@@ -122,10 +284,19 @@ def process_india_data():
 
     # 5. Save
     output_path = os.path.join(data_out_dir, "india_aggregated.csv")
-    merged.to_csv(output_path, index=False)
+    manifest = write_artifact(merged, "india_aggregated.csv", data_dir=data_out_dir)
     print(f"\n--- SUCCESS ---")
-    print(f"Processed data saved to: {output_path}")
+    print(f"Processed data saved to: {output_path} (version {manifest['version']})")
     print(f"Total aggregated records: {len(merged)}")
 
+    # 6. Dense states x dates and districts x dates matrices for comparison views
+    matrices = geo_matrices(merged, PULSE_MATRIX_METRICS)
+    manifest = write_npz_artifact(matrices, "pulse_matrices.npz", data_dir=data_out_dir,
+                                  rows=len(matrices['states']) + len(matrices['districts']),
+                                  date_range=matrix_date_range(matrices))
+    print(f"Metric matrices saved to: {os.path.join(data_out_dir, 'pulse_matrices.npz')} (version {manifest['version']})")
+
 if __name__ == "__main__":
-    process_india_data()
+    parser = argparse.ArgumentParser(description="Aggregate the Pan-India API dumps into data/india_aggregated.csv.")
+    parser.add_argument("--full", action="store_true", help="ignore cached per-file aggregates and re-read every file")
+    process_india_data(full_refresh=parser.parse_args().full)
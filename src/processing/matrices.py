@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+
+# Activity metric -> india_aggregated columns summed into it (the dashboard's views)
+PULSE_MATRIX_METRICS = {
+    'total_updates': ['total_updates'],
+    'biometric_updates': ['bio_age_5_17', 'bio_age_17_'],
+    'demographic_updates': ['demo_age_5_17', 'demo_age_17_'],
+    'total_enrolments': ['total_enrolments'],
+}
+
+MIGRATION_MATRIX_METRICS = {
+    'inflow': ['inflow'],
+    'outflow': ['outflow'],
+    'net_migration': ['net_migration'],
+}
+
+def geo_matrices(df, values, date_col='date', state_col='state', district_col='district'):
+    """
+    Scatters a long (date, state, district, value...) frame into dense
+    matrices over every day of its date range, for comparison views that read
+    array slices instead of regrouping frames. `values` maps a metric name to
+    the column(s) summed into it. Returns the arrays stored in the .npz artifact:
+      dates                       datetime64[D], one per matrix column
+      states                      row labels of state_<metric> (sorted)
+      districts/district_states   row labels of district_<metric>, sorted by (state, district)
+      state_<metric>              int32 (n_states, n_days), 0 where nothing was recorded
+      district_<metric>           int32 (n_districts, n_days)
+    """
+    days = pd.to_datetime(df[date_col]).to_numpy().astype('datetime64[D]')
+    if len(days):
+        first = days.min()
+        n_days = int((days.max() - first).astype(np.int64)) + 1
+    else:
+        # No rows: zero-width matrices and no labels (matrix_date_range reads this as no data)
+        first, n_days = np.datetime64(0, 'D'), 0
+    day_idx = (days - first).astype(np.int64)
+
+    state_labels = df[state_col].astype(str)
+    state_idx, states = pd.factorize(state_labels, sort=True)
+    district_idx, districts = pd.MultiIndex.from_arrays([state_labels, df[district_col].astype(str)]).factorize(sort=True)
+
+    arrays = {
+        'dates': np.arange(first, first + n_days),
+        'states': np.asarray(states, dtype=str),
+        'districts': districts.get_level_values(1).to_numpy(dtype=str),
+        'district_states': districts.get_level_values(0).to_numpy(dtype=str),
+    }
+    for name, cols in values.items():
+        weights = df[cols].sum(axis=1).to_numpy(dtype=np.float64)
+        for level, idx, n_rows in (('state', state_idx, len(states)), ('district', district_idx, len(districts))):
+            # One flat bincount per matrix: cell = row * n_days + day
+            flat = np.bincount(idx * n_days + day_idx, weights=weights, minlength=n_rows * n_days)
+            arrays[f'{level}_{name}'] = flat.reshape(n_rows, n_days).astype(np.int32)
+    return arrays
+
+def migration_frame(daily_flows):
+    """Per (date, state, district) inflow, outflow and net migration from district flows."""
+    keys = ['date', 'state', 'district']
+    inflow = daily_flows.groupby(['date', 'dest_state', 'dest_district'], observed=True)['count'].sum()
+    outflow = daily_flows.groupby(['date', 'source_state', 'source_district'], observed=True)['count'].sum()
+    frame = pd.concat([inflow.rename_axis(keys).rename('inflow'), outflow.rename_axis(keys).rename('outflow')],
+                      axis=1).fillna(0).astype('int64')
+    frame['net_migration'] = frame['inflow'] - frame['outflow']
+    return frame.reset_index()
+
+def matrix_date_range(arrays):
+    dates = arrays['dates']
+    return (str(dates[0]), str(dates[-1])) if len(dates) else (None, None)
@@ -0,0 +1,241 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import logging
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, 'data', 'pipeline_manifest.json')
+
+# The ETL DAG. Paths are relative to the project root and may be glob patterns.
+#   script:          run with the current interpreter from the project root
+#   inputs/outputs:  artifacts whose content hashes decide whether the stage is stale
+#   optional_outputs: files the stage writes only in some runs (e.g. when a column is present)
+#   code:            source files the stage runs (besides its script), hashed like inputs
+#   env:             environment variables that change the stage's output
+#   after:           stages that must finish first
+#   only_if_missing: never re-run while the outputs exist (e.g. random data generators)
+#   optional:        skip (rather than fail) when no input file exists
+STAGES = {
+    'generate': {
+        'script': 'src/generation/mock_generator.py',
+        'inputs': ['data/pincode_master.csv'],
+        'outputs': ['data/raw_aadhaar_logs.csv'],
+        'after': [],
+        'only_if_missing': True,
+    },
+    'aggregate': {
+        'script': 'src/processing/aggregator.py',
+        'inputs': ['data/raw_aadhaar_logs.csv', 'data/pincode_master.csv', 'data/incoming/*.csv'],
+        'outputs': ['data/district_flows.csv', 'data/district_net_migration.csv', 'data/corridor_sketches.csv',
+                    'data/distance_digests.csv', 'data/migration_matrices.npz'],
+        # unique_residents.npz only when the logs carry Aadhaar_ID
+        'optional_outputs': ['data/unique_residents.npz', 'data/dedup_state.npz'],
+        'code': ['src/processing/dedup.py', 'src/processing/schemas.py', 'src/processing/geography.py',
+                 'src/processing/matrices.py', 'src/utils/sketches.py', 'src/utils/artifacts.py'],
+        'after': ['generate'],
+    },
+    'anomaly': {
+        'script': 'src/models/anomaly.py',
+        'inputs': ['data/district_flows.csv', 'data/distance_digests.csv'],
+        'outputs': ['data/district_anomalies.csv'],
+        # aggregator.py is imported, so its own imports count too
+        'code': ['src/processing/aggregator.py', 'src/processing/dedup.py', 'src/processing/schemas.py',
+                 'src/processing/geography.py', 'src/processing/matrices.py', 'src/utils/sketches.py',
+                 'src/utils/artifacts.py'],
+        'env': ['AADHAAR_ANOMALY_ENGINE'],
+        'after': ['aggregate'],
+    },
+    'india': {
+        'script': 'src/processing/india_data_processor.py',
+        'inputs': ['../api_data_aadhar_*.csv'],
+        'outputs': ['data/india_aggregated.csv', 'data/pulse_matrices.npz'],
+        'code': ['src/processing/geography.py', 'src/processing/matrices.py', 'src/utils/artifacts.py'],
+        'after': [],
+        'optional': True,
+    },
+}
+
+
+class Manifest:
+    """Content hashes of stage inputs/outputs, plus a (size, mtime) cache to avoid rehashing."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+        else:
+            data = {}
+        self.stages = data.get('stages', {})
+        self.files = data.get('files', {})
+
+    def file_hash(self, rel_path):
+        path = os.path.join(PROJECT_ROOT, rel_path)
+        stat = os.stat(path)
+        with self.lock:
+            cached = self.files.get(rel_path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        with self.lock:
+            self.files[rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def hash_artifacts(self, patterns):
+        """Maps every file matched by `patterns` to its content hash."""
+        hashes = {}
+        for pattern in patterns:
+            for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, pattern))):
+                rel = os.path.relpath(path, PROJECT_ROOT)
+                hashes[rel] = self.file_hash(rel)
+        return hashes
+
+    def hash_inputs(self, stage):
+        """
+        Everything a stage's output depends on: its input artifacts, its script
+        and code files (by content hash) and its environment variables (by value).
+        """
+        hashes = self.hash_artifacts(stage['inputs'] + [stage['script']] + stage.get('code', []))
+        hashes.update({f"env:{name}": os.environ.get(name) for name in stage.get('env', [])})
+        return hashes
+
+    def record(self, name, inputs, outputs, duration_s):
+        with self.lock:
+            self.stages[name] = {
+                'inputs': inputs,
+                'outputs': outputs,
+                'duration_s': round(duration_s, 3),
+                'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'stages': self.stages, 'files': self.files}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def outputs_exist(stage):
+    return all(glob.glob(os.path.join(PROJECT_ROOT, pattern)) for pattern in stage['outputs'])
+
+
+def inputs_exist(stage):
+    return any(glob.glob(os.path.join(PROJECT_ROOT, pattern)) for pattern in stage['inputs'])
+
+
+def stale_reason(name, stage, manifest):
+    """Returns why a stage must run, or None if it is up to date."""
+    if stage.get('only_if_missing'):
+        return None if outputs_exist(stage) else 'outputs missing'
+    if not outputs_exist(stage):
+        return 'outputs missing'
+    previous = manifest.stages.get(name)
+    if previous is None:
+        return 'never run'
+    # Optional outputs the last run wrote must still be there
+    if not all(os.path.exists(os.path.join(PROJECT_ROOT, rel)) for rel in previous['outputs']):
+        return 'outputs missing'
+    if manifest.hash_inputs(stage) != previous['inputs']:
+        return 'inputs or code changed'
+    return None
+
+
+def run_stage(name, stage, manifest):
+    start = time.perf_counter()
+    logging.info(f"[{name}] running {stage['script']}")
+    result = subprocess.run([sys.executable, stage['script']], cwd=PROJECT_ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    duration = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"[{name}] failed with exit code {result.returncode}:\n{result.stdout[-2000:]}")
+    if not outputs_exist(stage):
+        raise RuntimeError(f"[{name}] finished without producing {stage['outputs']}:\n{result.stdout[-2000:]}")
+
+    # Hashes are taken after the run so stages that rewrite their own inputs settle
+    outputs = manifest.hash_artifacts(stage['outputs'] + stage.get('optional_outputs', []))
+    manifest.record(name, manifest.hash_inputs(stage), outputs, duration)
+    manifest.save()
+    logging.info(f"[{name}] done in {duration:.1f}s")
+
+
+def run_pipeline(stages=STAGES, force=False, max_workers=4):
+    """
+    Runs the DAG, skipping stages whose inputs are unchanged (or, for optional
+    stages, absent) and running independent stages concurrently.
+    Returns {stage: 'ran' | 'skipped' | 'failed' | 'blocked'}.
+    """
+    manifest = Manifest()
+    status = {}
+    pending = dict(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Schedule until no more stages become ready (skips can unblock dependents)
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    deps = stage['after']
+                    if any(status.get(d) in ('failed', 'blocked') for d in deps):
+                        status[name] = 'blocked'
+                    elif stage.get('optional') and not inputs_exist(stage) and all(
+                            status.get(d) in ('ran', 'skipped') for d in deps):
+                        logging.info(f"[{name}] no inputs ({', '.join(stage['inputs'])}), skipping")
+                        status[name] = 'skipped'
+                    elif all(status.get(d) in ('ran', 'skipped') for d in deps):
+                        reason = 'forced' if force and not stage.get('only_if_missing') else stale_reason(name, stage, manifest)
+                        if reason is None:
+                            logging.info(f"[{name}] up to date, skipping")
+                            status[name] = 'skipped'
+                        else:
+                            logging.info(f"[{name}] stale ({reason})")
+                            running[pool.submit(run_stage, name, stage, manifest)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    progressed = True
+
+            if not running:
+                # Remaining stages wait on unknown dependencies
+                for name in pending:
+                    status[name] = 'blocked'
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    status[name] = 'ran'
+                except Exception as e:
+                    logging.error(str(e))
+                    status[name] = 'failed'
+
+    manifest.save()
+    return status
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    status = run_pipeline(force='--force' in sys.argv)
+    print(f"\nPipeline finished in {time.perf_counter() - start:.2f}s")
+    for name in STAGES:
+        state = status.get(name)
+        print(f"  {name:<10} {state}")
+    sys.exit(1 if 'failed' in status.values() else 0)
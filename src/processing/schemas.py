@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+from enum import Enum
+
+
+class UpdateType(str, Enum):
+    """Canonical Aadhaar update types shared by every raw log layout."""
+    ADDRESS = "Address"
+    BIOMETRIC = "Biometric"
+    MOBILE = "Mobile"
+    EMAIL = "Email"
+    DOB = "DoB"
+    OTHER = "Other"
+
+
+UPDATE_TYPE_DTYPE = pd.CategoricalDtype([t.value for t in UpdateType])
+
+# Raw labels seen in the feeds -> canonical update type
+UPDATE_TYPE_ALIASES = {
+    "Address": UpdateType.ADDRESS,
+    "Address Change": UpdateType.ADDRESS,
+    "Biometric": UpdateType.BIOMETRIC,
+    "Biometric Update": UpdateType.BIOMETRIC,
+    "Mobile": UpdateType.MOBILE,
+    "Mobile Update": UpdateType.MOBILE,
+    "Email Update": UpdateType.EMAIL,
+    "DoB Update": UpdateType.DOB,
+}
+
+# Canonical columns produced by every adapter
+CANONICAL_COLUMNS = ["Timestamp", "Update_Type", "Source_Pincode", "Dest_Pincode"]
+ID_COLUMNS = ["UpdateID", "Aadhaar_ID"]
+
+# Supported raw layouts. `columns` maps raw column names to canonical ones.
+LOG_SCHEMAS = {
+    # data/raw_aadhaar_logs.csv written by the generators in src/
+    "source_dest": {
+        "columns": {
+            "Timestamp": "Timestamp",
+            "Update_Type": "Update_Type",
+            "Source_Pincode": "Source_Pincode",
+            "Dest_Pincode": "Dest_Pincode",
+        },
+        # The Faker generator writes microseconds, the pincode generator doesn't;
+        # ISO8601 is a fixed grammar that covers both without per-row inference.
+        "timestamp_format": "ISO8601",
+    },
+    # aadhaarpulse/data/raw_aadhaar_logs.csv
+    "previous_current": {
+        "columns": {
+            "Timestamp": "Timestamp",
+            "Update_Type": "Update_Type",
+            "Previous_Pincode": "Source_Pincode",
+            "Current_Pincode": "Dest_Pincode",
+        },
+        "timestamp_format": "%Y-%m-%d %H:%M:%S",
+    },
+}
+
+
+def detect_schema(columns):
+    """Returns the name of the layout whose columns are all present in `columns`."""
+    columns = set(columns)
+    for name, schema in LOG_SCHEMAS.items():
+        if set(schema["columns"]).issubset(columns):
+            return name
+    raise ValueError(f"Unrecognised raw log layout with columns: {sorted(columns)}")
+
+
+def convert_layout(raw, columns):
+    """
+    Converts raw log rows (text, in any supported layout) to the raw layout whose
+    header is `columns`, e.g. a Previous/Current batch for a Source/Dest master
+    log: columns are renamed through the canonical names and timestamps the
+    target layout cannot read are rewritten in its format. Returns the rows with exactly
+    `columns`; raises ValueError if either layout is not recognised.
+    """
+    source = LOG_SCHEMAS[detect_schema(raw.columns)]
+    target = LOG_SCHEMAS[detect_schema(columns)]
+    if source is not target:
+        to_target = {canonical: col for col, canonical in target["columns"].items()}
+        raw = raw.rename(columns={col: to_target[canonical] for col, canonical in source["columns"].items()})
+        try:
+            # Text the target layout already reads is kept verbatim, so event keys are unchanged
+            pd.to_datetime(raw[to_target["Timestamp"]], format=target["timestamp_format"])
+        except ValueError:
+            timestamps = pd.to_datetime(raw[to_target["Timestamp"]], format=source["timestamp_format"])
+            fmt = "%Y-%m-%dT%H:%M:%S.%f" if target["timestamp_format"] == "ISO8601" else target["timestamp_format"]
+            raw[to_target["Timestamp"]] = timestamps.dt.strftime(fmt)
+    return raw.reindex(columns=columns)
+
+
+def to_update_type(labels):
+    """Maps a categorical of raw update labels onto UPDATE_TYPE_DTYPE via its categories only."""
+    labels = labels.astype("category")
+    other_code = UPDATE_TYPE_DTYPE.categories.get_loc(UpdateType.OTHER.value)
+    lookup = np.array(
+        [UPDATE_TYPE_DTYPE.categories.get_loc(UPDATE_TYPE_ALIASES.get(c, UpdateType.OTHER).value)
+         for c in labels.cat.categories] + [other_code],
+        dtype=np.int8
+    )
+    # Missing labels have code -1, which indexes the trailing "Other" entry
+    codes = lookup[labels.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=UPDATE_TYPE_DTYPE), index=labels.index)
+
+
+def read_logs(path):
+    """
+    Reads a raw log file of any supported layout into the canonical schema:
+    Timestamp (datetime64), Update_Type (categorical UpdateType), Source_Pincode
+    and Dest_Pincode (int32), plus whichever event/resident ID columns exist.
+    Only the needed columns are read, with explicit dtypes.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    schema = LOG_SCHEMAS[detect_schema(header)]
+    column_map = schema["columns"]
+    id_cols = [c for c in ID_COLUMNS if c in header]
+
+    dtypes = {raw: "int32" for raw, canonical in column_map.items() if canonical.endswith("_Pincode")}
+    dtypes["Update_Type"] = "category"
+    dtypes["Timestamp"] = "string"
+    dtypes.update({c: "string" for c in id_cols})
+
+    logs = pd.read_csv(
+        path,
+        usecols=list(column_map) + id_cols,
+        dtype=dtypes
+    )
+    return normalize_logs(logs, schema)
+
+
+def normalize_logs(logs, schema):
+    logs = logs.rename(columns=schema["columns"])
+    logs["Timestamp"] = pd.to_datetime(logs["Timestamp"], format=schema["timestamp_format"])
+    logs["Update_Type"] = to_update_type(logs["Update_Type"])
+    id_cols = [c for c in ID_COLUMNS if c in logs.columns]
+    return logs[CANONICAL_COLUMNS + id_cols]
@@ -0,0 +1,282 @@
+import pandas as pd
+import os
+import sys
+import json
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from processing.compaction import compact_frame
+from utils import artifacts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DATA_DIR = artifacts.DATA_DIR
+DEFAULT_HOST = "127.0.0.1"  # local only
+DEFAULT_PORT = int(os.environ.get("AADHAAR_QUERY_PORT", 8765))
+
+# Table name -> (artifact file, optional row filter applied after load)
+TABLES = {
+    "flows": ("district_flows.csv", None),
+    "net_migration": ("district_net_migration.csv", None),
+    "pulse": ("india_aggregated.csv", None),
+    "anomalies": ("district_anomalies.csv", lambda df: df[df["is_anomaly"]]),
+}
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {"columns", "group_by", "metrics", "agg", "sort", "ascending", "top_k", "start", "end", "format"}
+
+# Group-by aggregations accepted in `agg`
+AGGREGATIONS = ("sum", "mean", "min", "max", "count")
+
+# Cached results are bounded by their in-memory size, not their number
+CACHE_MAX_BYTES = 256 * 2**20
+STREAM_BATCH_ROWS = 10_000
+
+
+class TableStore:
+    """Holds one compacted in-memory copy of each table, reloaded when its artifact version changes."""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.lock = threading.Lock()
+        self.tables = {}  # name -> (artifact version, DataFrame)
+
+    def get(self, name):
+        """Returns (version, DataFrame) for a table; raises KeyError/FileNotFoundError."""
+        filename, row_filter = TABLES[name]
+        version = artifacts.current_version(filename, self.data_dir)
+        if version is None:
+            os.stat(os.path.join(self.data_dir, filename))  # raises FileNotFoundError
+        with self.lock:
+            cached = self.tables.get(name)
+            if cached and cached[0] == version:
+                return cached
+            df = artifacts.read_artifact(filename, version, self.data_dir, parse_dates=["date"])
+            if row_filter is not None:
+                df = row_filter(df)
+            entry = (version, compact_frame(df))
+            self.tables[name] = entry
+            logging.info(f"Loaded table '{name}' ({len(df):,} rows)")
+            return entry
+
+
+class ResultCache:
+    """
+    LRU cache of query results keyed by (table, version, query), bounded by the
+    total deep memory usage of the cached frames. Results larger than the whole
+    budget are not cached.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (DataFrame, bytes)
+        self.nbytes = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+        return None
+
+    def put(self, key, value):
+        size = int(value.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+
+
+def split_list(value):
+    return [v for v in value.split(",") if v]
+
+
+def run_query(df, params):
+    """
+    Applies filters, optional group-by aggregation, sorting and top-k to a table.
+    params: dict of query parameter -> single string value.
+      <column>=a,b      keep rows whose column is in the list (dates as YYYY-MM-DD)
+      start/end         inclusive date range on the `date` column
+      group_by=c1,c2    aggregate `metrics` (default: all numeric columns) with `agg`
+                        (one of AGGREGATIONS, default sum)
+    Raises KeyError/ValueError for unknown tables, columns or parameter values.
+      sort, ascending   sort column (default: first metric when grouped) and direction
+      top_k=N           keep the first N rows after sorting
+      columns=c1,c2     project the output columns
+    """
+    mask = pd.Series(True, index=df.index)
+    for col, value in params.items():
+        if col in RESERVED_PARAMS:
+            continue
+        if col not in df.columns:
+            raise ValueError(f"Unknown column '{col}'")
+        values = split_list(value)
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values = pd.to_datetime(values)
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            values = pd.to_numeric(values)
+        mask &= df[col].isin(values)
+    if "start" in params:
+        mask &= df["date"] >= pd.to_datetime(params["start"])
+    if "end" in params:
+        mask &= df["date"] <= pd.to_datetime(params["end"])
+    result = df[mask]
+
+    sort_col = params.get("sort")
+    if "group_by" in params:
+        agg = params.get("agg", "sum")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATIONS)}")
+        group_cols = split_list(params["group_by"])
+        metrics = split_list(params.get("metrics", "")) or [
+            c for c in result.select_dtypes("number").columns if c not in group_cols
+        ]
+        result = result.groupby(group_cols, observed=True)[metrics].agg(agg).reset_index()
+        sort_col = sort_col or metrics[0]
+
+    if "columns" in params:
+        result = result[split_list(params["columns"])]
+    if sort_col:
+        ascending = params.get("ascending", "false").lower() == "true"
+        result = result.sort_values(sort_col, ascending=ascending)
+    if "top_k" in params:
+        result = result.head(int(params["top_k"]))
+    return result
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store = None
+    cache = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+
+        try:
+            if parts == ["health"]:
+                return self.send_json({"status": "ok"})
+            if parts == ["tables"]:
+                return self.send_json(self.describe_tables())
+            if len(parts) == 2 and parts[0] == "query":
+                return self.handle_query(parts[1], params)
+            self.send_json({"error": "not found"}, status=404)
+        except (KeyError, ValueError) as e:
+            self.send_json({"error": str(e)}, status=400)
+        except FileNotFoundError as e:
+            self.send_json({"error": f"artifact missing: {e.filename}"}, status=404)
+        except Exception as e:
+            logging.exception(f"Query failed: {self.path}")
+            self.send_json({"error": f"internal error: {e}"}, status=500)
+
+    def describe_tables(self):
+        info = {}
+        for name in TABLES:
+            try:
+                _, df = self.store.get(name)
+                info[name] = {"rows": len(df), "columns": {c: str(t) for c, t in df.dtypes.items()}}
+            except FileNotFoundError:
+                info[name] = {"error": "artifact missing"}
+        return info
+
+    def handle_query(self, table, params):
+        if table not in TABLES:
+            raise KeyError(f"Unknown table '{table}'")
+        fmt = params.get("format", "jsonl")
+        if fmt not in ("jsonl", "arrow"):
+            raise ValueError("format must be 'jsonl' or 'arrow'")
+
+        version, df = self.store.get(table)
+        query_key = tuple(sorted((k, v) for k, v in params.items() if k != "format"))
+        key = (table, version, query_key)
+        result = self.cache.get(key)
+        if result is None:
+            try:
+                result = run_query(df, params)
+            except (KeyError, ValueError, TypeError) as e:
+                # Bad parameters (unknown columns, unparseable values, type mismatches)
+                raise ValueError(f"invalid query: {e}") from e
+            self.cache.put(key, result)
+
+        if fmt == "arrow":
+            self.stream_arrow(result)
+        else:
+            self.stream_jsonl(result)
+
+    def stream_jsonl(self, result):
+        # HTTP/1.0 without Content-Length: the body streams until the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for start in range(0, len(result), STREAM_BATCH_ROWS):
+            batch = result.iloc[start:start + STREAM_BATCH_ROWS]
+            self.wfile.write(batch.to_json(orient="records", lines=True, date_format="iso").encode("utf-8"))
+            self.wfile.write(b"\n")
+
+    def stream_arrow(self, result):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("format=arrow requires pyarrow")
+        table = pa.Table.from_pandas(result, preserve_index=False)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.apache.arrow.stream")
+        self.end_headers()
+        with pa.ipc.new_stream(self.wfile, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=STREAM_BATCH_ROWS):
+                writer.write_batch(batch)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s" % (self.address_string(), format % args))
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, data_dir=DATA_DIR, cache_bytes=CACHE_MAX_BYTES):
+    handler = type("BoundQueryHandler", (QueryHandler,), {
+        "store": TableStore(data_dir),
+        "cache": ResultCache(cache_bytes),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def fetch(table, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", fmt="arrow", **params):
+    """Client helper: runs a query against the service and returns a DataFrame."""
+    import io
+    import requests
+
+    response = requests.get(f"{base_url}/query/{table}", params={**params, "format": fmt}, timeout=60)
+    if response.status_code != 200:
+        raise RuntimeError(response.json().get("error", response.text))
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(response.content).read_all().to_pandas()
+    return pd.read_json(io.StringIO(response.text), lines=True)
+
+
+if __name__ == "__main__":
+    server = make_server()
+    logging.info(f"Serving processed artifacts on http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import uuid
+import glob
+import hashlib
+import logging
+
+import pandas as pd
+
+# Processed artifacts are written atomically (temp file + rename). Each write is
+# also kept as an immutable snapshot under data/versions/<artifact>/ and described
+# by a small JSON manifest next to the artifact (<name>.manifest.json), so readers
+# can check freshness without touching the data and pin to one consistent version.
+# AADHAAR_DATA_DIR points the dashboard and its helpers at another data directory
+# (e.g. synthetic data for load tests).
+DATA_DIR = os.environ.get("AADHAAR_DATA_DIR", os.path.join(os.path.dirname(__file__), '../../data'))
+VERSIONS_DIR_NAME = "versions"
+MANIFEST_SUFFIX = ".manifest.json"
+KEEP_VERSIONS = 3
+
+def atomic_write(path, write):
+    """Calls write(tmp_path), then renames the temp file over `path`."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def manifest_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, name + MANIFEST_SUFFIX)
+
+def _versions_dir(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, VERSIONS_DIR_NAME, os.path.splitext(name)[0])
+
+def _snapshot_path(name, version, data_dir=DATA_DIR):
+    return os.path.join(_versions_dir(name, data_dir), version + os.path.splitext(name)[1])
+
+def describe(df, date_col='date'):
+    """Row count, schema and date range of a frame, as stored in the manifest."""
+    stats = {
+        'rows': int(len(df)),
+        'columns': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'date_min': None,
+        'date_max': None,
+    }
+    if date_col in df.columns and len(df):
+        dates = pd.to_datetime(df[date_col])
+        stats['date_min'] = dates.min().strftime('%Y-%m-%d')
+        stats['date_max'] = dates.max().strftime('%Y-%m-%d')
+    return stats
+
+def write_artifact(df, name, data_dir=DATA_DIR, date_col='date', metadata=None, keep=KEEP_VERSIONS, **to_csv_kwargs):
+    """
+    Writes `df` as CSV artifact `name` (e.g. "district_flows.csv") and returns its
+    manifest. Rewriting identical content is a no-op.
+    """
+    return _publish(name, lambda p: df.to_csv(p, index=False, **to_csv_kwargs),
+                    describe(df, date_col), data_dir, metadata, keep)
+
+def write_npz_artifact(arrays, name, data_dir=DATA_DIR, rows=None, date_range=(None, None),
+                       metadata=None, keep=KEEP_VERSIONS):
+    """
+    Writes a dict of numpy arrays as compressed .npz artifact `name`, with the same
+    snapshot/manifest handling as write_artifact. The schema lists each array's
+    dtype and shape; `rows` and `date_range` are supplied by the producer.
+    """
+    import numpy as np
+
+    stats = {
+        'rows': rows,
+        'columns': {key: f"{value.dtype}{list(value.shape)}" for key, value in arrays.items()},
+        'date_min': date_range[0],
+        'date_max': date_range[1],
+    }
+
+    def write(path):
+        # np.savez appends .npz to names without it; write through a file object
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    return _publish(name, write, stats, data_dir, metadata, keep)
+
+def _publish(name, write, stats, data_dir, metadata, keep):
+    """
+    Order matters for readers: the snapshot lands first, then the canonical file
+    is swapped in, and the manifest pointing at the snapshot is written last.
+    """
+    os.makedirs(_versions_dir(name, data_dir), exist_ok=True)
+    path = os.path.join(data_dir, name)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        sha256 = file_sha256(tmp_path)
+        previous = read_manifest(name, data_dir)
+        if previous and previous['sha256'] == sha256 and os.path.exists(path):
+            # Unchanged content keeps its version, so readers' caches stay valid
+            return previous
+        version = f"{time.strftime('%Y%m%dT%H%M%S')}-{sha256[:12]}"
+
+        # Snapshot and canonical file share one inode where hard links are supported
+        snapshot = _snapshot_path(name, version, data_dir)
+        if not os.path.exists(snapshot):
+            try:
+                os.link(tmp_path, snapshot)
+            except OSError:
+                atomic_write(snapshot, lambda p: _copy(tmp_path, p))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    manifest = {
+        'name': name,
+        'version': version,
+        'snapshot': os.path.relpath(snapshot, data_dir),
+        'sha256': sha256,
+        **stats,
+        'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'metadata': metadata or {},
+    }
+
+    def write_manifest(p):
+        with open(p, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    atomic_write(manifest_path(name, data_dir), write_manifest)
+    cleanup(name, keep=keep, data_dir=data_dir)
+    logging.info(f"Wrote {name} version {version} ({stats['rows'] or 0:,} rows)")
+    return manifest
+
+def _copy(src, dst):
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        for block in iter(lambda: fin.read(1 << 20), b''):
+            fout.write(block)
+
+def read_manifest(name, data_dir=DATA_DIR):
+    """The artifact's manifest, or None for artifacts written without one."""
+    try:
+        with open(manifest_path(name, data_dir)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def current_version(name, data_dir=DATA_DIR):
+    """
+    O(1) freshness token: the manifest version, or the file's mtime/size for
+    artifacts without a manifest. None if the artifact does not exist.
+    """
+    manifest = read_manifest(name, data_dir)
+    if manifest is not None:
+        return manifest['version']
+    try:
+        stat = os.stat(os.path.join(data_dir, name))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def snapshot_path(name, version=None, data_dir=DATA_DIR):
+    """
+    Path of an immutable snapshot (default: current version). Unversioned
+    artifacts, or versions whose snapshot has been cleaned up, resolve to the
+    canonical file.
+    """
+    version = version or current_version(name, data_dir)
+    if version is not None:
+        snapshot = _snapshot_path(name, version, data_dir)
+        if os.path.exists(snapshot):
+            return snapshot
+    return os.path.join(data_dir, name)
+
+def read_artifact(name, version=None, data_dir=DATA_DIR, **read_csv_kwargs):
+    """Reads a pinned version (default: current) of a CSV artifact."""
+    return pd.read_csv(snapshot_path(name, version, data_dir), **read_csv_kwargs)
+
+def read_npz_artifact(name, version=None, data_dir=DATA_DIR):
+    """Loads every array of a pinned version (default: current) of an .npz artifact."""
+    import numpy as np
+
+    with np.load(snapshot_path(name, version, data_dir), allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:  # removed by a concurrent cleanup
+        return 0
+
+def cleanup(name, keep=KEEP_VERSIONS, data_dir=DATA_DIR):
+    """Deletes all but the newest `keep` snapshots (the current one is always kept)."""
+    ext = os.path.splitext(name)[1]
+    # By write time: version names only have second resolution, and versions
+    # written within one second would otherwise sort by their hash
+    snapshots = sorted(glob.glob(os.path.join(_versions_dir(name, data_dir), f"*{ext}")),
+                       key=lambda p: (_mtime_ns(p), p))
+    current = current_version(name, data_dir)
+    for path in snapshots[:-keep]:
+        if os.path.basename(path) != f"{current}{ext}":
+            try:
+                os.remove(path)
+            except OSError:
+                pass
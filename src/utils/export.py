@@ -0,0 +1,141 @@
+import os
+import glob
+import gzip
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.artifacts import DATA_DIR
+
+# Exports are streamed chunk by chunk from the (memory-mapped) source frame to a
+# compressed file on a background thread, so neither the filtered frame nor the
+# encoded file is ever held in memory as a whole.
+EXPORT_DIR = os.path.join(DATA_DIR, 'exports')
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_WORKERS = 2
+EXPORT_MAX_AGE_S = 24 * 3600
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+}
+
+def iter_filtered_chunks(df, row_filter, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields the rows of each `chunk_rows` slice of `df` for which `row_filter(chunk)` is True."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        mask = row_filter(chunk)
+        if mask.any():
+            yield chunk[mask]
+
+def write_chunks(chunks, path, fmt, template, progress=None):
+    """
+    Streams frames to `path` as Parquet (one row group per chunk) or gzip CSV
+    (header once), via a temp file renamed on success. `template` (e.g. an
+    empty slice of the source) fixes the schema, so an empty export is still a
+    valid file. `progress(rows_so_far)` is called after every chunk.
+    Returns the number of rows written.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    rows = 0
+    try:
+        if fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.Schema.from_pandas(template, preserve_index=False)
+            with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+                for chunk in chunks:
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+                    if progress:
+                        progress(rows)
+        elif fmt == 'csv.gz':
+            with gzip.open(tmp_path, 'wt', newline='', compresslevel=6) as f:
+                template.to_csv(f, index=False)
+                for chunk in chunks:
+                    chunk.to_csv(f, header=False, index=False)
+                    rows += len(chunk)
+                    if progress:
+                        progress(rows)
+        else:
+            raise ValueError(f"Unknown export format '{fmt}'. Choose from {sorted(EXPORT_FORMATS)}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+class ExportManager:
+    """
+    Runs exports on a small shared thread pool. Jobs are plain dicts looked up
+    by id, so a session only keeps the id and polls `status`.
+    """
+
+    def __init__(self, export_dir=EXPORT_DIR, workers=EXPORT_WORKERS, max_age_s=EXPORT_MAX_AGE_S):
+        self.export_dir = export_dir
+        self.max_age_s = max_age_s
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, df, row_filter, name, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Queues an export of the rows of `df` passing `row_filter`; returns the job id."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Choose from {sorted(EXPORT_FORMATS)}")
+        os.makedirs(self.export_dir, exist_ok=True)
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        extension, mime = EXPORT_FORMATS[fmt]
+        job = {
+            'id': job_id,
+            'state': 'queued',
+            'rows': 0,
+            'path': os.path.join(self.export_dir, f"{name}_{job_id[:8]}{extension}"),
+            'file_name': f"{name}{extension}",
+            'mime': mime,
+            'error': None,
+            'started_at': time.time(),
+            'seconds': None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        self.executor.submit(self._run, job, df, row_filter, fmt, chunk_rows)
+        return job_id
+
+    def _run(self, job, df, row_filter, fmt, chunk_rows):
+        def progress(rows):
+            job['rows'] = rows
+
+        job['state'] = 'running'
+        try:
+            write_chunks(iter_filtered_chunks(df, row_filter, chunk_rows), job['path'], fmt, df.iloc[:0], progress)
+            job['state'] = 'done'
+        except Exception as e:
+            logging.error(f"Export {job['id']} failed: {e}")
+            job['error'] = str(e)
+            job['state'] = 'failed'
+        job['seconds'] = time.time() - job['started_at']
+
+    def status(self, job_id):
+        """A snapshot of the job, or None for unknown (e.g. expired) ids."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def cleanup(self):
+        """Forgets finished jobs and deletes export files older than `max_age_s`."""
+        cutoff = time.time() - self.max_age_s
+        with self.lock:
+            for job_id, job in list(self.jobs.items()):
+                if job['state'] in ('done', 'failed') and job['started_at'] < cutoff:
+                    del self.jobs[job_id]
+        for path in glob.glob(os.path.join(self.export_dir, '*')):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
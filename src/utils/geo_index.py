@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+from sklearn.neighbors import NearestNeighbors
+
+EARTH_RADIUS_KM = 6371
+GEOCODE_CHUNK_ROWS = 1_000_000
+
+class PincodeIndex:
+    """
+    Ball-tree (haversine) index over pincode_master centroids for nearest-k
+    pincode/district lookups, single or vectorized over millions of points.
+    """
+
+    def __init__(self, pincode_master, n_jobs=-1):
+        self.master = pincode_master[["Pincode", "District", "State", "Latitude", "Longitude"]].reset_index(drop=True)
+        coords = np.radians(self.master[["Latitude", "Longitude"]].to_numpy(dtype=np.float64))
+        self.tree = NearestNeighbors(algorithm="ball_tree", metric="haversine", n_jobs=n_jobs).fit(coords)
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(pd.read_csv(path), **kwargs)
+
+    def query_batch(self, lats, lons, k=1):
+        """Returns (distances_km, row_indices), each shaped (n_points, k)."""
+        points = np.radians(np.column_stack([np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)]))
+        dist, idx = self.tree.kneighbors(points, n_neighbors=k)
+        return dist * EARTH_RADIUS_KM, idx
+
+    def query(self, lat, lon, k=1):
+        """Nearest `k` pincodes to one point, closest first, with a distance_km column."""
+        dist, idx = self.query_batch([lat], [lon], k)
+        result = self.master.iloc[idx[0]].copy()
+        result["distance_km"] = dist[0]
+        return result.reset_index(drop=True)
+
+    def nearest_district(self, lat, lon):
+        """(district, state, distance_km) of the nearest pincode centroid."""
+        row = self.query(lat, lon, k=1).iloc[0]
+        return row["District"], row["State"], float(row["distance_km"])
+
+    def geocode(self, events, lat_col="Latitude", lon_col="Longitude"):
+        """Adds Pincode/District/State/distance_km columns for coordinate-only events."""
+        dist, idx = self.query_batch(events[lat_col], events[lon_col], k=1)
+        matched = self.master.iloc[idx[:, 0]]
+        events = events.copy()
+        events["Pincode"] = matched["Pincode"].to_numpy()
+        events["District"] = matched["District"].to_numpy()
+        events["State"] = matched["State"].to_numpy()
+        events["distance_km"] = dist[:, 0].astype(np.float32)
+        return events
+
+def geocode_file(input_path, output_path, index, chunksize=GEOCODE_CHUNK_ROWS):
+    """Streams a coordinate-only event CSV through the index in chunks."""
+    total = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        geocoded = index.geocode(chunk)
+        geocoded.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        total += len(geocoded)
+    return total
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python src/utils/geo_index.py <events_with_lat_lon.csv> <output.csv>")
+        sys.exit(1)
+
+    import time
+    pincode_path = os.path.join(os.path.dirname(__file__), '../../data/pincode_master.csv')
+    start = time.perf_counter()
+    rows = geocode_file(sys.argv[1], sys.argv[2], PincodeIndex.from_csv(pincode_path))
+    elapsed = time.perf_counter() - start
+    print(f"Geocoded {rows:,} events in {elapsed:.1f}s ({rows / max(elapsed, 1e-9) * 60:,.0f} events/min)")
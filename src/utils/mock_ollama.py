@@ -0,0 +1,150 @@
+"""
+Local stand-in for the Ollama chat API, for exercising LLM callers (the batch
+narrative job, load tests) without a model or network access.
+
+    python src/utils/mock_ollama.py [--port 11435] [--latency 0.2] [--fail-every 0]
+
+Serves POST /api/chat (streaming and non-streaming) with a deterministic reply
+built from the last user message, GET /api/tags and GET /stats (request
+counts and peak concurrency). Every `fail_every`-th request gets a 503 so
+retry paths can be tested.
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 11435  # next to Ollama's 11434, so both can run
+
+
+class MockStats:
+    """Thread-safe request counters shared by all handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def start(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.requests
+
+    def finish(self, failed=False):
+        with self.lock:
+            self.in_flight -= 1
+            self.failed += failed
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "failed": self.failed,
+                    "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+
+def mock_reply(model, messages):
+    """Deterministic answer echoing the first data lines of the last user message."""
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    facts = [line.strip("- ").strip() for line in prompt.splitlines() if line.strip().startswith("-")][:3]
+    summary = "; ".join(facts) if facts else prompt[:200]
+    return f"[mock {model}] Key points: {summary or 'no context provided'}."
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    stats = None
+    latency_s = 0.0
+    fail_every = 0
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            return self.send_json({"models": [{"name": "aadhaar-pulse-expert"}]})
+        if self.path == "/stats":
+            return self.send_json(self.stats.snapshot())
+        self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            return self.send_json({"error": "not found"}, status=404)
+        n = self.stats.start()
+        failed = bool(self.fail_every) and n % self.fail_every == 0
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(self.latency_s)
+            if failed:
+                return self.send_json({"error": "model is overloaded"}, status=503)
+
+            model = payload.get("model", "mock")
+            content = mock_reply(model, payload.get("messages", []))
+            if payload.get("stream", True):
+                self.stream_chat(model, content)
+            else:
+                self.send_json({"model": model, "message": {"role": "assistant", "content": content}, "done": True})
+        finally:
+            self.stats.finish(failed)
+
+    def stream_chat(self, model, content):
+        # Ollama streams one JSON object per line, ending with done=true
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for word in content.split(" "):
+            chunk = {"model": model, "message": {"role": "assistant", "content": word + " "}, "done": False}
+            self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+        self.wfile.write(json.dumps({"model": model, "done": True}).encode("utf-8") + b"\n")
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s" % (self.address_string(), format % args))
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, latency_s=0.0, fail_every=0):
+    """Mock server (not yet serving); its counters are at `server.stats`. Port 0 picks a free port."""
+    stats = MockStats()
+    handler = type("BoundMockOllamaHandler", (MockOllamaHandler,), {
+        "stats": stats,
+        "latency_s": latency_s,
+        "fail_every": fail_every,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def start_background(**kwargs):
+    """Starts a mock server on a daemon thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per reply")
+    parser.add_argument("--fail-every", type=int, default=0, help="503 every N-th request (0: never)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.fail_every)
+    logging.info(f"Mock Ollama serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,16 +1,23 @@
-import requests
 import json
 import logging
 import os
-from groq import Groq
 
 class HybridAIClient:
-    def __init__(self, model="aadhaar-pulse-expert", base_url="http://localhost:11434", groq_api_key=None):
+    def __init__(self, model="aadhaar-pulse-expert", base_url="http://localhost:11434", groq_api_key=None, timeout=5):
         self.model = model
+        self.timeout = timeout
         self.base_url = base_url.rstrip('/')
         self.api_url = f"{self.base_url}/api/chat"
         self.groq_api_key = groq_api_key or os.environ.get("GROQ_API_KEY")
-        self.groq_client = Groq(api_key=self.groq_api_key) if self.groq_api_key else None
+        self._groq_client = None
+
+    @property
+    def groq_client(self):
+        """Groq SDK client, created (and `groq` imported) on first use."""
+        if self._groq_client is None and self.groq_api_key:
+            from groq import Groq
+            self._groq_client = Groq(api_key=self.groq_api_key)
+        return self._groq_client
 
     def chat(self, messages, stream=False, provider="ollama"):
         """
@@ -22,6 +29,7 @@ class HybridAIClient:
             return self._chat_ollama(messages, stream)
 
     def _chat_ollama(self, messages, stream=False):
+        import requests
         payload = {
             "model": self.model,
             "messages": messages,
@@ -29,7 +37,7 @@ class HybridAIClient:
         }
 
         try:
-            response = requests.post(self.api_url, json=payload, timeout=5)
+            response = requests.post(self.api_url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             
             if stream:
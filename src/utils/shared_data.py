@@ -0,0 +1,72 @@
+import os
+import glob
+
+from utils.artifacts import atomic_write, DATA_DIR
+
+# Normalized datasets are published here as uncompressed Arrow IPC files that
+# every dashboard worker memory-maps, so N workers share one copy in the page cache.
+SHARED_DIR = os.path.join(DATA_DIR, 'shared')
+POINTER_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+def _dataset_dir(name, shared_dir=SHARED_DIR):
+    return os.path.join(shared_dir, name)
+
+def current_version(name, shared_dir=SHARED_DIR):
+    """Version named by the dataset's pointer file, or None if never published."""
+    try:
+        with open(os.path.join(_dataset_dir(name, shared_dir), POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish(name, df, version, shared_dir=SHARED_DIR):
+    """
+    Writes `df` as version `version` of dataset `name` and swaps the pointer to it.
+    The data file lands before the pointer, so readers never see a partial version.
+    Concurrent publishers of the same version are harmless (identical content).
+    """
+    import pyarrow as pa
+
+    dataset_dir = _dataset_dir(name, shared_dir)
+    os.makedirs(dataset_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    def write_table(path):
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def write_pointer(path):
+        with open(path, 'w') as f:
+            f.write(version)
+
+    atomic_write(os.path.join(dataset_dir, f"{version}.arrow"), write_table)
+    atomic_write(os.path.join(dataset_dir, POINTER_FILE), write_pointer)
+    cleanup(name, shared_dir=shared_dir)
+
+def open_dataset(name, version=None, shared_dir=SHARED_DIR):
+    """
+    Memory-maps a published version (default: current) and returns it as a DataFrame.
+    Numeric, datetime and categorical columns reference the mapped pages directly
+    (zero-copy); treat the result as read-only.
+    """
+    import pyarrow as pa
+
+    version = version or current_version(name, shared_dir)
+    if version is None:
+        raise FileNotFoundError(f"Dataset '{name}' has not been published")
+    source = pa.memory_map(os.path.join(_dataset_dir(name, shared_dir), f"{version}.arrow"))
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+def cleanup(name, keep=KEEP_VERSIONS, shared_dir=SHARED_DIR):
+    """Deletes all but the newest `keep` versions (open mappings stay valid on POSIX)."""
+    files = sorted(glob.glob(os.path.join(_dataset_dir(name, shared_dir), "*.arrow")), key=os.path.getmtime)
+    current = current_version(name, shared_dir)
+    for path in files[:-keep]:
+        if os.path.basename(path) != f"{current}.arrow":
+            try:
+                os.remove(path)
+            except OSError:
+                pass
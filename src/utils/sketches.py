@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+
+# Keys kept per truncated top-k summary (per day and scope in the ETL)
+DEFAULT_CAPACITY = 50
+
+# HyperLogLog precision: 2**11 registers, ~2.3% standard error
+DEFAULT_HLL_PRECISION = 11
+
+# t-digest compression: at most ~compression/2 centroids per digest, finest in the tails
+DEFAULT_COMPRESSION = 100
+
+
+def truncate_groups(df, group_cols, key_cols, count_col='count', capacity=DEFAULT_CAPACITY):
+    """
+    Truncated exact top-k summaries for every group of `group_cols` in a frame
+    of exact counts (not a streaming sketch: the counts are computed first):
+    keeps each group's `capacity` largest keys. Adds `error` (0, counts are
+    exact) and `floor`, the summary's bound for absent keys (its smallest count
+    once full, else 0). Any key counted more than total / capacity times in a
+    group is always kept.
+    """
+    ranked = df.sort_values(group_cols + [count_col], ascending=[True] * len(group_cols) + [False])
+    rank = ranked.groupby(group_cols, observed=True, sort=False).cumcount()
+    kept = ranked[rank < capacity][group_cols + key_cols + [count_col]].copy()
+    kept['error'] = 0
+    groups = kept.groupby(group_cols, observed=True)[count_col]
+    kept['floor'] = groups.transform('min').where(groups.transform('size') >= capacity, 0)
+    return kept.reset_index(drop=True)
+
+
+def merge_truncated(rows, group_cols, key_cols, count_col='count', k=10):
+    """
+    Merges many stored summaries (rows as produced by truncate_groups) and
+    returns the `k` heaviest keys with their estimated count and error bound.
+    A key missing from a truncated summary is charged that summary's floor.
+    """
+    if rows.empty:
+        return pd.DataFrame(columns=key_cols + [count_col, 'error'])
+    total_floor = rows.drop_duplicates(group_cols)['floor'].sum()
+    merged = rows.groupby(key_cols, observed=True).agg(
+        count=(count_col, 'sum'), error=('error', 'sum'), present_floor=('floor', 'sum')
+    )
+    unseen = total_floor - merged.pop('present_floor')
+    merged['count'] += unseen
+    merged['error'] += unseen
+    return merged.nlargest(k, 'count').rename(columns={'count': count_col}).reset_index()
+
+
+def hash64(values):
+    """
+    Stable 64-bit hashes of a sequence of values: pandas' hash_pandas_object
+    with its default hash key (the dedup filter uses its own keys, so these do
+    not match its hashes).
+    """
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+
+def hll_pairs(hashes, precision=DEFAULT_HLL_PRECISION):
+    """
+    Splits 64-bit hashes into HyperLogLog (register, rank) pairs: the top
+    `precision` bits pick the register, the rank is the position of the first
+    1-bit in the remaining bits.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    width = 64 - precision
+    registers = (hashes >> np.uint64(width)).astype(np.uint16)
+    rest = hashes & np.uint64((1 << width) - 1)
+    # rest < 2**53 is exact in float64, so frexp's exponent is its bit length
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    ranks = (width - bit_length + 1).astype(np.uint8)
+    return registers, ranks
+
+
+def _hll_sigma(x):
+    """sigma(x) = x + sum_k x^(2^k) 2^(k-1), Ertl's small-range term (x = share of empty registers)."""
+    if x == 1:
+        return np.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _hll_tau(x):
+    """Ertl's large-range term (x = 1 - share of saturated registers)."""
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+def hll_estimate(registers, precision=DEFAULT_HLL_PRECISION):
+    """
+    Cardinality estimate from a dense register array, using Ertl's improved
+    estimator ("New cardinality estimation algorithms for HyperLogLog sketches",
+    2017). It folds the register histogram so the small-range (empty registers)
+    and large-range corrections are continuous, and has no bias bump around
+    2.5m-5m where the classic estimator switches from linear counting.
+    """
+    m = len(registers)
+    q = 64 - precision  # ranks run from 0 (empty) to q + 1
+    counts = np.bincount(registers, minlength=q + 2).astype(float)
+    z = m * _hll_tau(1 - counts[q + 1] / m)
+    for k in range(q, 0, -1):
+        z = 0.5 * (z + counts[k])
+    z += m * _hll_sigma(counts[0] / m)
+    return float(m * m / (2 * np.log(2)) / z)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter. Sketches with the same precision merge by
+    taking the register-wise maximum, so unions over any partitions are exact
+    unions of the underlying sets.
+    """
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        self.add_pairs(*hll_pairs(hash64(values), self.precision))
+
+    def add_pairs(self, registers, ranks):
+        np.maximum.at(self.registers, registers, ranks)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        return hll_estimate(self.registers, self.precision)
+
+
+def build_hll_cells(cell_ids, hashes, precision=DEFAULT_HLL_PRECISION):
+    """
+    Sparse HyperLogLog sketches for many cells at once. `cell_ids` (one int per
+    value, 0..n_cells-1) says which sketch each hash goes to. Returns the
+    non-empty registers as parallel arrays (cell, register, rank), sorted by
+    cell, keeping the max rank per (cell, register).
+    """
+    registers, ranks = hll_pairs(hashes, precision)
+    pairs = pd.DataFrame({'cell': np.asarray(cell_ids), 'register': registers, 'rank': ranks})
+    pairs = pairs.groupby(['cell', 'register'], sort=True)['rank'].max().reset_index()
+    return (pairs['cell'].to_numpy(dtype=np.int32), pairs['register'].to_numpy(dtype=np.uint16),
+            pairs['rank'].to_numpy(dtype=np.uint8))
+
+
+def union_count(pair_cells, registers, ranks, cell_mask, precision=DEFAULT_HLL_PRECISION):
+    """Estimated distinct count over the union of the cells selected by `cell_mask`."""
+    selected = cell_mask[pair_cells]
+    sketch = HyperLogLog(precision)
+    sketch.add_pairs(registers[selected], ranks[selected])
+    return sketch.count()
+
+
+def _k_scale(q, compression):
+    """t-digest k1 scale function; centroids span at most one unit of k."""
+    return compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+
+def compress_digests(df, group_cols, value_col, weight_col, compression=DEFAULT_COMPRESSION):
+    """
+    Merging t-digest (Dunning) build for every group of `group_cols` in one
+    sorted pass: each group's points are pooled into centroids spanning one unit
+    of the k1 scale, small near the tails so extreme quantiles stay accurate.
+    Input rows are weighted points or the centroids of earlier digests, so the
+    same call builds digests and merges them. Returns centroid rows
+    (group_cols, mean, weight).
+    """
+    ordered = df.sort_values(group_cols + [value_col])
+    weights = ordered[weight_col].astype(float)
+    groups = weights.groupby([ordered[c] for c in group_cols], observed=True, sort=False)
+    q = (groups.cumsum() - weights / 2) / groups.transform('sum')
+    centroids = ordered[group_cols].assign(
+        bucket=np.floor(_k_scale(q.to_numpy(), compression)),
+        weight=weights,
+        weighted=ordered[value_col].to_numpy(dtype=float) * weights,
+    ).groupby(group_cols + ['bucket'], observed=True, sort=False).sum()
+    centroids['mean'] = centroids.pop('weighted') / centroids['weight']
+    return centroids.reset_index().drop(columns='bucket')[group_cols + ['mean', 'weight']]
+
+
+def digest_quantiles(centroids, group_cols, quantiles):
+    """
+    Quantiles of every digest in a frame of centroid rows (as produced by
+    compress_digests). `quantiles` maps output column -> q; values interpolate
+    linearly between centroid centres (clamped to the outer centroids).
+    """
+    ordered = centroids.sort_values(group_cols + ['mean'])
+    weights = ordered['weight'].to_numpy(dtype=float)
+    means = ordered['mean'].to_numpy(dtype=float)
+    groups = ordered.groupby(group_cols, observed=True, sort=False)['weight']
+    gid = groups.ngroup().to_numpy()
+    # Each centroid's centre on one axis: group id + its quantile within the group
+    pos = gid + (groups.cumsum().to_numpy() - weights / 2) / groups.transform('sum').to_numpy()
+    starts = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+    ends = np.r_[starts[1:], len(gid)] - 1
+
+    result = ordered[group_cols].iloc[starts].reset_index(drop=True)
+    for col, q in quantiles.items():
+        target = np.arange(len(starts)) + q
+        hi = np.minimum(np.searchsorted(pos, target), ends)
+        lo = np.maximum(hi - 1, starts)
+        span = pos[hi] - pos[lo]
+        frac = np.clip(np.divide(target - pos[lo], span, out=np.zeros_like(span), where=span > 0), 0, 1)
+        result[col] = means[lo] + (means[hi] - means[lo]) * frac
+    return result
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (processing.*, utils.*), as
+# the scripts do after appending src/ to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import artifacts
+
+
+def frame(n=3, offset=0):
+    return pd.DataFrame({'date': pd.date_range('2025-01-01', periods=n).strftime('%Y-%m-%d'),
+                         'count': np.arange(n) + offset})
+
+
+def test_atomic_write_replaces_or_leaves_the_target(tmp_path):
+    path = str(tmp_path / "out.txt")
+
+    def write(text):
+        def writer(p):
+            with open(p, 'w') as f:
+                f.write(text)
+        return writer
+
+    artifacts.atomic_write(path, write("first"))
+
+    def failing(p):
+        write("partial")(p)
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        artifacts.atomic_write(path, failing)
+    assert open(path).read() == "first"
+    assert os.listdir(tmp_path) == ["out.txt"]  # no temp files left behind
+
+
+def test_write_artifact_manifest_and_snapshot(tmp_path):
+    manifest = artifacts.write_artifact(frame(), 'flows.csv', data_dir=str(tmp_path), metadata={'source': 'test'})
+    assert manifest == json.load(open(artifacts.manifest_path('flows.csv', str(tmp_path))))
+    assert manifest['rows'] == 3
+    assert (manifest['date_min'], manifest['date_max']) == ('2025-01-01', '2025-01-03')
+    assert manifest['sha256'] == artifacts.file_sha256(tmp_path / 'flows.csv')
+    assert manifest['metadata'] == {'source': 'test'}
+    assert artifacts.current_version('flows.csv', str(tmp_path)) == manifest['version']
+    pd.testing.assert_frame_equal(artifacts.read_artifact('flows.csv', data_dir=str(tmp_path)), frame())
+
+
+def test_unchanged_content_keeps_its_version(tmp_path):
+    first = artifacts.write_artifact(frame(), 'flows.csv', data_dir=str(tmp_path))
+    assert artifacts.write_artifact(frame(), 'flows.csv', data_dir=str(tmp_path))['version'] == first['version']
+
+
+def test_old_versions_stay_readable_until_cleaned_up(tmp_path):
+    versions = [artifacts.write_artifact(frame(offset=i), 'flows.csv', data_dir=str(tmp_path), keep=2)['version']
+                for i in range(4)]
+    assert len(set(versions)) == 4
+    # The pinned previous version still reads its own content
+    pinned = artifacts.read_artifact('flows.csv', versions[2], data_dir=str(tmp_path))
+    assert pinned['count'].tolist() == [2, 3, 4]
+    snapshots = os.listdir(tmp_path / artifacts.VERSIONS_DIR_NAME / 'flows')
+    assert sorted(snapshots) == sorted(f"{v}.csv" for v in versions[2:])
+
+
+def test_npz_artifact_round_trip(tmp_path):
+    arrays = {'dates': np.arange('2025-01-01', '2025-01-04', dtype='datetime64[D]'),
+              'values': np.arange(6, dtype=np.int32).reshape(2, 3)}
+    manifest = artifacts.write_npz_artifact(arrays, 'm.npz', data_dir=str(tmp_path), rows=2,
+                                            date_range=('2025-01-01', '2025-01-03'))
+    assert manifest['columns'] == {'dates': 'datetime64[D][3]', 'values': 'int32[2, 3]'}
+    loaded = artifacts.read_npz_artifact('m.npz', data_dir=str(tmp_path))
+    for key in arrays:
+        np.testing.assert_array_equal(loaded[key], arrays[key])
@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pytest
+
+from processing import dedup, schemas
+
+
+def events(ids, **extra):
+    return pd.DataFrame({
+        "Timestamp": [f"2025-01-{i % 28 + 1:02d} 10:00:00" for i in ids],
+        "Update_Type": "Address",
+        "Source_Pincode": "110001",
+        "Dest_Pincode": "400001",
+        "Aadhaar_ID": [str(i) for i in ids],
+        **extra,
+    })
+
+
+def drop_batch(data_dir, name, df):
+    os.makedirs(os.path.join(data_dir, "incoming"), exist_ok=True)
+    df.to_csv(os.path.join(data_dir, "incoming", name), index=False)
+
+
+def master(data_dir):
+    return pd.read_csv(os.path.join(data_dir, "raw_aadhaar_logs.csv"), dtype=str)
+
+
+def test_resent_batches_are_dropped_across_runs(tmp_path):
+    drop_batch(tmp_path, "a.csv", events(range(0, 50)))
+    assert dedup.ingest_incoming(str(tmp_path))["ingested"] == 50
+
+    # A later run gets a re-sent batch overlapping the first one
+    drop_batch(tmp_path, "b.csv", events(range(40, 60)))
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (10, 10)
+    assert master(tmp_path)["Aadhaar_ID"].astype(int).tolist() == list(range(60))
+    assert sorted(os.listdir(tmp_path / "incoming" / "processed")) == ["a.csv", "b.csv"]
+
+
+def test_duplicates_within_a_batch_are_dropped(tmp_path):
+    drop_batch(tmp_path, "a.csv", pd.concat([events(range(5)), events(range(3))]))
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (5, 3)
+
+
+def test_key_ignores_column_order_and_extra_columns(tmp_path):
+    drop_batch(tmp_path, "a.csv", events(range(10)))
+    dedup.ingest_incoming(str(tmp_path))
+
+    resent = events(range(10), Channel="retry").iloc[:, ::-1]
+    drop_batch(tmp_path, "b.csv", resent)
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (0, 10)
+
+
+def test_update_id_is_the_key_when_present(tmp_path):
+    batch = events(range(3), UpdateID=["u1", "u2", "u3"])
+    drop_batch(tmp_path, "a.csv", batch)
+    dedup.ingest_incoming(str(tmp_path))
+
+    # Same event IDs with different fields are still duplicates
+    drop_batch(tmp_path, "b.csv", events(range(100, 103), UpdateID=["u1", "u2", "u4"]))
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (1, 2)
+
+
+def test_crash_before_commit_is_rolled_back(tmp_path, monkeypatch):
+    drop_batch(tmp_path, "a.csv", events(range(10)))
+    dedup.ingest_incoming(str(tmp_path))
+
+    drop_batch(tmp_path, "b.csv", events(range(5, 20)))
+    def crash(*args):
+        raise RuntimeError("crash")
+
+    monkeypatch.setattr(dedup, "commit", crash)
+    with pytest.raises(RuntimeError):
+        dedup.ingest_incoming(str(tmp_path))
+    monkeypatch.undo()
+
+    # The batch is still in incoming/; its partial append is undone and it is ingested once
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert stats["ingested"] == 10
+    assert master(tmp_path)["Aadhaar_ID"].astype(int).tolist() == list(range(20))
+
+
+def test_filter_survives_save_and_load(tmp_path):
+    bloom = dedup.ScalableBloomFilter(fp_rate=0.01, initial_capacity=100)
+    h1, h2 = dedup.hash_events(events(range(250)), ["Aadhaar_ID"])
+    bloom.add(h1, h2)
+    bloom.extra = {"log_bytes": 123}
+    path = str(tmp_path / "state.npz")
+    bloom.save(path)
+
+    loaded = dedup.ScalableBloomFilter.load(path)
+    assert len(loaded.layers) == len(bloom.layers) > 1
+    assert loaded.contains(h1, h2).all()
+    assert loaded.extra == {"log_bytes": 123}
+
+
+def test_regenerated_master_log_reseeds_instead_of_truncating(tmp_path):
+    drop_batch(tmp_path, "a.csv", events(range(10)))
+    dedup.ingest_incoming(str(tmp_path))
+
+    # The master log is regenerated (larger) by another tool
+    events(range(1000, 1100)).to_csv(tmp_path / "raw_aadhaar_logs.csv", index=False)
+    drop_batch(tmp_path, "b.csv", events(range(1090, 1110)))
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (10, 10)
+    assert master(tmp_path)["Aadhaar_ID"].astype(int).tolist() == list(range(1000, 1110))
+
+
+def test_batches_are_converted_to_the_master_layout(tmp_path):
+    drop_batch(tmp_path, "a.csv", events(range(5)))
+    dedup.ingest_incoming(str(tmp_path))
+
+    # The same events re-sent in the Previous/Current layout, plus two new ones
+    other = events(range(7)).rename(columns={"Source_Pincode": "Previous_Pincode", "Dest_Pincode": "Current_Pincode"})
+    drop_batch(tmp_path, "b.csv", other)
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["dropped_duplicates"]) == (2, 5)
+
+    logs = schemas.read_logs(str(tmp_path / "raw_aadhaar_logs.csv"))
+    assert len(logs) == 7
+    assert logs["Source_Pincode"].notna().all() and logs["Dest_Pincode"].notna().all()
+
+
+def test_unrecognised_batches_are_rejected(tmp_path):
+    drop_batch(tmp_path, "a.csv", events(range(5)))
+    drop_batch(tmp_path, "b.csv", events(range(5, 8)).drop(columns=["Dest_Pincode"]))
+    stats = dedup.ingest_incoming(str(tmp_path))
+    assert (stats["ingested"], stats["rejected_batches"]) == (5, 1)
+    assert os.listdir(tmp_path / "incoming" / "rejected") == ["b.csv"]
+    assert len(master(tmp_path)) == 5
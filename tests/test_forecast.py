@@ -0,0 +1,20 @@
+import os
+
+from models import forecast
+
+
+def test_least_recently_used_fit_states_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, "FORECAST_STATE_DIR", str(tmp_path))
+    for i in range(5):
+        path = forecast._state_path(f"series-{i}")
+        with open(path, "w") as f:
+            f.write("{}")
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+
+    # Reading a state marks it as recently used
+    assert forecast.load_fit_state("series-0") == {}
+    forecast.evict_fit_states(max_files=3)
+
+    kept = {forecast._state_path(f"series-{i}") for i in (0, 3, 4)}
+    assert {str(p) for p in tmp_path.iterdir()} == kept
+    assert forecast.load_fit_state("series-1") is None
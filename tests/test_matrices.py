@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from processing.matrices import geo_matrices, matrix_date_range
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["date", "state", "district", "count"])
+
+
+def test_matrices_cover_every_day_of_the_range():
+    arrays = geo_matrices(frame([
+        ("2025-01-01", "Kerala", "Kollam", 3),
+        ("2025-01-03", "Kerala", "Kollam", 4),
+        ("2025-01-03", "Goa", "North Goa", 5),
+    ]), {"count": ["count"]})
+
+    assert matrix_date_range(arrays) == ("2025-01-01", "2025-01-03")
+    assert arrays["states"].tolist() == ["Goa", "Kerala"]
+    assert arrays["state_count"].tolist() == [[0, 0, 5], [3, 0, 4]]
+    assert arrays["district_count"].shape == (2, 3)
+
+
+def test_empty_frame_gives_empty_matrices():
+    arrays = geo_matrices(frame([]), {"count": ["count"]})
+
+    assert arrays["dates"].dtype == np.dtype("datetime64[D]") and len(arrays["dates"]) == 0
+    assert len(arrays["states"]) == len(arrays["districts"]) == 0
+    assert arrays["state_count"].shape == arrays["district_count"].shape == (0, 0)
+    assert arrays["state_count"].dtype == np.int32
+    assert matrix_date_range(arrays) == (None, None)
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from models.narratives import region_contexts
+
+
+def pulse():
+    # "Aurangabad" is a district in both Bihar and Maharashtra
+    rows = [(d, s, "Aurangabad", n) for d in pd.date_range("2025-01-01", periods=10)
+            for s, n in (("Bihar", 10), ("Maharashtra", 100))]
+    df = pd.DataFrame(rows, columns=["date", "state", "district", "total_updates"])
+    for col in ("bio_age_5_17", "bio_age_17_", "demo_age_5_17", "demo_age_17_", "total_enrolments"):
+        df[col] = 1
+    return df
+
+
+def test_district_contexts_keep_same_named_districts_apart():
+    flows = pd.DataFrame({
+        "date": pd.to_datetime(["2025-01-10"] * 2), "count": [7, 3],
+        "source_state": ["Bihar", "Maharashtra"], "source_district": ["Aurangabad"] * 2,
+        "dest_state": ["Maharashtra", "Bihar"], "dest_district": ["Aurangabad"] * 2,
+    })
+    contexts = region_contexts(pulse(), flows, level="district", window_days=5).set_index("state")
+
+    assert contexts.index.tolist() == ["Bihar", "Maharashtra"]
+    assert (contexts["region"] == "Aurangabad").all()
+    bihar, maharashtra = contexts.loc["Bihar", "context"], contexts.loc["Maharashtra", "context"]
+    assert "Region: Aurangabad (district, Bihar)" in bihar
+    assert "Total updates: 50 " in bihar and "Total updates: 500 " in maharashtra
+    assert "3 in, 7 out" in bihar and "7 in, 3 out" in maharashtra
+
+
+def test_state_contexts():
+    contexts = region_contexts(pulse(), level="state", window_days=5)
+    assert contexts["region"].tolist() == contexts["state"].tolist() == ["Bihar", "Maharashtra"]
+    assert "Busiest districts: Aurangabad (50)" in contexts.loc[0, "context"]
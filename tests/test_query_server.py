@@ -0,0 +1,62 @@
+import io
+import threading
+
+import pandas as pd
+import pytest
+import requests
+
+from service.query_server import make_server, run_query
+from utils.artifacts import write_artifact
+
+
+@pytest.fixture(scope="module")
+def base_url(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    write_artifact(pd.DataFrame({
+        'date': ['2025-01-01', '2025-01-01', '2025-01-02'],
+        'source_state': ['Bihar', 'Bihar', 'Kerala'],
+        'dest_district': ['Mumbai', 'Pune', 'Mumbai'],
+        'count': [5, 3, 7],
+    }), 'district_flows.csv', data_dir=str(data_dir))
+    server = make_server(port=0, data_dir=str(data_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def get(base_url, query):
+    return requests.get(f"{base_url}/query/flows?{query}", timeout=10)
+
+
+@pytest.mark.parametrize("query", [
+    "agg=foo&group_by=source_state",
+    "group_by=nope",
+    "unknown_column=1",
+    "date=not-a-date",
+    "top_k=many",
+    "sort=nope",
+    "columns=nope",
+    "format=xml",
+])
+def test_bad_parameters_get_a_400(base_url, query):
+    response = get(base_url, query)
+    assert response.status_code == 400
+    assert response.json()["error"]
+
+
+def test_unknown_table_and_path(base_url):
+    assert requests.get(f"{base_url}/query/nope", timeout=10).status_code == 400
+    assert requests.get(f"{base_url}/nope", timeout=10).status_code == 404
+
+
+def test_group_by_query(base_url):
+    response = get(base_url, "group_by=dest_district&metrics=count&agg=max")
+    assert response.status_code == 200
+    rows = pd.read_json(io.StringIO(response.text), lines=True)
+    assert rows.values.tolist() == [['Mumbai', 7], ['Pune', 3]]
+
+
+def test_date_filters_parse_dates():
+    df = pd.DataFrame({'date': pd.to_datetime(['2025-01-01', '2025-01-02']), 'count': [1, 2]})
+    assert run_query(df, {'date': '2025-01-02'})['count'].tolist() == [2]
+    assert run_query(df, {'start': '2025-01-02'})['count'].tolist() == [2]
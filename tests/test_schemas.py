@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from processing.schemas import UPDATE_TYPE_DTYPE, UpdateType, detect_schema, read_logs, to_update_type
+
+
+def test_update_type_mapping():
+    labels = pd.Series(["Address Change", "Biometric", "Mobile Update", "Email Update", "DoB Update",
+                        "Name Change", None])
+    mapped = to_update_type(labels)
+    assert mapped.dtype == UPDATE_TYPE_DTYPE
+    assert mapped.tolist() == ["Address", "Biometric", "Mobile", "Email", "DoB", "Other", "Other"]
+
+
+def test_detect_schema():
+    assert detect_schema(["Timestamp", "Update_Type", "Source_Pincode", "Dest_Pincode", "Aadhaar_ID"]) == "source_dest"
+    assert detect_schema(["Timestamp", "Update_Type", "Previous_Pincode", "Current_Pincode"]) == "previous_current"
+    with pytest.raises(ValueError):
+        detect_schema(["Timestamp", "Pincode"])
+
+
+def test_read_logs_source_dest(tmp_path):
+    path = tmp_path / "logs.csv"
+    pd.DataFrame({
+        "Aadhaar_ID": ["1", "2"],
+        "Timestamp": ["2025-01-01T10:00:00.123456", "2025-01-02T11:30:00"],
+        "Update_Type": ["Address", "Biometric Update"],
+        "Source_Pincode": [110001, 560001],
+        "Dest_Pincode": [400001, 110001],
+        "Unused": ["x", "y"],
+    }).to_csv(path, index=False)
+
+    logs = read_logs(path)
+    assert list(logs.columns) == ["Timestamp", "Update_Type", "Source_Pincode", "Dest_Pincode", "Aadhaar_ID"]
+    assert logs["Timestamp"].tolist() == [pd.Timestamp("2025-01-01 10:00:00.123456"), pd.Timestamp("2025-01-02 11:30")]
+    assert logs["Update_Type"].tolist() == [UpdateType.ADDRESS.value, UpdateType.BIOMETRIC.value]
+    assert logs["Source_Pincode"].dtype == np.int32
+    assert logs["Aadhaar_ID"].tolist() == ["1", "2"]
+
+
+def test_read_logs_previous_current(tmp_path):
+    path = tmp_path / "logs.csv"
+    pd.DataFrame({
+        "Timestamp": ["2025-03-04 05:06:07"],
+        "Update_Type": ["Mobile"],
+        "Previous_Pincode": [700001],
+        "Current_Pincode": [600001],
+    }).to_csv(path, index=False)
+
+    logs = read_logs(path)
+    assert list(logs.columns) == ["Timestamp", "Update_Type", "Source_Pincode", "Dest_Pincode"]
+    assert logs.iloc[0].tolist() == [pd.Timestamp("2025-03-04 05:06:07"), "Mobile", 700001, 600001]
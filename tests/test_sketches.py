@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sketches import (DEFAULT_COMPRESSION, DEFAULT_HLL_PRECISION, HyperLogLog, compress_digests,
+                            digest_quantiles, merge_truncated, truncate_groups)
+
+# Relative standard error of HyperLogLog with 2**precision registers
+HLL_STD_ERROR = 1.04 / np.sqrt(2 ** DEFAULT_HLL_PRECISION)
+
+
+def hll_of(values):
+    sketch = HyperLogLog()
+    sketch.add(values)
+    return sketch
+
+
+@pytest.mark.parametrize("n", [100, 1_000, 5_000, 8_000, 50_000, 300_000])
+def test_hll_error_is_within_its_standard_error(n):
+    # Covers the small range, the 2.5m-5m switch-over region and the raw range
+    errors = np.array([hll_of([f"{seed}-{i}" for i in range(n)]).count() / n - 1 for seed in range(8)])
+    assert np.all(np.abs(errors) < 4 * HLL_STD_ERROR)
+    assert abs(errors.mean()) < 1.5 * HLL_STD_ERROR
+
+
+def test_hll_empty_and_duplicates():
+    assert HyperLogLog().count() == 0
+    assert hll_of(["a", "b", "a", "b", "a"]).count() == pytest.approx(2, abs=0.01)
+
+
+def test_hll_merge_equals_sketch_of_union():
+    a_values = [f"id-{i}" for i in range(0, 6_000)]
+    b_values = [f"id-{i}" for i in range(4_000, 12_000)]
+    merged = hll_of(a_values).merge(hll_of(b_values))
+    combined = hll_of(a_values + b_values)
+    np.testing.assert_array_equal(merged.registers, combined.registers)
+    assert merged.count() == combined.count()
+    assert merged.count() == pytest.approx(12_000, rel=4 * HLL_STD_ERROR)
+
+
+def test_hll_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(11))
+
+
+def test_hll_has_no_bias_where_linear_counting_hands_over():
+    # The classic estimator over-counts by several percent around 2.5m (5,120 here)
+    m = 2 ** DEFAULT_HLL_PRECISION
+    errors = [hll_of([f"{seed}-{i}" for i in range(n)]).count() / n - 1
+              for seed in range(4) for n in (int(2.3 * m), int(2.6 * m), int(3 * m), int(4 * m))]
+    assert abs(np.mean(errors)) < 0.01
+
+
+def test_tdigest_quantiles_are_accurate_in_the_tails():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(5, 1, 50_000)
+    points = pd.DataFrame({'g': 0, 'value': values, 'weight': 1.0})
+    digest = compress_digests(points, ['g'], 'value', 'weight')
+    assert len(digest) <= DEFAULT_COMPRESSION
+
+    qs = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+    estimates = digest_quantiles(digest, ['g'], qs).iloc[0]
+    for col, q in qs.items():
+        # Rank error: where the estimate falls in the exact distribution
+        assert abs(np.mean(values <= estimates[col]) - q) < 0.005
+
+
+def test_tdigest_merge_matches_one_digest():
+    rng = np.random.default_rng(1)
+    values = rng.exponential(100, 40_000)
+    parts = pd.DataFrame({'day': np.arange(len(values)) % 8, 'value': values, 'weight': 1.0})
+    per_day = compress_digests(parts, ['day'], 'value', 'weight')
+    merged = compress_digests(per_day.assign(g=0), ['g'], 'mean', 'weight')
+    assert merged['weight'].sum() == len(values)
+
+    qs = {'p90': 0.9, 'p99': 0.99}
+    estimates = digest_quantiles(merged, ['g'], qs).iloc[0]
+    for col, q in qs.items():
+        assert abs(np.mean(values <= estimates[col]) - q) < 0.005
+
+
+def test_tdigest_groups_are_independent():
+    points = pd.DataFrame({'g': ['a'] * 100 + ['b'] * 100, 'value': np.r_[np.arange(100), 1000 + np.arange(100)],
+                           'weight': 1.0})
+    quantiles = digest_quantiles(compress_digests(points, ['g'], 'value', 'weight'), ['g'], {'p50': 0.5})
+    assert quantiles['p50'].tolist() == pytest.approx([49.5, 1049.5], abs=1)
+
+
+def top_k_rows(counts, capacity):
+    """Per-day summaries of a frame of exact (day, key, count) rows."""
+    return truncate_groups(counts, ['day'], ['key'], capacity=capacity)
+
+
+def test_top_k_merge_bounds_hold():
+    rng = np.random.default_rng(2)
+    # Zipf-like keys over 30 days
+    keys = rng.zipf(1.5, 60_000) % 500
+    counts = (pd.DataFrame({'day': rng.integers(0, 30, len(keys)), 'key': keys})
+              .value_counts().rename('count').reset_index())
+    exact = counts.groupby('key')['count'].sum()
+    capacity = 20
+
+    top = merge_truncated(top_k_rows(counts, capacity), ['day'], ['key'], k=10).set_index('key')
+    for key, row in top.iterrows():
+        # Never under-counts, and count - error is a guaranteed lower bound
+        assert row['count'] >= exact[key] >= row['count'] - row['error']
+    # Heavy keys are found
+    assert set(exact.nlargest(3).index) <= set(top.index)
+
+
+def test_top_k_keeps_everything_below_capacity():
+    counts = pd.DataFrame({'day': [0, 0, 1], 'key': ['a', 'b', 'a'], 'count': [5, 3, 2]})
+    rows = top_k_rows(counts, capacity=10)
+    assert (rows['floor'] == 0).all() and (rows['error'] == 0).all()
+    top = merge_truncated(rows, ['day'], ['key'], k=5)
+    assert top[['key', 'count', 'error']].values.tolist() == [['a', 7, 0], ['b', 3, 0]]